@@ -0,0 +1,207 @@
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from firefighter import DAYS_PER_WEEK, CostTable, SchedulingProblem
+from instrumentation import instrumentation
+from model import FREE_CELL
+from search import AdaptiveSelection
+
+# A destroy operator returns a destroyed copy of a schedule: the rows of the destroyed firefighters are "0",
+# and the destroyed days of the other rows are FREE_CELL (see `ModelBuilder.fix_rows`).
+# Its arguments are the schedule, the problem, the CostTable, a random generator and the size of the destruction.
+DestroyOperator = Callable[
+    [List[str], SchedulingProblem, CostTable, random.Random, int], List[str]
+]
+
+
+def _destroy_rows(schedule: List[str], firefighters) -> List[str]:
+    result = list(schedule)
+    for i in firefighters:
+        result[i] = "0"
+    return result
+
+
+def destroy_random(
+    schedule: List[str],
+    prob: SchedulingProblem,
+    costs: CostTable,
+    rng: random.Random,
+    size: int,
+) -> List[str]:
+    """
+    Destroys the rows of [size] random firefighters.
+    """
+    size = min(size, prob._nb_firefighters)
+    return _destroy_rows(schedule, rng.sample(range(prob._nb_firefighters), size))
+
+
+def destroy_expensive(
+    schedule: List[str],
+    prob: SchedulingProblem,
+    costs: CostTable,
+    rng: random.Random,
+    size: int,
+) -> List[str]:
+    """
+    Destroys the rows of [size] firefighters drawn among the 2 * [size] most expensive ones.
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    firefighters = sorted(
+        range(prob._nb_firefighters),
+        key=lambda i: costs.row_cost(i, schedule[i][:nb_days]),
+        reverse=True,
+    )
+    candidates = firefighters[: 2 * size]
+    return _destroy_rows(schedule, rng.sample(candidates, min(size, len(candidates))))
+
+
+def destroy_day_window(
+    schedule: List[str],
+    prob: SchedulingProblem,
+    costs: CostTable,
+    rng: random.Random,
+    size: int,
+) -> List[str]:
+    """
+    Destroys a window of 2 * [size] consecutive days (cyclically) for all the firefighters.
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    length = min(2 * size, nb_days)
+    start = rng.randrange(nb_days)
+    days = {(start + k) % nb_days for k in range(length)}
+    return [
+        "".join(FREE_CELL if d in days else row[d] for d in range(nb_days))
+        for row in schedule
+    ]
+
+
+def destroy_tight_coverage(
+    schedule: List[str],
+    prob: SchedulingProblem,
+    costs: CostTable,
+    rng: random.Random,
+    size: int,
+) -> List[str]:
+    """
+    Destroys the rows of [size] firefighters that perform the same shift on a day where this shift is covered by
+    the fewest firefighters beyond its requirement (see C7), completed with random firefighters if needed.
+    Such firefighters can only exchange this shift together.
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    slacks = {}
+    for shift, min_nb in prob._shift_requirements.items():
+        for d in range(nb_days):
+            nb = sum(1 for row in schedule if row[d] == shift)
+            slacks[(d, shift)] = nb - min_nb
+    min_slack = min(slacks.values())
+    d, shift = rng.choice(
+        sorted(key for key, slack in slacks.items() if slack == min_slack)
+    )
+    firefighters = [i for i, row in enumerate(schedule) if row[d] == shift]
+    chosen = rng.sample(firefighters, min(size, len(firefighters)))
+    others = [i for i in range(prob._nb_firefighters) if i not in chosen]
+    chosen += rng.sample(others, min(size - len(chosen), len(others)))
+    return _destroy_rows(schedule, chosen)
+
+
+DESTROY_OPERATORS: Dict[str, DestroyOperator] = {
+    "expensive": destroy_expensive,
+    "day_window": destroy_day_window,
+    "tight_coverage": destroy_tight_coverage,
+    "random": destroy_random,
+}
+
+
+class ALNS:
+    """
+    Adaptive Large Neighbourhood Search for a [SchedulingProblem], starting from the feasible [schedule].
+
+    Each iteration destroys part of the current solution with one of [operators] (by default DESTROY_OPERATORS),
+    with a destruction of [size] (see the operators), then rebuilds it with [repair]
+    (a function of the destroyed schedule, e.g., `lns.repair`); the repaired solution replaces the current
+    solution if it is feasible and cheaper.
+    The operator is chosen by an `AdaptiveSelection`, so the operators that recently improved the solution
+    the most per second are chosen more often. Each new best solution is added to [store] if specified.
+    """
+
+    def __init__(
+        self,
+        prob: SchedulingProblem,
+        costs,
+        schedule: List[str],
+        repair: Callable[[List[str]], List[str]],
+        operators: Optional[Dict[str, DestroyOperator]] = None,
+        size: int = 2,
+        seed=0,
+        store=None,
+    ) -> None:
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        if operators is None:
+            operators = DESTROY_OPERATORS
+        self._prob = prob
+        self._costs = costs
+        self._repair = repair
+        self._names = list(operators)
+        self._operators = [operators[name] for name in self._names]
+        self._size = size
+        self._rng = random.Random(seed)
+        self._store = store
+        self.selection = AdaptiveSelection(len(self._operators))
+        self.selection.names = list(self._names)
+        self.current = list(schedule)
+        self.current_cost = prob.cost(self.current, costs)
+        self.nb_iterations = 0
+        self.trajectory: List[Tuple[float, float]] = []
+
+    def step(self) -> bool:
+        """
+        Performs an iteration and indicates whether it improved the current solution.
+        """
+        self.nb_iterations += 1
+        k = self.selection.select(range(len(self._operators)), self._rng)
+        name = "alns." + self._names[k]
+        instrumentation.count(name + ".iterations")
+        start = time.perf_counter()
+        with instrumentation.timer(name):
+            destroyed = self._operators[k](
+                self.current, self._prob, self._costs, self._rng, self._size
+            )
+            repaired = self._repair(destroyed)
+        cost = self._prob.cost(repaired, self._costs)
+        improvement = 0.0
+        if cost < self.current_cost - 1e-9 and self._prob.is_feasible(repaired) is None:
+            improvement = self.current_cost - cost
+            self.current = list(repaired)
+            self.current_cost = cost
+            instrumentation.improvement(name, improvement)
+            if self._store is not None:
+                self._store.add(self.current, cost)
+        self.selection.update(k, improvement, time.perf_counter() - start)
+        return improvement > 0
+
+    def run(
+        self, max_iterations: Optional[int] = None, time_limit: Optional[float] = None
+    ) -> Tuple[List[str], float]:
+        """
+        Performs iterations until [max_iterations] iterations have been performed or [time_limit] seconds have
+        elapsed, and returns the current (i.e., best) solution with its cost.
+        """
+        if max_iterations is None and time_limit is None:
+            raise ValueError(
+                "ALNS requires a maximal number of iterations or a time limit"
+            )
+        start = time.perf_counter()
+        self.trajectory.append((0.0, self.current_cost))
+        nb_iterations = 0
+        while (max_iterations is None or nb_iterations < max_iterations) and (
+            time_limit is None or time.perf_counter() - start < time_limit
+        ):
+            nb_iterations += 1
+            if self.step():
+                self.trajectory.append((time.perf_counter() - start, self.current_cost))
+        return list(self.current), self.current_cost
+
+
+# eof
@@ -0,0 +1,206 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from firefighter import (
+    DAYS_PER_WEEK,
+    SHIFT_AFTERNOON,
+    SHIFT_MORNING,
+    SHIFT_NIGHT,
+    SHIFT_CODES,
+    SHIFT_OFFDUTY,
+    CostTable,
+    SchedulingProblem,
+)
+
+# Encoding of the shifts in the arrays used by this module (see SHIFT_CODES)
+CODE_OFFDUTY = SHIFT_CODES[SHIFT_OFFDUTY]
+CODE_SHIFTS = {code: shift for shift, code in SHIFT_CODES.items()}
+CODE_UNKNOWN = -1  # Used for anything that is not a shift
+
+# _CODES[b] is the code of the shift whose character has code b
+_CODES = np.full(256, CODE_UNKNOWN, dtype=np.int8)
+for _shift, _code in SHIFT_CODES.items():
+    _CODES[ord(_shift)] = _code
+
+
+def encode_schedules(schedules: List[List[str]], prob: SchedulingProblem) -> np.ndarray:
+    """
+    Returns an int8 array of shape (len([schedules]), nb firefighters, nb days)
+    such that result[n][i][d] is the code of the shift of firefighter i on day d in the n-th schedule.
+    Missing days and unknown shifts are encoded as CODE_UNKNOWN.
+    """
+    nb_firefighters = prob._nb_firefighters
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    # Every row is truncated or padded to nb_days characters (the padding is not a shift),
+    # so the concatenation of the rows can be decoded with a single lookup
+    padding = "\0" * nb_days
+    rows = []
+    for schedule in schedules:
+        schedule = schedule[:nb_firefighters]
+        rows.extend(row[:nb_days].ljust(nb_days, "\0") for row in schedule)
+        rows.extend(padding for _i in range(nb_firefighters - len(schedule)))
+    data = np.frombuffer("".join(rows).encode("latin-1", "replace"), dtype=np.uint8)
+    return _CODES[data].reshape(len(schedules), nb_firefighters, nb_days)
+
+
+def decode_schedule(roster: np.ndarray) -> List[str]:
+    """
+    Returns the schedule (list of strings) represented by the (nb firefighters, nb days) array [roster].
+    """
+    return ["".join(CODE_SHIFTS.get(int(code), "?") for code in row) for row in roster]
+
+
+def _run_violations(inside: np.ndarray, min_length: int, max_length: int) -> np.ndarray:
+    """
+    [inside] is a boolean array of shape (N, nb firefighters, nb days).
+    Returns a boolean array of shape (N, nb firefighters) indicating, for each row,
+    whether it contains a (wrapped) sequence of True whose length is not in [min_length, max_length].
+    Like `consecutive_numbers`, sequences are only counted in rows that also contain some False.
+    """
+    # Day d starts a sequence if it is inside and the previous day (wrapped) is not.
+    starts = inside & ~np.roll(inside, 1, axis=-1)
+    too_short = np.zeros(inside.shape[:-1], dtype=bool)
+    for x in range(1, min_length):
+        too_short |= (starts & ~np.roll(inside, -x, axis=-1)).any(axis=-1)
+
+    # There is a sequence that is too long iff some window of max_length+1 days is entirely inside.
+    window = inside.copy()
+    for x in range(1, max_length + 1):
+        window &= np.roll(inside, -x, axis=-1)
+    too_long = window.any(axis=-1) & ~inside.all(axis=-1)
+
+    return too_short | too_long
+
+
+class BatchEvaluator:
+    """
+    Evaluates the feasibility and the cost of many schedules of a [SchedulingProblem] at once.
+    Schedules are given as an int8 array of shape (N, nb firefighters, nb days) (see `encode_schedules`).
+    All the constraints are computed with array operations over the whole batch.
+    """
+
+    def __init__(self, prob: SchedulingProblem, costs) -> None:
+        """
+        [costs] is either a CostTable or the result of `read_costs`.
+        """
+        self._prob = prob
+        self._nb_firefighters = prob._nb_firefighters
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self._saturdays = np.array(
+            [5 + w * DAYS_PER_WEEK for w in range(prob._nb_weeks)]
+        )
+
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        # cost_table[i][d][code] is the cost for firefighter i to work on weekday d in the shift [code]
+        self._cost_table = costs.values
+        self._firefighter_index = np.arange(self._nb_firefighters)[None, :, None]
+        self._weekday_index = (np.arange(self._nb_days) % DAYS_PER_WEEK)[None, None, :]
+
+    def _rows(self, rosters: np.ndarray) -> np.ndarray:
+        return rosters[:, : self._nb_firefighters, : self._nb_days]
+
+    def row_feasible(self, rosters: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean array of shape (N, nb firefighters) indicating
+        whether each row satisfies the constraints that only involve a single firefighter (C0-C6 and C8).
+        """
+        prob = self._prob
+        rows = self._rows(rosters)
+        # C0: there are enough days (see `feasible` for the number of firefighters)
+        if rows.shape[-1] < self._nb_days:
+            return np.zeros(rows.shape[:-1], dtype=bool)
+        offduty = rows == CODE_OFFDUTY
+        work = rows > CODE_OFFDUTY
+
+        # C1: every shift is known
+        invalid = ~(offduty | work).all(axis=-1)
+
+        # C2: number of off-duty days
+        invalid |= offduty.sum(axis=-1) != prob._nb_off_duty_days
+
+        # C3: number of consecutive days in a given shift
+        for shift in (SHIFT_MORNING, SHIFT_AFTERNOON, SHIFT_NIGHT):
+            invalid |= _run_violations(
+                rows == SHIFT_CODES[shift],
+                prob._min_nb_consecutive_days,
+                prob._max_nb_consecutive_days,
+            )
+
+        # C4: consecutive number of work days
+        invalid |= _run_violations(
+            work,
+            prob._min_nb_consecutive_work_days,
+            prob._max_nb_consecutive_work_days,
+        )
+
+        # C5: consecutive number of off-duty days
+        invalid |= _run_violations(
+            offduty,
+            prob._min_nb_consecutive_off_days,
+            prob._max_nb_consecutive_off_days,
+        )
+
+        # C6: at least one full weekend off-duty
+        invalid |= ~(
+            offduty[..., self._saturdays] & offduty[..., self._saturdays + 1]
+        ).any(axis=-1)
+
+        # C8: order of shifts (morning -> afternoon -> night).
+        # With the encoding, the shift that follows [code] is code % 3 + 1.
+        # Between two consecutive work days, a firefighter either keeps the same shift or moves to the next one;
+        # after some off-duty days, the firefighter must move to the next shift.
+        # Gaps longer than the maximum number of off-duty days are already forbidden by C5.
+        for gap in range(1, prob._max_nb_consecutive_off_days + 2):
+            previous = np.roll(rows, gap, axis=-1)
+            pattern = work & (previous > CODE_OFFDUTY)
+            for x in range(1, gap):
+                pattern &= np.roll(offduty, x, axis=-1)
+            allowed = rows == previous % 3 + 1
+            if gap == 1:
+                allowed |= rows == previous
+            invalid |= (pattern & ~allowed).any(axis=-1)
+
+        return ~invalid
+
+    def coverage_feasible(self, rosters: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean array of shape (N,) indicating whether each schedule satisfies constraint C7.
+        """
+        rows = self._rows(rosters)
+        result = np.ones(rows.shape[0], dtype=bool)
+        for shift, min_nb in self._prob._shift_requirements.items():
+            coverage = (rows == SHIFT_CODES[shift]).sum(axis=1)
+            result &= (coverage >= min_nb).all(axis=-1)
+        return result
+
+    def feasible(self, rosters: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean array of shape (N,) indicating whether each schedule is feasible.
+        """
+        if rosters.shape[1] < self._nb_firefighters:
+            return np.zeros(rosters.shape[0], dtype=bool)
+        return self.row_feasible(rosters).all(axis=-1) & self.coverage_feasible(rosters)
+
+    def cost(self, rosters: np.ndarray) -> np.ndarray:
+        """
+        Returns an array of shape (N,) with the cost of each schedule.
+        Unknown shifts do not contribute to the cost.
+        """
+        rows = self._rows(rosters)
+        cells = self._cost_table[
+            self._firefighter_index[:, : rows.shape[1]],
+            self._weekday_index[..., : rows.shape[2]],
+            np.where(rows > CODE_OFFDUTY, rows, CODE_OFFDUTY),
+        ]
+        return cells.sum(axis=(1, 2))
+
+    def evaluate(self, rosters: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the feasibility mask and the cost vector of the specified schedules.
+        """
+        return self.feasible(rosters), self.cost(rosters)
+
+
+# eof
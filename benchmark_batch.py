@@ -0,0 +1,85 @@
+import random
+import time
+from sys import argv
+
+import numpy as np
+
+import firefighter
+from batch import CODE_UNKNOWN, BatchEvaluator, encode_schedules
+from firefighter import DAYS_PER_WEEK, SHIFT_CODES, SHIFTS
+
+
+def random_neighbours(schedule, nb, seed=0):
+    """
+    Returns [nb] copies of [schedule] where a random cell is changed to a random shift.
+    """
+    rng = random.Random(seed)
+    shifts = sorted(SHIFTS)
+    result = []
+    for _n in range(nb):
+        neighbour = list(schedule)
+        i = rng.randrange(len(schedule))
+        d = rng.randrange(len(schedule[i]))
+        neighbour[i] = neighbour[i][:d] + rng.choice(shifts) + neighbour[i][d + 1 :]
+        result.append(neighbour)
+    return result
+
+
+def encode_cells(schedules, prob):
+    """
+    Encodes [schedules] cell by cell, as `encode_schedules` would without NumPy.
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    result = np.full(
+        (len(schedules), prob._nb_firefighters, nb_days), CODE_UNKNOWN, dtype=np.int8
+    )
+    for n, schedule in enumerate(schedules):
+        for i, row in enumerate(schedule[: prob._nb_firefighters]):
+            for d, shift in enumerate(row[:nb_days]):
+                result[n, i, d] = SHIFT_CODES.get(shift, CODE_UNKNOWN)
+    return result
+
+
+def timed(function, *args):
+    """
+    Returns the time (in seconds) taken by the call of [function] with [args].
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # Compares the evaluation of NB random neighbours of example.sched (5000 by default), one schedule at a time
+    # and with batch.py
+    nb = int(argv[1]) if len(argv) > 1 else 5000
+    prob = firefighter.SchedulingProblem()
+    costs = firefighter.read_cost_table(prob)
+    schedules = random_neighbours(firefighter.load_schedule("example.sched"), nb)
+    evaluator = BatchEvaluator(prob, costs)
+    rosters = encode_schedules(schedules, prob)
+
+    comparisons = [
+        (
+            "encode",
+            timed(encode_cells, schedules, prob),
+            timed(encode_schedules, schedules, prob),
+        ),
+        (
+            "cost",
+            timed(lambda: [prob.cost(s, costs) for s in schedules]),
+            timed(evaluator.cost, rosters),
+        ),
+        (
+            "feasibility",
+            timed(lambda: [prob.is_feasible(s) for s in schedules]),
+            timed(evaluator.feasible, rosters),
+        ),
+    ]
+    for name, scalar, vectorised in comparisons:
+        print(
+            f"{name}: {scalar:.3f}s one schedule at a time, {vectorised:.3f}s in batch "
+            f"({scalar / vectorised:.1f} times faster)"
+        )
+
+# eof
@@ -0,0 +1,245 @@
+import hashlib
+import os
+from typing import Iterator, List, Optional
+
+from firefighter import (
+    DAYS_PER_WEEK,
+    SHIFT_AFTERNOON,
+    SHIFT_MORNING,
+    SHIFT_NIGHT,
+    SHIFT_OFFDUTY,
+    SchedulingProblem,
+)
+
+# Order in which shifts are tried during the enumeration, and 2-bit encoding of the shifts in the cache files
+ROW_SHIFTS = SHIFT_OFFDUTY + SHIFT_MORNING + SHIFT_AFTERNOON + SHIFT_NIGHT
+
+
+def row_parameters(prob: SchedulingProblem) -> tuple:
+    """
+    Returns the parameters of [prob] that determine whether a row is valid on its own.
+    """
+    return (
+        prob._nb_weeks,
+        prob._nb_off_duty_days,
+        prob._min_nb_consecutive_days,
+        prob._max_nb_consecutive_days,
+        prob._min_nb_consecutive_work_days,
+        prob._max_nb_consecutive_work_days,
+        prob._min_nb_consecutive_off_days,
+        prob._max_nb_consecutive_off_days,
+        tuple(sorted(prob._shift_order.items())),
+    )
+
+
+def enumerate_rows(prob: SchedulingProblem) -> List[str]:
+    """
+    Returns all the rows that satisfy the constraints that only involve a single firefighter (C0-C6 and C8).
+
+    Rows are built day by day.  A prefix is abandoned as soon as it contains a sequence that is surrounded by
+    other elements and whose length is invalid, a shift order that is forbidden by C8,
+    or a number of off-duty days that cannot lead to the right total.
+    The first sequence of a prefix is never checked since it may continue at the end of the row (wrapping).
+    Complete rows are checked with the `RowValidator` of [prob].
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    shift_bounds = prob._min_nb_consecutive_days, prob._max_nb_consecutive_days
+    off_bounds = prob._min_nb_consecutive_off_days, prob._max_nb_consecutive_off_days
+    work_bounds = (
+        prob._min_nb_consecutive_work_days,
+        prob._max_nb_consecutive_work_days,
+    )
+    validator = prob.row_validator()
+    result = []
+    prefix = []
+
+    def valid_sequence(length, bounds, from_start, finished):
+        """
+        Indicates whether a sequence of the specified length can still be part of a valid row.
+        """
+        if from_start:
+            return True
+        if length > bounds[1]:
+            return False
+        return not finished or length >= bounds[0]
+
+    # For both the sequences of equal shifts and the sequences of work/off-duty days, we keep track of
+    # the length of the current sequence and whether it started on the first day.
+    def extend(
+        nb_off,
+        shift_length,
+        shift_from_start,
+        work_length,
+        work_from_start,
+        previous_work,
+        gap,
+    ):
+        d = len(prefix)
+        if d == nb_days:
+            row = "".join(prefix)
+            if validator.is_valid(row):
+                result.append(row)
+            return
+
+        previous = prefix[-1] if prefix else None
+        for shift in ROW_SHIFTS:
+            is_off = shift == SHIFT_OFFDUTY
+            new_nb_off = nb_off + is_off
+            if new_nb_off > prob._nb_off_duty_days:
+                continue
+            if new_nb_off + nb_days - d - 1 < prob._nb_off_duty_days:
+                continue
+
+            # C3 and C5: sequences of the same shift
+            bounds = off_bounds if previous == SHIFT_OFFDUTY else shift_bounds
+            if shift == previous:
+                new_shift_length = shift_length + 1
+                new_shift_from_start = shift_from_start
+                if not valid_sequence(
+                    new_shift_length, bounds, shift_from_start, False
+                ):
+                    continue
+            else:
+                if previous is not None and not valid_sequence(
+                    shift_length, bounds, shift_from_start, True
+                ):
+                    continue
+                new_shift_length = 1
+                new_shift_from_start = previous is None
+
+            # C4: sequences of work days
+            was_off = previous == SHIFT_OFFDUTY
+            if previous is not None and is_off == was_off:
+                new_work_length = work_length + 1
+                new_work_from_start = work_from_start
+                if not is_off and not valid_sequence(
+                    new_work_length, work_bounds, work_from_start, False
+                ):
+                    continue
+            else:
+                if (
+                    previous is not None
+                    and not was_off
+                    and not valid_sequence(
+                        work_length, work_bounds, work_from_start, True
+                    )
+                ):
+                    continue
+                new_work_length = 1
+                new_work_from_start = previous is None
+
+            # C8: order of shifts
+            if is_off:
+                new_previous_work, new_gap = previous_work, gap + 1
+            else:
+                if previous_work is not None:
+                    next_shift = prob._shift_order[previous_work]
+                    if gap > 0 and shift != next_shift:
+                        continue
+                    if gap == 0 and shift not in (previous_work, next_shift):
+                        continue
+                new_previous_work, new_gap = shift, 0
+
+            prefix.append(shift)
+            extend(
+                new_nb_off,
+                new_shift_length,
+                new_shift_from_start,
+                new_work_length,
+                new_work_from_start,
+                new_previous_work,
+                new_gap,
+            )
+            prefix.pop()
+
+    extend(0, 0, True, 0, True, None, 0)
+    return result
+
+
+def _pack(row: str) -> bytes:
+    """
+    Encodes [row] with 2 bits per day.
+    """
+    value = 0
+    for shift in reversed(row):
+        value = (value << 2) | ROW_SHIFTS.index(shift)
+    return value.to_bytes((2 * len(row) + 7) // 8, "little")
+
+
+def _unpack(data: bytes, nb_days: int) -> str:
+    """
+    Decodes a row encoded with `_pack`.
+    """
+    value = int.from_bytes(data, "little")
+    shifts = []
+    for _d in range(nb_days):
+        shifts.append(ROW_SHIFTS[value & 3])
+        value >>= 2
+    return "".join(shifts)
+
+
+class RowCatalogue:
+    """
+    Catalogue of all the rows (schedules of a single firefighter) that satisfy the constraints
+    that only involve a single firefighter (C0-C6 and C8) for a [SchedulingProblem].
+    Only constraint C7 couples firefighters, so a schedule is feasible iff each of its rows is in the catalogue
+    and every shift is covered.
+
+    Enumerating the rows takes a while, so the catalogue is cached in [dir],
+    in a file whose name depends on the parameters of the problem.
+    Each row is stored with 2 bits per day.
+    """
+
+    def __init__(self, prob: SchedulingProblem, dir: Optional[str] = ".") -> None:
+        self._prob = prob
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        key = hashlib.sha1(repr(row_parameters(prob)).encode()).hexdigest()[:16]
+        self._filename = None if dir is None else os.path.join(dir, f"rows_{key}.rows")
+
+        rows = self._load()
+        if rows is None:
+            rows = enumerate_rows(prob)
+            self._save(rows)
+        self._rows = rows
+        self._row_set = frozenset(rows)
+
+    def _load(self) -> Optional[List[str]]:
+        if self._filename is None or not os.path.exists(self._filename):
+            return None
+        size = (2 * self._nb_days + 7) // 8
+        with open(self._filename, "rb") as f:
+            data = f.read()
+        return [
+            _unpack(data[k : k + size], self._nb_days)
+            for k in range(0, len(data), size)
+        ]
+
+    def _save(self, rows: List[str]) -> None:
+        if self._filename is None:
+            return
+        with open(self._filename, "wb") as f:
+            for row in rows:
+                f.write(_pack(row))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __contains__(self, row: str) -> bool:
+        return row[: self._nb_days] in self._row_set
+
+    def is_feasible(self, schedule: List[str]) -> bool:
+        """
+        Indicates whether [schedule] is feasible, using the catalogue for the constraints on single rows.
+        """
+        if len(schedule) < self._prob._nb_firefighters:
+            return False
+        for i in range(self._prob._nb_firefighters):
+            if schedule[i] not in self:
+                return False
+        return self._prob.coverage_violation(schedule) is None
+
+
+# eof
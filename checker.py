@@ -0,0 +1,153 @@
+from typing import Dict, List, Tuple
+
+from firefighter import (
+    DAYS_PER_WEEK,
+    SHIFT_AFTERNOON,
+    SHIFT_MORNING,
+    SHIFT_NIGHT,
+    SchedulingProblem,
+)
+
+
+class IncrementalChecker:
+    """
+    Stateful feasibility checker for the schedules of a [SchedulingProblem].
+
+    The checker keeps track of a current schedule, together with
+    * whether the schedule of each firefighter satisfies the constraints that only involve this firefighter
+      (C0-C6 and C8), and
+    * the number of firefighters assigned to each (day, work shift) pair (constraint C7).
+    A move is described as a dictionary { i1: s1, i2: s2, etc. } that replaces the schedule of firefighter ik with sk.
+    Checking a move only re-validates the modified rows and the coverage of the days they modify,
+    instead of calling [SchedulingProblem.is_feasible] on the whole schedule.
+    If a [catalogue] (see `RowCatalogue`) is specified, validating a row is a simple membership test.
+    """
+
+    def __init__(
+        self, prob: SchedulingProblem, schedule: List[str], catalogue=None
+    ) -> None:
+        self._prob = prob
+        self._catalogue = catalogue
+        self._validator = prob.row_validator()
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self._requirements = prob._shift_requirements
+        self._workshifts = SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT
+        # Whether a row is valid does not depend on the firefighter, so the validity of rows is shared
+        self._valid_row_cache: Dict[str, bool] = {}
+        self.reset(schedule)
+
+    def reset(self, schedule: List[str]) -> None:
+        """
+        Makes [schedule] the current schedule of the checker.
+        """
+        self._rows = []
+        self._valid_rows = []
+        for i in range(self._prob._nb_firefighters):
+            row = schedule[i] if i < len(schedule) else ""
+            self._rows.append(self._normalise(row))
+            self._valid_rows.append(self.is_valid_row(row))
+        self._nb_invalid_rows = self._valid_rows.count(False)
+
+        self._coverage = [
+            {shift: 0 for shift in self._workshifts} for _d in range(self._nb_days)
+        ]
+        for row in self._rows:
+            for d in range(self._nb_days):
+                if row[d] in self._coverage[d]:
+                    self._coverage[d][row[d]] += 1
+        self._nb_uncovered = len(
+            [
+                (d, shift)
+                for d in range(self._nb_days)
+                for shift, min_nb in self._requirements.items()
+                if self._coverage[d][shift] < min_nb
+            ]
+        )
+
+    def _normalise(self, row: str) -> str:
+        """
+        Returns the first days of [row], padded if [row] is too short, so that [row][d] is defined for every day.
+        """
+        return row[: self._nb_days].ljust(self._nb_days, "?")
+
+    def is_valid_row(self, row: str) -> bool:
+        """
+        Indicates whether [row] satisfies all the constraints that only involve a single firefighter.
+        """
+        if self._catalogue is not None:
+            return row in self._catalogue
+        valid = self._valid_row_cache.get(row)
+        if valid is None:
+            valid = self._validator.is_valid(row)
+            self._valid_row_cache[row] = valid
+        return valid
+
+    def is_feasible(self) -> bool:
+        """
+        Indicates whether the current schedule is feasible.
+        """
+        return self._nb_invalid_rows == 0 and self._nb_uncovered == 0
+
+    def _coverage_changes(self, move: Dict[int, str]) -> Dict[Tuple[int, str], int]:
+        """
+        Returns the changes { (d, shift): delta, etc. } in the coverage that [move] would cause.
+        """
+        changes = {}
+        for i, new_row in move.items():
+            old_row = self._rows[i]
+            new_row = self._normalise(new_row)
+            if old_row == new_row:
+                continue
+            for d in range(self._nb_days):
+                old_shift = old_row[d]
+                new_shift = new_row[d]
+                if old_shift != new_shift:
+                    changes[(d, old_shift)] = changes.get((d, old_shift), 0) - 1
+                    changes[(d, new_shift)] = changes.get((d, new_shift), 0) + 1
+        return changes
+
+    def is_feasible_move(self, move: Dict[int, str]) -> bool:
+        """
+        Indicates whether the current schedule would be feasible after applying [move].
+        The current schedule is left unchanged.
+        """
+        nb_invalid_rows = self._nb_invalid_rows
+        for i, new_row in move.items():
+            if not self.is_valid_row(new_row):
+                return False
+            if not self._valid_rows[i]:
+                nb_invalid_rows -= 1
+        if nb_invalid_rows > 0:
+            return False
+
+        nb_uncovered = self._nb_uncovered
+        for (d, shift), delta in self._coverage_changes(move).items():
+            if delta == 0 or shift not in self._requirements:
+                continue
+            min_nb = self._requirements[shift]
+            before = self._coverage[d][shift]
+            nb_uncovered += (before + delta < min_nb) - (before < min_nb)
+        return nb_uncovered == 0
+
+    def apply(self, move: Dict[int, str]) -> None:
+        """
+        Applies [move] to the current schedule.
+        """
+        for (d, shift), delta in self._coverage_changes(move).items():
+            if shift not in self._coverage[d]:
+                continue
+            before = self._coverage[d][shift]
+            after = before + delta
+            self._coverage[d][shift] = after
+            if shift in self._requirements:
+                min_nb = self._requirements[shift]
+                self._nb_uncovered += (after < min_nb) - (before < min_nb)
+
+        for i, new_row in move.items():
+            valid = self.is_valid_row(new_row)
+            self._nb_invalid_rows += self._valid_rows[i] - valid
+            self._valid_rows[i] = valid
+            self._rows[i] = self._normalise(new_row)
+
+
+# eof
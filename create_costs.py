@@ -7,12 +7,15 @@ from firefighter import (
     SHIFT_NIGHT,
 )
 
-if __name__ == "__main__":
-    MY_ID = 46918693
-    random.seed(MY_ID)
 
-    with open("costs.scosts", "w") as f:
-        prob = SchedulingProblem()
+def create_costs(prob: SchedulingProblem, seed, filename="costs.scosts"):
+    """
+    Writes in [filename] a random cost for each firefighter of [prob], day of the week, and work shift.
+    The file can be read with `read_costs` or `read_cost_table`.
+    """
+    random.seed(seed)
+
+    with open(filename, "w") as f:
         for i in range(prob._nb_firefighters):
             for d in range(DAYS_PER_WEEK):
                 for shift_type in [SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT]:
@@ -21,4 +24,9 @@ if __name__ == "__main__":
                     )  # chooses a random number between 0 and 1
                     f.write(" ")
 
+
+if __name__ == "__main__":
+    MY_ID = 46918693
+    create_costs(SchedulingProblem(), MY_ID)
+
 # eof
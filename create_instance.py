@@ -0,0 +1,259 @@
+import json
+import os
+import random
+from sys import argv
+from typing import Dict, List, Optional, Tuple
+
+from create_costs import create_costs
+from firefighter import (
+    DAYS_PER_WEEK,
+    SHIFT_MORNING,
+    SHIFT_OFFDUTY,
+    SchedulingProblem,
+    load_schedule,
+    read_cost_table,
+)
+
+
+def _composition(total: int, k: int, lo: int, hi: int, rng: random.Random) -> List[int]:
+    """
+    Returns a random list of [k] integers in [lo, hi] whose sum is [total].
+    """
+    parts = [lo] * k
+    remaining = total - k * lo
+    open_parts = [j for j in range(k) if parts[j] < hi]
+    while remaining > 0:
+        j = rng.choice(open_parts)
+        parts[j] += 1
+        remaining -= 1
+        if parts[j] == hi:
+            open_parts.remove(j)
+    return parts
+
+
+def _work_block_runs(
+    length: int, prob: SchedulingProblem, rng: random.Random
+) -> List[int]:
+    """
+    Returns a random split of a sequence of [length] work days into sequences of the same shift.
+    """
+    lo, hi = prob._min_nb_consecutive_days, prob._max_nb_consecutive_days
+    nb_runs = rng.randint(-(-length // hi), length // lo)
+    return _composition(length, nb_runs, lo, hi, rng)
+
+
+def _random_cycle(
+    prob: SchedulingProblem, rng: random.Random, max_attempts: int = 1000
+) -> str:
+    """
+    Returns a random row that satisfies the constraints of [prob] that only involve a single firefighter,
+    except possibly the week-end constraint (C6).
+
+    The row is built as a cycle of work sequences separated by off-duty sequences.
+    Each work sequence is split into sequences of the same shift that follow the order of the shifts,
+    and each work sequence starts with the shift that follows the last shift of the previous one.
+    Since all these constraints are cyclic, any rotation of the row also satisfies them.
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    nb_off = prob._nb_off_duty_days
+    nb_work = nb_days - nb_off
+    off_lo = prob._min_nb_consecutive_off_days
+    off_hi = prob._max_nb_consecutive_off_days
+    work_lo = prob._min_nb_consecutive_work_days
+    work_hi = prob._max_nb_consecutive_work_days
+    # Numbers of work sequences (= numbers of off-duty sequences) compatible with the bounds
+    nb_blocks = [
+        k
+        for k in range(1, nb_days + 1)
+        if k * off_lo <= nb_off <= k * off_hi and k * work_lo <= nb_work <= k * work_hi
+    ]
+    if not nb_blocks:
+        raise ValueError("No row satisfies the parameters of the problem")
+
+    for _attempt in range(max_attempts):
+        k = rng.choice(nb_blocks)
+        off_lengths = _composition(nb_off, k, off_lo, off_hi, rng)
+        work_lengths = _composition(nb_work, k, work_lo, work_hi, rng)
+        runs = [_work_block_runs(length, prob, rng) for length in work_lengths]
+        # The shift advances after each sequence of the same shift;
+        # it must come back to the first shift after a full cycle.
+        if sum(len(block_runs) for block_runs in runs) % len(prob._shift_order) != 0:
+            continue
+
+        row = ""
+        shift = SHIFT_MORNING
+        for block_runs, off_length in zip(runs, off_lengths):
+            for run in block_runs:
+                row += shift * run
+                shift = prob._shift_order[shift]
+            row += SHIFT_OFFDUTY * off_length
+        return row
+
+    raise ValueError(f"Could not build a row in {max_attempts} attempts")
+
+
+def valid_rotations(prob: SchedulingProblem, row: str) -> List[str]:
+    """
+    Returns the rotations of [row] that satisfy all the constraints of [prob] that only involve a single firefighter,
+    assuming [row] is built by `_random_cycle`.
+    Only the week-end constraint (C6) depends on the rotation.
+    """
+    saturdays = [5 + DAYS_PER_WEEK * w for w in range(prob._nb_weeks)]
+    result = []
+    for r in range(len(row)):
+        rotated = row[r:] + row[:r]
+        if any(
+            rotated[d] == SHIFT_OFFDUTY and rotated[d + 1] == SHIFT_OFFDUTY
+            for d in saturdays
+        ):
+            result.append(rotated)
+    if result and not prob.row_validator().is_valid(result[0]):
+        return []
+    return result
+
+
+def random_row(prob: SchedulingProblem, rng: random.Random) -> str:
+    """
+    Returns a random row (schedule of a single firefighter) that satisfies
+    the constraints of [prob] that only involve a single firefighter (C0-C6 and C8).
+    """
+    while True:
+        rotations = valid_rotations(prob, _random_cycle(prob, rng))
+        if rotations:
+            return rng.choice(rotations)
+
+
+def balanced_schedule(
+    prob: SchedulingProblem,
+    rng: random.Random,
+    nb_candidates: int = 10,
+    nb_rotations: int = 16,
+) -> List[str]:
+    """
+    Returns a random schedule for [prob] whose rows are valid and whose coverage is as even as possible.
+    Rows are chosen greedily: for each firefighter, among [nb_rotations] valid rotations of each of
+    [nb_candidates] random rows, we pick the one that favours the shifts that are the least covered so far,
+    starting with those that are below their requirement.
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    counts = [{shift: 0 for shift in prob._shift_order} for _d in range(nb_days)]
+    requirements = prob._shift_requirements
+    schedule = []
+    for _i in range(prob._nb_firefighters):
+        candidates = []
+        while not candidates:
+            for _c in range(nb_candidates):
+                rotations = valid_rotations(prob, _random_cycle(prob, rng))
+                candidates += rng.sample(rotations, min(nb_rotations, len(rotations)))
+
+        def score(row):
+            deficit = 0
+            balance = 0.0
+            for d in range(nb_days):
+                shift = row[d]
+                if shift in counts[d]:
+                    deficit += counts[d][shift] < requirements.get(shift, 0)
+                    balance += 1.0 / (1 + counts[d][shift])
+            return deficit, balance
+
+        best = max(candidates, key=score)
+        for d in range(nb_days):
+            if best[d] in counts[d]:
+                counts[d][best[d]] += 1
+        schedule.append(best)
+    return schedule
+
+
+def coverage(prob: SchedulingProblem, schedule: List[str]) -> Dict[str, int]:
+    """
+    Returns, for each work shift, the minimal number of firefighters performing this shift on a day of [schedule].
+    """
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+    return {
+        shift: min(
+            len([row for row in schedule if row[d] == shift]) for d in range(nb_days)
+        )
+        for shift in prob._shift_order
+    }
+
+
+def create_instance(
+    nb_firefighters: int,
+    nb_weeks: int,
+    seed,
+    shift_requirements: Optional[Dict[str, int]] = None,
+    tightness: float = 0.75,
+    max_attempts: int = 100,
+) -> Tuple[SchedulingProblem, List[str]]:
+    """
+    Returns a scheduling problem of the specified size, together with a feasible schedule for this problem.
+    The number of off-duty days keeps the ratio of the assignment (7 days every 3 weeks).
+    If [shift_requirements] is None, the requirement of each shift is [tightness] times the coverage of the
+    generated schedule, which guarantees that the schedule is feasible.
+    Otherwise, schedules are generated until one satisfies the requirements.
+    """
+    rng = random.Random(seed)
+    prob = SchedulingProblem(
+        nb_firefighters=nb_firefighters,
+        nb_weeks=nb_weeks,
+        shift_requirements=shift_requirements,
+        nb_off_duty_days=round(nb_weeks * DAYS_PER_WEEK / 3),
+    )
+    if shift_requirements is None:
+        # Only used to balance the coverage
+        prob._shift_requirements = {
+            shift: nb_firefighters for shift in prob._shift_order
+        }
+
+    for _attempt in range(max_attempts):
+        schedule = balanced_schedule(prob, rng)
+        if shift_requirements is None:
+            prob._shift_requirements = {
+                shift: int(tightness * nb)
+                for shift, nb in coverage(prob, schedule).items()
+            }
+        if prob.is_feasible(schedule) is None:
+            return prob, schedule
+
+    raise ValueError(
+        f"Could not build a schedule satisfying {shift_requirements} in {max_attempts} attempts"
+    )
+
+
+def save_instance(prob: SchedulingProblem, schedule: List[str], seed, name, dir="."):
+    """
+    Saves the specified problem in [dir]/[name].json, random costs in [dir]/[name].scosts,
+    and the specified schedule in [dir]/[name].sched.
+    """
+    with open(os.path.join(dir, f"{name}.json"), "w") as f:
+        json.dump(prob.parameters(), f, indent=2)
+    create_costs(prob, seed, os.path.join(dir, f"{name}.scosts"))
+    with open(os.path.join(dir, f"{name}.sched"), "w") as f:
+        for line in schedule:
+            f.write(line)
+            f.write("\n")
+
+
+def load_instance(name, dir="."):
+    """
+    Loads an instance saved with `save_instance`.
+    Returns the problem, its CostTable, and the feasible schedule of the instance.
+    """
+    with open(os.path.join(dir, f"{name}.json")) as f:
+        prob = SchedulingProblem(**json.load(f))
+    costs = read_cost_table(prob, os.path.join(dir, f"{name}.scosts"))
+    schedule = load_schedule(os.path.join(dir, f"{name}.sched"))
+    return prob, costs, schedule
+
+
+if __name__ == "__main__":
+    # Usage: python create_instance.py NB_FIREFIGHTERS NB_WEEKS [SEED]
+    nb_firefighters = int(argv[1])
+    nb_weeks = int(argv[2])
+    seed = int(argv[3]) if len(argv) > 3 else 0
+    prob, schedule = create_instance(nb_firefighters, nb_weeks, seed)
+    name = f"instance_{nb_firefighters}_{nb_weeks}_{seed}"
+    save_instance(prob, schedule, seed, name)
+    print(f"Saved {name} (shift requirements: {prob._shift_requirements})")
+
+# eof
@@ -1,37 +1,29 @@
-from random import randint, random
+from random import Random
 
-import firefighter
+from create_instance import balanced_schedule
 from firefighter import SchedulingProblem, save_schedule
 from sys import argv
 
 
-def create_solution(seed):
+def create_solution(seed, prob=None, max_attempts=1000):
     """
     Creates a feasible solution based on the specified seed.
     Different seeds should generally lead to different solutions.
 
-    TODO: Implement this method.
+    Schedules whose rows are valid on their own and whose coverage is as even as possible are generated
+    (see `balanced_schedule`) until one of them satisfies the shift requirements of [prob].
     """
+    if prob is None:
+        prob = SchedulingProblem()
     # Set the random seed for reproducibility
+    rng = Random(seed)
 
+    for _attempt in range(max_attempts):
+        schedule = balanced_schedule(prob, rng)
+        if prob.is_feasible(schedule) is None:
+            return schedule
 
-    # Initialize parameters and variables
-    num_firefighters = 20
-    days = 21
-    shifts = ["M", "A", "N", "F"]
-    schedule = []
-
-    for _ in range(num_firefighters):
-        # Generate a random schedule for each firefighter
-        firefighter_schedule = ""
-        for day in range(days):
-            # Generate a random shift
-            shift = shifts[randint(0, 3)]
-            firefighter_schedule += shift
-        schedule.append(firefighter_schedule)
-    schedule = firefighter.load_schedule("example.sched")
-
-    return schedule
+    raise ValueError(f"Could not create a feasible solution in {max_attempts} attempts")
 
 
 if __name__ == "__main__":
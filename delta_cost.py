@@ -0,0 +1,158 @@
+from typing import Dict, List
+
+from firefighter import DAYS_PER_WEEK, SHIFT_OFFDUTY, CostTable, SchedulingProblem
+from moves import CHANGE_DAY, MOVE_OFF, SWAP_DAY, SWAP_PREFIX, SWAP_ROWS
+
+
+class DeltaCost:
+    """
+    Keeps track of the cost of a current schedule of a [SchedulingProblem]
+    and computes the change of cost induced by a move without recomputing the cost of the whole schedule.
+
+    As in `IncrementalChecker`, a move is described as a dictionary { i1: s1, i2: s2, etc. }
+    that replaces the schedule of firefighter ik with sk.
+    The methods `change_one_day`, `swap_day`, `swap_prefix`, `swap_rows` and `move_off_days` compute the cost
+    change of the usual moves by only looking at the cells they modify; `move_delta` dispatches a Move
+    (see moves.py) to them.
+    [costs] is either a CostTable or the result of `read_costs`.
+    """
+
+    def __init__(self, prob: SchedulingProblem, costs, schedule: List[str]) -> None:
+        self._prob = prob
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        self._costs = costs
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self.reset(schedule)
+
+    def reset(self, schedule: List[str]) -> None:
+        """
+        Makes [schedule] the current schedule.
+        """
+        self._rows = [
+            schedule[i][: self._nb_days] for i in range(self._prob._nb_firefighters)
+        ]
+        self._row_costs = [self.row_cost(i, row) for i, row in enumerate(self._rows)]
+        self.total = sum(self._row_costs)
+
+    def cell_cost(self, i: int, d: int, shift: str) -> float:
+        """
+        Returns the cost for firefighter [i] to perform [shift] on day [d].
+        """
+        return self._costs.cell_cost(i, d, shift)
+
+    def row_cost(self, i: int, row: str) -> float:
+        """
+        Returns the cost of [row] when it is the schedule of firefighter [i].
+        """
+        return self._costs.row_cost(i, row[: self._nb_days])
+
+    def _days_delta(self, i: int, new_row: str, days) -> float:
+        """
+        Returns the change of cost when firefighter [i] performs [new_row] instead of its current schedule,
+        assuming both schedules only differ on the specified days.
+        """
+        old_row = self._rows[i]
+        result = 0
+        for d in days:
+            result += self.cell_cost(i, d, new_row[d])
+            result -= self.cell_cost(i, d, old_row[d])
+        return result
+
+    def change_one_day(self, i: int, d: int, shift: str) -> float:
+        """
+        Returns the change of cost when firefighter [i] performs [shift] on day [d].
+        """
+        return self.cell_cost(i, d, shift) - self.cell_cost(i, d, self._rows[i][d])
+
+    def swap_day(self, i: int, j: int, d: int) -> float:
+        """
+        Returns the change of cost when firefighters [i] and [j] swap their shifts on day [d].
+        """
+        shift_i = self._rows[i][d]
+        shift_j = self._rows[j][d]
+        return (
+            self.cell_cost(i, d, shift_j)
+            + self.cell_cost(j, d, shift_i)
+            - self.cell_cost(i, d, shift_i)
+            - self.cell_cost(j, d, shift_j)
+        )
+
+    def swap_rows(self, i: int, j: int) -> float:
+        """
+        Returns the change of cost when firefighters [i] and [j] swap their schedules.
+        """
+        return (
+            self.row_cost(i, self._rows[j])
+            + self.row_cost(j, self._rows[i])
+            - self._row_costs[i]
+            - self._row_costs[j]
+        )
+
+    def swap_prefix(self, i: int, j: int, day: int) -> float:
+        """
+        Returns the change of cost when firefighters [i] and [j] swap their shifts on days 0 to [day].
+        """
+        row_i = self._rows[i]
+        row_j = self._rows[j]
+        result = 0
+        for d in range(day + 1):
+            if row_i[d] != row_j[d]:
+                result += (
+                    self.cell_cost(i, d, row_j[d])
+                    + self.cell_cost(j, d, row_i[d])
+                    - self.cell_cost(i, d, row_i[d])
+                    - self.cell_cost(j, d, row_j[d])
+                )
+        return result
+
+    def move_off_days(self, i: int, day: int, k: int, length: int = 1) -> float:
+        """
+        Returns the change of cost when the [length] off-duty days of firefighter [i] starting on [day] are removed
+        from the schedule and re-inserted at position [k] (the days in between are shifted).
+        """
+        row = self._rows[i]
+        remaining = row[:day] + row[day + length : self._nb_days]
+        new_row = remaining[:k] + SHIFT_OFFDUTY * length + remaining[k:]
+        return self._days_delta(i, new_row, range(min(day, k), max(day, k) + length))
+
+    def move_delta(self, move) -> float:
+        """
+        Returns the change of cost induced by [move], a Move (see moves.py) of the current schedule.
+        The usual moves only look at the cells they modify; the others go through `delta`.
+        """
+        kind = move.kind
+        if kind == CHANGE_DAY:
+            return self.change_one_day(move.i, move.day, move.value)
+        if kind == SWAP_DAY:
+            return self.swap_day(move.i, move.j, move.day)
+        if kind == SWAP_PREFIX:
+            return self.swap_prefix(move.i, move.j, move.day)
+        if kind == SWAP_ROWS:
+            return self.swap_rows(move.i, move.j)
+        if kind == MOVE_OFF:
+            return self.move_off_days(move.i, move.day, move.j, move.value)
+        return self.delta(move.new_rows(self._rows))
+
+    def delta(self, move: Dict[int, str]) -> float:
+        """
+        Returns the change of cost induced by [move].
+        """
+        result = 0
+        for i, new_row in move.items():
+            if new_row[: self._nb_days] != self._rows[i]:
+                result += self.row_cost(i, new_row) - self._row_costs[i]
+        return result
+
+    def apply(self, move: Dict[int, str]) -> None:
+        """
+        Applies [move] to the current schedule and updates the total cost.
+        """
+        for i, new_row in move.items():
+            row_cost = self.row_cost(i, new_row)
+            self.total += row_cost - self._row_costs[i]
+            self._row_costs[i] = row_cost
+            self._rows[i] = new_row[: self._nb_days]
+
+
+# eof
@@ -0,0 +1,118 @@
+import random
+import time
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# A neighbour is either a schedule or a Move (see moves.py) that leads to this schedule
+Neighbour = Any
+# Evaluates a list of neighbours at once, e.g.
+# lambda schedules: evaluator.cost(encode_schedules(schedules, prob)) with a BatchEvaluator, or
+# lambda moves: [delta_cost.total + delta_cost.delta(move.new_rows(schedule)) for move in moves] with a DeltaCost
+Evaluate = Callable[[List[Neighbour]], Sequence[float]]
+
+
+def chunks(
+    iterable: Iterable, size: int, deadline: Optional[float] = None
+) -> Iterator[List]:
+    """
+    Splits [iterable] into lists of [size] elements (the last one may be shorter).
+    If [deadline] (a value of `time.perf_counter`) is specified, no list is started after it.
+    """
+    iterator = iter(iterable)
+    while deadline is None or time.perf_counter() < deadline:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def best_improvement(
+    neighbours: Iterable[Neighbour],
+    evaluate: Evaluate,
+    current_cost: float,
+    chunk_size: int = 256,
+    deadline: Optional[float] = None,
+) -> Optional[Tuple[Neighbour, float]]:
+    """
+    Returns the best of [neighbours] together with its cost if it is better than [current_cost], or None.
+    Neighbours are evaluated by chunks of [chunk_size], so at most [chunk_size] of them are in memory.
+    If [deadline] (a value of `time.perf_counter`) is specified, the neighbours that are not evaluated
+    when it is reached are ignored.
+    """
+    result = None
+    best_cost = current_cost
+    for chunk in chunks(neighbours, chunk_size, deadline):
+        costs = evaluate(chunk)
+        for neighbour, cost in zip(chunk, costs):
+            if cost < best_cost:
+                result = neighbour
+                best_cost = cost
+    return None if result is None else (result, best_cost)
+
+
+def first_improvement(
+    neighbours: Iterable[Neighbour],
+    evaluate: Evaluate,
+    current_cost: float,
+    chunk_size: int = 64,
+    deadline: Optional[float] = None,
+) -> Optional[Tuple[Neighbour, float]]:
+    """
+    Returns the first of [neighbours] that is better than [current_cost] together with its cost, or None.
+    The remaining neighbours are not generated.
+    Neighbours are evaluated by chunks of [chunk_size]: a smaller chunk generates fewer useless neighbours,
+    a larger one makes the most of batch evaluation.
+    If [deadline] (a value of `time.perf_counter`) is specified, the search stops when it is reached.
+    """
+    for chunk in chunks(neighbours, chunk_size, deadline):
+        costs = evaluate(chunk)
+        for neighbour, cost in zip(chunk, costs):
+            if cost < current_cost:
+                return neighbour, cost
+    return None
+
+
+def sample(
+    neighbours: Iterable[Neighbour],
+    k: int,
+    rng: random.Random,
+    deadline: Optional[float] = None,
+) -> List[Neighbour]:
+    """
+    Returns [k] neighbours chosen uniformly at random among [neighbours] (all of them if there are fewer).
+    Neighbours are generated one at a time and at most [k] of them are kept in memory (reservoir sampling).
+    If [deadline] (a value of `time.perf_counter`) is specified, the neighbours that are not generated
+    when it is reached are ignored.
+    """
+    result = []
+    for n, neighbour in enumerate(neighbours):
+        if deadline is not None and n % 64 == 0 and time.perf_counter() >= deadline:
+            break
+        if n < k:
+            result.append(neighbour)
+        else:
+            r = rng.randint(0, n)
+            if r < k:
+                result[r] = neighbour
+    return result
+
+
+def sampled_improvement(
+    neighbours: Iterable[Neighbour],
+    evaluate: Evaluate,
+    current_cost: float,
+    k: int,
+    rng: random.Random,
+    deadline: Optional[float] = None,
+) -> Optional[Tuple[Neighbour, float]]:
+    """
+    Returns the best of [k] random neighbours together with its cost if it is better than [current_cost], or None.
+    If [deadline] (a value of `time.perf_counter`) is specified, the neighbours are drawn among those generated
+    before it.
+    """
+    return best_improvement(
+        sample(neighbours, k, rng, deadline), evaluate, current_cost, max(k, 1)
+    )
+
+
+# eof
@@ -1,7 +1,11 @@
-from typing import List, Optional, Set, Dict
+from typing import List, Optional, Set, Dict, Sequence
 import re, os
 from datetime import datetime
 
+import numpy as np
+
+from instrumentation import instrumentation
+
 SHIFT_OFFDUTY = "F"
 SHIFT_MORNING = "M"
 SHIFT_AFTERNOON = "A"
@@ -9,6 +13,15 @@ SHIFT_NIGHT = "N"
 SHIFTS = {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT, SHIFT_OFFDUTY}
 DAYS_PER_WEEK = 7
 
+# Index of each shift in dense arrays.
+# The work shifts are numbered in the order imposed by constraint C8 (morning -> afternoon -> night).
+SHIFT_CODES = {
+    SHIFT_OFFDUTY: 0,
+    SHIFT_MORNING: 1,
+    SHIFT_AFTERNOON: 2,
+    SHIFT_NIGHT: 3,
+}
+
 
 def consecutive_numbers(list: List, length: int, elements: Set) -> Dict[int, int]:
     """
@@ -57,30 +70,73 @@ def consecutive_numbers(list: List, length: int, elements: Set) -> Dict[int, int
 class SchedulingProblem:
     """
     Definition of a scheduleing problem.
-    It is assumed that the following aspects are constant:
-    * A scheduleing solution includes 14 days.  The days [1,5] and [8,12] are week days, and the other days are week-end days.
+    A scheduling solution includes [nb_weeks] weeks for [nb_firefighters] firefighters.
+    Each week starts on a Monday: days 5 and 6 of each week are the week-end days.
+    The default parameters correspond to the assignment (20 firefighters over 3 weeks).
+    [shift_requirements] maps each work shift to the minimal number of firefighters for this shift on each day.
     """
 
-    def __init__(self):
-        self._nb_firefighters = 20
-        self._nb_weeks = 3
-        self._min_nb_consecutive_days = 2
-        self._max_nb_consecutive_days = 4
-        self._nb_off_duty_days = 7
-        self._min_nb_consecutive_work_days = 3
-        self._max_nb_consecutive_work_days = 6
-        self._min_nb_consecutive_off_days = 1
-        self._max_nb_consecutive_off_days = 3
-        self._shift_requirements = {
-            SHIFT_MORNING: 3,
-            SHIFT_AFTERNOON: 4,
-            SHIFT_NIGHT: 2,
-        }
+    def __init__(
+        self,
+        nb_firefighters: int = 20,
+        nb_weeks: int = 3,
+        shift_requirements: Optional[Dict[str, int]] = None,
+        nb_off_duty_days: int = 7,
+        min_nb_consecutive_days: int = 2,
+        max_nb_consecutive_days: int = 4,
+        min_nb_consecutive_work_days: int = 3,
+        max_nb_consecutive_work_days: int = 6,
+        min_nb_consecutive_off_days: int = 1,
+        max_nb_consecutive_off_days: int = 3,
+    ):
+        self._nb_firefighters = nb_firefighters
+        self._nb_weeks = nb_weeks
+        self._min_nb_consecutive_days = min_nb_consecutive_days
+        self._max_nb_consecutive_days = max_nb_consecutive_days
+        self._nb_off_duty_days = nb_off_duty_days
+        self._min_nb_consecutive_work_days = min_nb_consecutive_work_days
+        self._max_nb_consecutive_work_days = max_nb_consecutive_work_days
+        self._min_nb_consecutive_off_days = min_nb_consecutive_off_days
+        self._max_nb_consecutive_off_days = max_nb_consecutive_off_days
+        if shift_requirements is None:
+            shift_requirements = {
+                SHIFT_MORNING: 3,
+                SHIFT_AFTERNOON: 4,
+                SHIFT_NIGHT: 2,
+            }
+        self._shift_requirements = dict(shift_requirements)
         self._shift_order = {
             SHIFT_MORNING: SHIFT_AFTERNOON,
             SHIFT_AFTERNOON: SHIFT_NIGHT,
             SHIFT_NIGHT: SHIFT_MORNING,
         }
+        self._row_validator = None
+
+    def parameters(self) -> Dict:
+        """
+        Returns the parameters of this problem, such that `SchedulingProblem(**prob.parameters())` is equivalent to
+        [prob].
+        """
+        return {
+            "nb_firefighters": self._nb_firefighters,
+            "nb_weeks": self._nb_weeks,
+            "shift_requirements": dict(self._shift_requirements),
+            "nb_off_duty_days": self._nb_off_duty_days,
+            "min_nb_consecutive_days": self._min_nb_consecutive_days,
+            "max_nb_consecutive_days": self._max_nb_consecutive_days,
+            "min_nb_consecutive_work_days": self._min_nb_consecutive_work_days,
+            "max_nb_consecutive_work_days": self._max_nb_consecutive_work_days,
+            "min_nb_consecutive_off_days": self._min_nb_consecutive_off_days,
+            "max_nb_consecutive_off_days": self._max_nb_consecutive_off_days,
+        }
+
+    def row_validator(self) -> "RowValidator":
+        """
+        Returns the RowValidator of this problem, which is built the first time it is needed.
+        """
+        if self._row_validator is None:
+            self._row_validator = RowValidator(self)
+        return self._row_validator
 
     def is_feasible(self, schedule: List[str]) -> Optional[str]:
         """
@@ -93,87 +149,123 @@ class SchedulingProblem:
         In other words, the schedule is feasible iff this method returns None.
         In practice, you want probably want to create classes to represent these errors.
         """
+        instrumentation.count("problem.feasibility_checks")
+
         # Constraint C0: contains the right number of rows and columns.
         if len(schedule) < self._nb_firefighters:
             return f"Not enough firefighters ({len(schedule)})"
+
+        # Constraints C0-C6 and C8 only involve the schedule of a single firefighter.
+        # The validator is much faster, row_violation is only used to describe the violation.
+        validator = self.row_validator()
         for i in range(self._nb_firefighters):
-            firefighter = schedule[i]
-            if len(firefighter) < self._nb_weeks * DAYS_PER_WEEK:
-                return f"Wrong shift-length for firefighter {i} ({len(firefighter)})"
+            if not validator.is_valid(schedule[i]):
+                return self.row_violation(i, schedule[i])
+
+        # Constraint C7 is the only one that couples firefighters.
+        violation = self.coverage_violation(schedule)
+        if violation is None:
+            instrumentation.count("problem.feasible")
+        return violation
+
+    def row_violation(self, i: int, firefighter: str) -> Optional[str]:
+        """
+        Returns a string describing one reason why [firefighter], the schedule of firefighter [i],
+        violates one of the constraints that only involve a single firefighter (C0-C6 and C8),
+        or None if there is no such violation.
+        The result does not depend on [i], which is only used to describe the violation.
+        """
+        nb_days = self._nb_weeks * DAYS_PER_WEEK
+
+        # Constraint C0: the schedule covers every day.
+        if len(firefighter) < nb_days:
+            return f"Wrong shift-length for firefighter {i} ({len(firefighter)})"
 
         # Constraint C1: shift is in {M,A,N,F}
-        for i in range(self._nb_firefighters):
-            for d in range(self._nb_weeks * DAYS_PER_WEEK):
-                shift = schedule[i][d]
-                if not shift in SHIFTS:
-                    return (
-                        f"Wrong type of shift for firefighter {i} on day {d} ({shift})"
-                    )
+        for d in range(nb_days):
+            shift = firefighter[d]
+            if not shift in SHIFTS:
+                return f"Wrong type of shift for firefighter {i} on day {d} ({shift})"
 
         # Constraint C2: 7 off-duty days per firefighter
-        for i in range(self._nb_firefighters):
-            nb_off_duty_days = len(
-                [
-                    d
-                    for d in range(self._nb_weeks * DAYS_PER_WEEK)
-                    if schedule[i][d] == SHIFT_OFFDUTY
-                ]
-            )
-            if nb_off_duty_days != self._nb_off_duty_days:
-                return f"Wrong number of off-duty days for firefighter {i} ({nb_off_duty_days})"
+        nb_off_duty_days = len(
+            [d for d in range(nb_days) if firefighter[d] == SHIFT_OFFDUTY]
+        )
+        if nb_off_duty_days != self._nb_off_duty_days:
+            return f"Wrong number of off-duty days for firefighter {i} ({nb_off_duty_days})"
 
         # Constraint C3: number of consecutive days in a given shift
-        for i in range(self._nb_firefighters):
-            for shift_type in {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}:
-                consecutives = consecutive_numbers(
-                    schedule[i], self._nb_weeks * DAYS_PER_WEEK, shift_type
-                )
-                for k, v in consecutives.items():
-                    if (
-                        v < self._min_nb_consecutive_days
-                        or v > self._max_nb_consecutive_days
-                    ):
-                        return f"Wrong number of consecutive days for shift of firefighter {i} starting from day {k}"
-
-        # Constraint C4: Consecutive number of work days for a firefighter
-        for i in range(self._nb_firefighters):
-            consecutives = consecutive_numbers(
-                schedule[i],
-                self._nb_weeks * DAYS_PER_WEEK,
-                {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT},
-            )
+        for shift_type in {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}:
+            consecutives = consecutive_numbers(firefighter, nb_days, shift_type)
             for k, v in consecutives.items():
                 if (
-                    v < self._min_nb_consecutive_work_days
-                    or v > self._max_nb_consecutive_work_days
+                    v < self._min_nb_consecutive_days
+                    or v > self._max_nb_consecutive_days
                 ):
-                    return f"Wrong number of consecutive work days for shift of firefighter {i} starting from day {k}"
+                    return f"Wrong number of consecutive days for shift of firefighter {i} starting from day {k}"
+
+        # Constraint C4: Consecutive number of work days for a firefighter
+        consecutives = consecutive_numbers(
+            firefighter, nb_days, {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}
+        )
+        for k, v in consecutives.items():
+            if (
+                v < self._min_nb_consecutive_work_days
+                or v > self._max_nb_consecutive_work_days
+            ):
+                return f"Wrong number of consecutive work days for shift of firefighter {i} starting from day {k}"
 
         # Constraint C5: Consecutive number of off-duty days for a firefighter
-        for i in range(self._nb_firefighters):
-            consecutives = consecutive_numbers(
-                schedule[i], self._nb_weeks * DAYS_PER_WEEK, {SHIFT_OFFDUTY}
-            )
-            for k, v in consecutives.items():
-                if (
-                    v < self._min_nb_consecutive_off_days
-                    or v > self._max_nb_consecutive_off_days
-                ):
-                    return f"Wrong number of consecutive off-duty days for shift of firefighter {i} starting from day {k}"
+        consecutives = consecutive_numbers(firefighter, nb_days, {SHIFT_OFFDUTY})
+        for k, v in consecutives.items():
+            if (
+                v < self._min_nb_consecutive_off_days
+                or v > self._max_nb_consecutive_off_days
+            ):
+                return f"Wrong number of consecutive off-duty days for shift of firefighter {i} starting from day {k}"
 
         # Constraint C6: at least one full weekend off-duty day
         saturdays = [5 + (DAYS_PER_WEEK * w) for w in range(self._nb_weeks)]
-        for i in range(self._nb_firefighters):
-            satisfies_weekend = False
-            for d in saturdays:
-                if (
-                    schedule[i][d] == SHIFT_OFFDUTY
-                    and schedule[i][d + 1] == SHIFT_OFFDUTY
-                ):
-                    satisfies_weekend = True
-            if not satisfies_weekend:
-                return f"firefighter {i} does not have a weekend off"
+        satisfies_weekend = False
+        for d in saturdays:
+            if firefighter[d] == SHIFT_OFFDUTY and firefighter[d + 1] == SHIFT_OFFDUTY:
+                satisfies_weekend = True
+        if not satisfies_weekend:
+            return f"firefighter {i} does not have a weekend off"
 
+        # Constraint C8: order of shift (morning -> afternoon -> night)
+        previous_work_shift = None
+        across_offduty = False
+        for d in range(2 * nb_days):
+            shift = firefighter[d % nb_days]
+            if shift == SHIFT_OFFDUTY:
+                across_offduty = True
+                continue
+            if shift == SHIFT_MORNING and (
+                previous_work_shift == SHIFT_AFTERNOON
+                or (across_offduty and previous_work_shift == SHIFT_MORNING)
+            ):
+                return f"Wrong shift order for firefighter {i} on day {d} ({previous_work_shift} -> {shift})"
+            if shift == SHIFT_NIGHT and (
+                previous_work_shift == SHIFT_MORNING
+                or (across_offduty and previous_work_shift == SHIFT_NIGHT)
+            ):
+                return f"Wrong shift order for firefighter {i} on day {d} ({previous_work_shift} -> {shift})"
+            if shift == SHIFT_AFTERNOON and (
+                previous_work_shift == SHIFT_NIGHT
+                or (across_offduty and previous_work_shift == SHIFT_AFTERNOON)
+            ):
+                return f"Wrong shift order for firefighter {i} on day {d} ({previous_work_shift} -> {shift})"
+            previous_work_shift = shift
+            across_offduty = False
+
+        return None
+
+    def coverage_violation(self, schedule: List[str]) -> Optional[str]:
+        """
+        Returns a string describing one day and shift of [schedule] that does not have enough firefighters
+        (constraint C7), or None if every shift is covered.
+        """
         # Constraint C7: number of firefighters in each shift
         for shift_type, min_nb in self._shift_requirements.items():
             for d in range(self._nb_weeks * DAYS_PER_WEEK):
@@ -185,39 +277,20 @@ class SchedulingProblem:
                 if len(firefighters) < min_nb:
                     return f"Not enough firefighters on shift {shift_type} for day {d}"
 
-        # Constraint C8: order of shift (morning -> afternoon -> night)
-        for i in range(self._nb_firefighters):
-            previous_work_shift = None
-            across_offduty = False
-            for d in range(2 * self._nb_weeks * DAYS_PER_WEEK):
-                shift = schedule[i][d % (self._nb_weeks * DAYS_PER_WEEK)]
-                if shift == SHIFT_OFFDUTY:
-                    across_offduty = True
-                    continue
-                if shift == SHIFT_MORNING and (
-                    previous_work_shift == SHIFT_AFTERNOON
-                    or (across_offduty and previous_work_shift == SHIFT_MORNING)
-                ):
-                    return f"Wrong shift order for firefighter {i} on day {d} ({previous_work_shift} -> {shift})"
-                if shift == SHIFT_NIGHT and (
-                    previous_work_shift == SHIFT_MORNING
-                    or (across_offduty and previous_work_shift == SHIFT_NIGHT)
-                ):
-                    return f"Wrong shift order for firefighter {i} on day {d} ({previous_work_shift} -> {shift})"
-                if shift == SHIFT_AFTERNOON and (
-                    previous_work_shift == SHIFT_NIGHT
-                    or (across_offduty and previous_work_shift == SHIFT_AFTERNOON)
-                ):
-                    return f"Wrong shift order for firefighter {i} on day {d} ({previous_work_shift} -> {shift})"
-                previous_work_shift = shift
-                across_offduty = False
-
         return None
 
     def cost(self, schedule, costs):
         """
         Returns the cost associated with the specified schedule for the specified cost function.
+        [costs] is either a CostTable or the result of `read_costs`.
         """
+        instrumentation.count("problem.cost_evaluations")
+        if isinstance(costs, CostTable):
+            nb_days = self._nb_weeks * DAYS_PER_WEEK
+            return sum(
+                costs.row_cost(i, schedule[i][:nb_days])
+                for i in range(self._nb_firefighters)
+            )
         result = 0
         for i in range(self._nb_firefighters):
             for d in range(self._nb_weeks * DAYS_PER_WEEK):
@@ -235,6 +308,124 @@ class SchedulingProblem:
             print(schedule[i][0 : self._nb_weeks * DAYS_PER_WEEK])
 
 
+class RowValidator:
+    """
+    Checks in a single pass whether a row (the schedule of a single firefighter) satisfies all the constraints
+    of a [SchedulingProblem] that only involve a single firefighter (C0-C6 and C8).
+    This is equivalent to `SchedulingProblem.row_violation(i, row) is None`, but much faster.
+
+    Constraints C3, C4, C5 and C8 are checked by a finite automaton generated from the parameters of the problem.
+    A state records the last shift, the length of the current sequence of this shift,
+    the length of the current sequence of work days, and the last work shift.
+    The transitions are stored in a table indexed by the state and the byte of the next shift.
+
+    The row is cyclic, so the scan starts on a day that starts a sequence of work days
+    (which also starts a sequence of the same shift and ends a sequence of off-duty days),
+    goes through all the days, and reads the first day again to close the last sequences.
+    """
+
+    REJECT = 0
+    START = 1
+
+    def __init__(self, prob: "SchedulingProblem") -> None:
+        self._prob = prob
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self._saturdays = [5 + DAYS_PER_WEEK * w for w in range(prob._nb_weeks)]
+        self._build_table()
+
+    def _next(self, state, shift):
+        """
+        Returns the state reached from [state] when reading [shift], or None if a constraint is violated.
+        """
+        prob = self._prob
+        last, length, work_length, previous_work = state
+        if shift == SHIFT_OFFDUTY:
+            if last == SHIFT_OFFDUTY:
+                if length + 1 > prob._max_nb_consecutive_off_days:
+                    return None
+                return (SHIFT_OFFDUTY, length + 1, 0, previous_work)
+            if last is not None and (
+                length < prob._min_nb_consecutive_days
+                or work_length < prob._min_nb_consecutive_work_days
+            ):
+                return None
+            return (SHIFT_OFFDUTY, 1, 0, last)
+
+        if last == SHIFT_OFFDUTY:
+            if length < prob._min_nb_consecutive_off_days:
+                return None
+            if previous_work is not None and shift != prob._shift_order[previous_work]:
+                return None
+            return (shift, 1, 1, shift)
+        if last is None:
+            return (shift, 1, 1, shift)
+        if work_length + 1 > prob._max_nb_consecutive_work_days:
+            return None
+        if shift == last:
+            if length + 1 > prob._max_nb_consecutive_days:
+                return None
+            return (shift, length + 1, work_length + 1, shift)
+        if length < prob._min_nb_consecutive_days or shift != prob._shift_order[last]:
+            return None
+        return (shift, 1, work_length + 1, shift)
+
+    def _build_table(self):
+        """
+        Enumerates the reachable states and fills the transition table.
+        Unknown bytes lead to the absorbing state REJECT.
+        """
+        start = (None, 0, 0, None)
+        ids = {start: self.START}
+        states = [None, start]
+        self._table = [[self.REJECT] * 256, None]
+        k = 1
+        while k < len(states):
+            transitions = [self.REJECT] * 256
+            for shift in SHIFTS:
+                target = self._next(states[k], shift)
+                if target is None:
+                    continue
+                if target not in ids:
+                    ids[target] = len(states)
+                    states.append(target)
+                    self._table.append(None)
+                transitions[ord(shift)] = ids[target]
+            self._table[k] = transitions
+            k += 1
+
+    def is_valid(self, row: str) -> bool:
+        """
+        Indicates whether [row] satisfies the constraints that only involve a single firefighter.
+        """
+        nb_days = self._nb_days
+        if len(row) < nb_days:
+            return False
+        row = row[:nb_days]
+        if row.count(SHIFT_OFFDUTY) != self._prob._nb_off_duty_days:
+            return False
+        if not any(
+            row[d] == SHIFT_OFFDUTY and row[d + 1] == SHIFT_OFFDUTY
+            for d in self._saturdays
+        ):
+            return False
+
+        # Find the start of a sequence of work days
+        start = -1
+        for d in range(nb_days):
+            if row[d - 1] == SHIFT_OFFDUTY and row[d] != SHIFT_OFFDUTY:
+                start = d
+                break
+        if start < 0:
+            # Degenerate rows (only off-duty days, or no off-duty day)
+            return self._prob.row_violation(0, row) is None
+
+        table = self._table
+        state = self.START
+        for b in (row[start:] + row[: start + 1]).encode():
+            state = table[state][b]
+        return state != self.REJECT
+
+
 def save_schedule(schedule, dir="."):
     """
     Saves the specified schedule in the specified directory.
@@ -258,27 +449,46 @@ def load_schedule(filename):
         return list(map(str.strip, f.readlines()))
 
 
+# Names of the files created by `save_schedule`
+SAVED_SCHEDULE_FILENAME = re.compile(r"^\d{4}(_\d{2}){5}(_\d+)?\.sched$")
+
+
+def saved_schedule_filenames(dir="."):
+    """
+    Returns the names of the files created by `save_schedule` in the specified directory,
+    sorted from the oldest to the most recent.
+    """
+    filenames = [f for f in os.listdir(dir) if SAVED_SCHEDULE_FILENAME.match(f)]
+    filenames.sort()
+    return filenames
+
+
 def load_last_schedule(dir="."):
     """
     Loads the last saved schedule from the specified directory.
-    To determine which file to read, this method grabs all the files whose name starts with '2023' and ends with '.sched',
-    then sorts them alphabetically, and chooses the last one.
+    To determine which file to read, this method grabs all the files whose name has been created by `save_schedule`
+    (i.e., a timestamp followed by '.sched'), then sorts them alphabetically, and chooses the last one.
     If you want to make copies of your existing files,
-    make sure that the name of these copies do not start with '2023'
+    make sure that the name of these copies do not look like a timestamp
     to avoid unexpected results from this method.
+    Listing the directory gets slower as files accumulate; see `SolutionStore` for long runs.
     """
-    filenames = os.listdir(dir)
-    schedulefilenames = [
-        f for f in filenames if f.startswith("2023") and f.endswith(".sched")
-    ]
-    schedulefilenames.sort(reverse=True)
+    schedulefilenames = saved_schedule_filenames(dir)
     filename = os.path.join(
-        dir, schedulefilenames[0]
+        dir, schedulefilenames[-1]
     )  # Will throw an error if the array is empty
     return load_schedule(filename)
 
 
-def read_costs(prob=SchedulingProblem()):
+def _read_cost_list(filename):
+    """
+    Returns the list of costs stored in the specified cost file.
+    """
+    with open(filename) as f:
+        return [float(c) for c in f.read().split()]
+
+
+def read_costs(prob=SchedulingProblem(), filename="costs.scosts"):
     """
     Reads the cost for each firefighter, day, and shift from the cost file.
     This method first requires you to modify and run `create_costs.py` (you can run that file multiple times).
@@ -286,11 +496,9 @@ def read_costs(prob=SchedulingProblem()):
     For instance, firefighter 5 being scheduled to work during day 16 in the Morning shift
     induces the cost `read_costs()[5][16%7][SHIFT_MORNING].
     The cost is only defined for the work shift (in other words, the cost for SHIFT_OFFDUTY is 0).
+    See `read_cost_table` for a more compact representation.
     """
-    cost_list = []
-    with open("costs.scosts") as f:
-        line = f.readline()
-        cost_list = [float(f) for f in re.findall("0\.\d*", line)]
+    cost_list = _read_cost_list(filename)
 
     costs = []
     k = 0
@@ -306,4 +514,123 @@ def read_costs(prob=SchedulingProblem()):
     return costs
 
 
+def read_cost_table(prob=SchedulingProblem(), filename="costs.scosts"):
+    """
+    Reads the costs from the specified cost file (see `read_costs`) into a CostTable.
+    """
+    cost_list = _read_cost_list(filename)
+    values = np.zeros((prob._nb_firefighters, DAYS_PER_WEEK, len(SHIFT_CODES)))
+    k = 0
+    for i in range(prob._nb_firefighters):
+        for d in range(DAYS_PER_WEEK):
+            for shift_type in [SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT]:
+                values[i, d, SHIFT_CODES[shift_type]] = cost_list[k]
+                k += 1
+    return CostTable(values)
+
+
+class CostTable:
+    """
+    Dense table of costs.
+    [values] is a contiguous float array such that values[i][d][SHIFT_CODES[shift]] is the cost
+    for firefighter i to perform [shift] on a day d of the week (the cost of SHIFT_OFFDUTY is 0).
+
+    The cost of a row (the schedule of a single firefighter) is computed with plain list indexing
+    and cached, since the same rows keep appearing during the search.
+    """
+
+    MAX_CACHED_ROWS = 1 << 18
+    MAX_CACHED_MATRICES = 4
+
+    def __init__(self, values: np.ndarray) -> None:
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self._nb_firefighters = self.values.shape[0]
+        # byte_costs[i][d][b] is the cost for firefighter i to perform the shift whose character has code b
+        # on day d of the week; this avoids hashing the shifts when computing the cost of a row.
+        self._byte_costs = []
+        for i in range(self._nb_firefighters):
+            firefighter_costs = []
+            for d in range(DAYS_PER_WEEK):
+                day_costs = [0.0] * 256
+                for shift, code in SHIFT_CODES.items():
+                    day_costs[ord(shift)] = float(self.values[i, d, code])
+                firefighter_costs.append(day_costs)
+            self._byte_costs.append(firefighter_costs)
+        self._row_costs = {}
+        self._matrices = {}
+
+    @classmethod
+    def from_costs(cls, costs) -> "CostTable":
+        """
+        Returns the CostTable equivalent to the specified result of `read_costs`.
+        """
+        values = np.zeros((len(costs), DAYS_PER_WEEK, len(SHIFT_CODES)))
+        for i, firefighter_costs in enumerate(costs):
+            for d, day_costs in enumerate(firefighter_costs):
+                for shift, cost in day_costs.items():
+                    values[i, d, SHIFT_CODES[shift]] = cost
+        return cls(values)
+
+    def cell_cost(self, i: int, d: int, shift: str) -> float:
+        """
+        Returns the cost for firefighter [i] to perform [shift] on day [d].
+        """
+        return self._byte_costs[i][d % DAYS_PER_WEEK][ord(shift)]
+
+    def row_cost(self, i: int, row: str) -> float:
+        """
+        Returns the cost of [row] when it is the schedule of firefighter [i].
+        Every character of [row] is taken into account; characters that are not shifts cost nothing.
+        """
+        key = (i, row)
+        result = self._row_costs.get(key)
+        if result is None:
+            firefighter_costs = self._byte_costs[i]
+            result = 0
+            for d, b in enumerate(row.encode()):
+                result += firefighter_costs[d % DAYS_PER_WEEK][b]
+            if len(self._row_costs) >= self.MAX_CACHED_ROWS:
+                self._row_costs.clear()
+            self._row_costs[key] = result
+        return result
+
+    def row_cost_matrix(self, rows: Sequence[str], cache: bool = True) -> np.ndarray:
+        """
+        Returns the array M of shape (nb firefighters, len([rows])) such that
+        M[i][r] is the cost of [rows][r] when it is the schedule of firefighter i.
+        All the rows must have the same length.
+        If [cache] is True, the matrix is remembered for the next calls with the same rows
+        (at most MAX_CACHED_MATRICES matrices are remembered).
+        """
+        key = tuple(rows)
+        if cache and key in self._matrices:
+            return self._matrices[key]
+
+        # Characters that are not shifts get the index nb_cells, which is dropped below
+        nb_shifts = self.values.shape[2]
+        nb_cells = DAYS_PER_WEEK * nb_shifts
+        codes = np.full(256, nb_cells, dtype=np.intp)
+        for shift, code in SHIFT_CODES.items():
+            codes[ord(shift)] = code
+        nb_days = len(rows[0]) if rows else 0
+        data = np.frombuffer("".join(rows).encode(), dtype=np.uint8)
+        row_codes = codes[data].reshape(len(rows), nb_days)
+        weekdays = np.arange(nb_days) % DAYS_PER_WEEK
+        cells = np.where(
+            row_codes < nb_cells, weekdays[None, :] * nb_shifts + row_codes, nb_cells
+        )
+        # counts[r][w * nb_shifts + s] is the number of days of row r that are on weekday w with shift s
+        offsets = np.arange(len(rows))[:, None] * (nb_cells + 1)
+        counts = np.bincount(
+            (offsets + cells).ravel(), minlength=len(rows) * (nb_cells + 1)
+        ).reshape(len(rows), nb_cells + 1)[:, :nb_cells]
+        result = self.values.reshape(self._nb_firefighters, nb_cells) @ counts.T
+
+        if cache:
+            if len(self._matrices) >= self.MAX_CACHED_MATRICES:
+                self._matrices.clear()
+            self._matrices[key] = result
+        return result
+
+
 # eof
@@ -0,0 +1,195 @@
+import csv
+import json
+import time
+from typing import Dict, Iterable, List, Tuple
+
+# Suffixes of the counters of feasibility checks, used to compute pass rates
+CHECKS = ".feasibility_checks"
+PASSED = ".feasible"
+
+
+class _Timer:
+    """
+    Context manager that adds the time spent in its block to a timer of an [Instrumentation].
+    """
+
+    __slots__ = ("_instrumentation", "_name", "_start")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str) -> None:
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._instrumentation.add_time(self._name, time.perf_counter() - self._start)
+
+
+class _NullTimer:
+    """
+    Context manager that does nothing, used when the instrumentation is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Instrumentation:
+    """
+    Counters and timers of a search, identified by names such as "ChangOneDayNeighbourhood.candidates"
+    or "lns.solve".
+
+    * Counters count events (candidates generated, feasibility checks, cost evaluations, etc.).
+    * Timers accumulate the time spent in a block and the number of times the block was executed.
+    * Improvements accumulate the decrease of cost obtained by a neighbourhood or a phase;
+      divided by the time of the timer with the same name, they give the improvement per second.
+
+    The instrumentation is disabled by default: the methods then return immediately,
+    and code in a hot loop can test [enabled] before computing what it records.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        self._counters: Dict[str, int] = {}
+        self._times: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self._improvements: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def check(self, name: str, feasible: bool) -> None:
+        """
+        Records a feasibility check whose result is [feasible].
+        """
+        if self.enabled:
+            self.count(name + CHECKS)
+            if feasible:
+                self.count(name + PASSED)
+
+    def timer(self, name: str):
+        """
+        Returns a context manager that measures the time spent in its block.
+        """
+        if self.enabled:
+            return _Timer(self, name)
+        return _NULL_TIMER
+
+    def add_time(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            self._times[name] = self._times.get(name, 0.0) + seconds
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    def improvement(self, name: str, decrease: float) -> None:
+        """
+        Records that the cost decreased by [decrease] thanks to [name].
+        """
+        if self.enabled:
+            self._improvements[name] = self._improvements.get(name, 0.0) + decrease
+
+    def counted(self, iterable: Iterable, name: str) -> Iterable:
+        """
+        Returns [iterable], counting its elements in counter [name] if the instrumentation is enabled.
+        """
+        if not self.enabled:
+            return iterable
+        return self._counted(iterable, name)
+
+    def _counted(self, iterable: Iterable, name: str) -> Iterable:
+        counters = self._counters
+        for element in iterable:
+            counters[name] = counters.get(name, 0) + 1
+            yield element
+
+    def summary(self) -> Dict:
+        """
+        Returns all the measures, together with the pass rates of the feasibility checks
+        and the improvements per second.
+        """
+        pass_rates = {}
+        for name, nb in self._counters.items():
+            if name.endswith(CHECKS) and nb > 0:
+                prefix = name[: -len(CHECKS)]
+                pass_rates[prefix] = self._counters.get(prefix + PASSED, 0) / nb
+        improvements = {}
+        for name, decrease in self._improvements.items():
+            seconds = self._times.get(name, 0.0)
+            improvements[name] = {
+                "total": decrease,
+                "per_second": decrease / seconds if seconds > 0 else None,
+            }
+        return {
+            "elapsed": time.perf_counter() - self._start,
+            "counters": dict(self._counters),
+            "timers": {
+                name: {"calls": self._calls[name], "seconds": seconds}
+                for name, seconds in self._times.items()
+            },
+            "pass_rates": pass_rates,
+            "improvements": improvements,
+        }
+
+    def rows(self) -> List[Tuple[str, str, float]]:
+        """
+        Returns the measures as rows (name, measure, value).
+        """
+        summary = self.summary()
+        result = [("run", "elapsed", summary["elapsed"])]
+        for name, nb in summary["counters"].items():
+            result.append((name, "count", nb))
+        for name, timer in summary["timers"].items():
+            result.append((name, "calls", timer["calls"]))
+            result.append((name, "seconds", timer["seconds"]))
+        for name, rate in summary["pass_rates"].items():
+            result.append((name, "pass_rate", rate))
+        for name, improvement in summary["improvements"].items():
+            result.append((name, "improvement", improvement["total"]))
+            if improvement["per_second"] is not None:
+                result.append(
+                    (name, "improvement_per_second", improvement["per_second"])
+                )
+        return result
+
+    def to_json(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_csv(self, filename: str) -> None:
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("name", "measure", "value"))
+            writer.writerows(self.rows())
+
+    def save(self, filename: str) -> None:
+        """
+        Saves the measures in [filename], in CSV if its extension is .csv and in JSON otherwise.
+        """
+        if filename.endswith(".csv"):
+            self.to_csv(filename)
+        else:
+            self.to_json(filename)
+
+
+# Instrumentation shared by the modules of the search
+instrumentation = Instrumentation()
+
+
+# eof
@@ -1,13 +1,27 @@
 from random import randint
-from pulp import PULP_CBC_CMD
+from sys import argv
+from pulp import PULP_CBC_CMD, LpSolutionOptimal, LpStatusInfeasible, LpStatusOptimal
 import firefighter
 from model import ModelBuilder
+from create_instance import load_instance
+from solution_store import SolutionStore
+from instrumentation import instrumentation
+from alns import ALNS
+from repair_cache import RepairCache
+
+
+# Outcomes of the solve of a repair (see solve_repair)
+REPAIR_OPTIMAL = "optimal"  # the repaired schedule is optimal for the destroyed cells
+REPAIR_CUTOFF = "cutoff"  # no schedule is cheaper than the incumbent
+REPAIR_LIMITED = "limited"  # the solve stopped at the time limit or at the gap
+REPAIR_FAILED = "failed"  # the solve did not find a schedule
+# Outcomes that do not depend on the limits of the solve, so they can be reused (see RepairCache)
+PROVEN_REPAIRS = (REPAIR_OPTIMAL, REPAIR_CUTOFF)
 
 
 def destroy1(schedule: list) -> list:
     random_firefighter_index = randint(0, len(schedule) - 1)
     schedule[random_firefighter_index] = "0"   # Clear the schedule for that firefighter
-    print(f"the {random_firefighter_index} firefighter schedule is destroyed")
     return schedule
 
 
@@ -42,60 +56,179 @@ def destroy(schedule: list, x: int) -> list:
     return schedule
 
 
-def repair(schedule, prob, costs):
-    mb = ModelBuilder(prob)
-    model = mb.build_model(costs)
-
-    for i in range(len(schedule)):
-        if schedule[i] != "0":
-            for d in range(prob._nb_weeks * 7):
-                shift = schedule[i][d]
-                model += (mb._choices[i][d][shift] == 1)
-    # Solve the model with the new constraints
-    res = model.solve(PULP_CBC_CMD(msg=False))
-    if res != 1:
-        print('No solution found after repair')
-        return schedule  # Return the original schedule if no solution is found
-    # Extract the repaired solution with the new constraints
-    repaired_solution = mb.extract_solution()
-
+def repair(schedule, prob, costs, mb=None, model=None, time_limit=None, incumbent=None, gap=None, cache=None):
+    # A repair already performed with the same destroyed cells and the same other cells is not solved again
+    if cache is not None:
+        cached = cache.get(schedule, incumbent)
+        if cached is not None:
+            instrumentation.count("lns.cache_hits")
+            return cached
+        instrumentation.count("lns.cache_misses")
+    repaired_solution, status = solve_repair(schedule, prob, costs, mb, model, time_limit, incumbent, gap)
+    # The outcome of a solve stopped by its limits could be improved by a longer solve, so it is not memoised
+    if cache is not None and status in PROVEN_REPAIRS:
+        cache.add(schedule, incumbent, repaired_solution)
     return repaired_solution
 
 
-if __name__ == '__main__':
+def solve_repair(schedule, prob, costs, mb=None, model=None, time_limit=None, incumbent=None, gap=None):
+    # Returns the repaired schedule together with the outcome of the solve (REPAIR_OPTIMAL, REPAIR_CUTOFF,
+    # REPAIR_LIMITED or REPAIR_FAILED)
+    if mb is None:
+        mb = ModelBuilder(prob)
+    full = model is not None
+    if full:
+        # The full model built by mb (a ModelBuilder) is reused:
+        # fix the rows that are not destroyed through the bounds of their variables
+        with instrumentation.timer("lns.fix_rows"):
+            mb.fix_rows(schedule)
+    else:
+        # Build a model with variables for the destroyed cells only
+        with instrumentation.timer("lns.build_model"):
+            model = mb.build_subproblem(costs, schedule)
+    # The incumbent (the schedule before it was destroyed) is a solution of the model: it is given to CBC as a
+    # starting solution, and the solutions that are not better are cut off
+    options = []
+    if incumbent is not None:
+        mb.set_start(incumbent, subproblem=not full)
+        incumbent_objective = model.objective.value()
+        options.append(f"cutoff {incumbent_objective + 1e-6}")
+    # Solve the model, in at most time_limit seconds and up to a relative gap if they are specified
+    with instrumentation.timer("lns.solve"):
+        res = model.solve(PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=gap, warmStart=incumbent is not None,
+                                       options=options))
+    # With a relative gap, neither the optimality nor the infeasibility under the cutoff is proven
+    limited = gap is not None and gap > 0
+    if res != LpStatusOptimal:
+        if incumbent is not None and res == LpStatusInfeasible:
+            # The incumbent is a solution of the model, so it is only infeasible because of the cutoff:
+            # no schedule is cheaper than the incumbent
+            instrumentation.count("lns.cutoff_repairs")
+            status = REPAIR_LIMITED if limited else REPAIR_CUTOFF
+        else:
+            instrumentation.count("lns.failed_repairs")
+            status = REPAIR_FAILED
+        # Return the incumbent (or the original schedule) if no solution is found
+        return (schedule if incumbent is None else incumbent), status
+    # CBC reports a solve stopped at the time limit with a solution as optimal, but not its solution
+    if limited or model.sol_status != LpSolutionOptimal:
+        status = REPAIR_LIMITED
+    elif incumbent is not None and model.objective.value() > incumbent_objective - 1e-6:
+        # The cutoff lets the incumbent through, so CBC usually proves that the incumbent is optimal
+        # instead of reporting that the model is infeasible: no schedule is cheaper than the incumbent
+        instrumentation.count("lns.cutoff_repairs")
+        return incumbent, REPAIR_CUTOFF
+    else:
+        status = REPAIR_OPTIMAL
+    # Extract the repaired solution
+    with instrumentation.timer("lns.extract"):
+        if full:
+            repaired_solution = mb.extract_solution()
+        else:
+            repaired_solution = mb.extract_subsolution()
 
-    # Load the initial schedule from example.sched
-    schedule = firefighter.load_schedule("example.sched")
-    firefighter.save_schedule(schedule)
+    return repaired_solution, status
 
-    # Initialize the problem and costs
-    prob = firefighter.SchedulingProblem()
-    costs = firefighter.read_costs(prob)
+
+if __name__ == '__main__':
+    # With --stats=FILE, counters and timers are saved in FILE (CSV if it ends with .csv, JSON otherwise)
+    stats_file = next((arg[len("--stats="):] for arg in argv if arg.startswith("--stats=")), None)
+    instrumentation.enable(stats_file is not None)
+    # With --alns, the destroy operators of alns.py are chosen adaptively (see ALNS)
+    adaptive = "--alns" in argv
+    # With --workers=N, N repairs run at the same time in a pool of processes (see ParallelLNS);
+    # with --solve-time=SECONDS, each solve is stopped after SECONDS
+    nb_workers = next((int(arg[len("--workers="):]) for arg in argv if arg.startswith("--workers=")), None)
+    solve_time_limit = next((float(arg[len("--solve-time="):]) for arg in argv if arg.startswith("--solve-time=")),
+                            None)
+    # With --gap=FRACTION, each solve stops when its relative gap is below FRACTION
+    gap = next((float(arg[len("--gap="):]) for arg in argv if arg.startswith("--gap=")), None)
+    # The repairs are memoised (see RepairCache), unless --no-cache is specified
+    use_cache = "--no-cache" not in argv
+    args = [arg for arg in argv[1:] if not arg.startswith("--")]
+
+    if len(args) > 0:
+        # Load a scaled instance created with create_instance.py
+        prob, costs, schedule = load_instance(args[0])
+        store = SolutionStore(f"{args[0]}.lns.log")
+    else:
+        # Load the initial schedule from example.sched
+        schedule = firefighter.load_schedule("example.sched")
+
+        # Initialize the problem and costs
+        prob = firefighter.SchedulingProblem()
+        costs = firefighter.read_cost_table(prob)
+        store = SolutionStore("lns.log")
+        if len(store) == 0:
+            # The first run with the store resumes from the schedules saved by save_schedule (if there are some)
+            store.import_schedules(prob, costs)
+
+    # Initialize current solution, resuming from the best solution of a previous run if there is one
+    if len(store) > 0:
+        current_solution = store.best()
+    else:
+        current_solution = schedule
+    current_cost = prob.cost(current_solution, costs)
+    store.add(current_solution, current_cost)
 
     # Set the number of iterations
     max_iterations = 20
 
-    for iteration in range(max_iterations):
+    # By default, each repair builds a model for the destroyed cells only (see ModelBuilder.build_subproblem);
+    # with --full, the model of the whole problem is built once and each repair only changes the bounds of its
+    # variables
+    mb = ModelBuilder(prob)
+    model = None
+    cache = RepairCache(prob, costs) if use_cache else None
+    if "--full" in argv:
+        with instrumentation.timer("lns.build_model"):
+            model = mb.build_model(costs)
+
+    if nb_workers is not None:
+        # Imported here since parallel_lns uses repair
+        from parallel_lns import ParallelLNS
+        alns = ParallelLNS(prob, costs, current_solution, nb_workers=nb_workers, solve_time_limit=solve_time_limit,
+                           gap=gap, store=store, cache=cache)
+    elif adaptive:
+        alns = ALNS(prob, costs, current_solution,
+                    lambda destroyed: repair(destroyed, prob, costs, mb, model, solve_time_limit, alns.current, gap,
+                                             cache),
+                    store=store)
+    if nb_workers is not None or adaptive:
+        current_solution, current_cost = alns.run(max_iterations)
+        for stats in alns.selection.statistics():
+            print(f"{stats['name']}: {stats['calls']} repairs, {stats['successes']} improvements, "
+                  f"{stats['time_share']:.1%} of the time, improvement {stats['improvement']:.3f}")
+        max_iterations = 0
 
-        current_solution = firefighter.load_last_schedule()
-        current_cost = prob.cost(current_solution, costs)
+    for iteration in range(max_iterations):
 
-        print(f"The {iteration}th iteration")
-        # Destroy part of the current solution
-        destroyed_solution = destroy(current_solution, 3)
+        instrumentation.count("lns.iterations")
+        # Destroy part of (a copy of) the current solution
+        with instrumentation.timer("lns.destroy"):
+            destroyed_solution = destroy(current_solution[:], 3)
 
         # Repair the destroyed solution
-        repaired_solution = repair(destroyed_solution, prob, costs)
+        with instrumentation.timer("lns.repair"):
+            repaired_solution = repair(destroyed_solution, prob, costs, mb, model, solve_time_limit, current_solution,
+                                       gap, cache)
 
         # Evaluate the repaired solution
         repaired_cost = prob.cost(repaired_solution, costs)
 
-        # If the repaired solution is better than the current solution, update it
-        if repaired_cost < current_cost:
+        # If the repaired solution is feasible (the repair may fail) and better than the current solution, update it
+        if repaired_cost < current_cost and prob.is_feasible(repaired_solution) is None:
+            instrumentation.improvement("lns.repair", current_cost - repaired_cost)
             current_solution = repaired_solution
             current_cost = repaired_cost
-            firefighter.save_schedule(current_solution)
-
+            store.add(current_solution, current_cost)
+
+    store.close()
+    if cache is not None:
+        cache_stats = cache.statistics()
+        print(f"Repair cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    if stats_file is not None:
+        instrumentation.save(stats_file)
     feasibility = prob.is_feasible(current_solution)
     if not feasibility:
         # Save the final schedule
@@ -6,9 +6,13 @@ from firefighter import (
     SHIFT_MORNING,
     SHIFT_NIGHT,
     SHIFT_OFFDUTY,
+    CostTable,
     SchedulingProblem,
 )
 
+# Character of a destroyed cell in a row of a destroyed schedule (see `ModelBuilder.fix_rows`)
+FREE_CELL = "?"
+
 
 class ModelBuilder:
     """
@@ -29,12 +33,25 @@ class ModelBuilder:
             "Choice", (self._firefighters, self._days, self._shifts), cat="Binary"
         )
 
-    def min_number_of_consecutive_days_in_shifts(self, i, shifts, d, m, model):
+    def _add(self, model, constraint):
+        """
+        Adds [constraint] to [model], unless it does not contain any variable
+        (in a subproblem, the constraints that only concern fixed cells are satisfied by the fixed schedule).
+        """
+        if len(constraint) > 0:
+            model += constraint
+
+    def min_number_of_consecutive_days_in_shifts(
+        self, i, shifts, d, m, model, choices=None
+    ):
         """
         Adds to [model] the constraints that guarantee that
         if [d] is the start of a sequence of days in which firefighter [i] performs shifts from [shifts],
         then this firefighter performs a shift from [shifts] from day [d] until day [d+m-1]
+        [choices] are the variables of the model (by default, those of `build_model`).
         """
+        if choices is None:
+            choices = self._choices
         start = d + self._nb_days  # Will avoid issues when talking about d-1
 
         # The constraint can be written as follows:
@@ -46,125 +63,186 @@ class ModelBuilder:
         # # # Sum_{s in shift} ( choice[i][d-1][s] + choice[i][d+x][s] - choice[i][d][s] ) >= 0
         # (i.e., choice[i][d][s] should not be the only one evaluating to 1).
         for x in range(1, m):
-            model += (
+            self._add(
+                model,
                 lpSum(
-                    [
-                        self._choices[i][(start - 1) % self._nb_days][shift]
-                        for shift in shifts
-                    ]
+                    [choices[i][(start - 1) % self._nb_days][shift] for shift in shifts]
                 )
                 + lpSum(
-                    [
-                        self._choices[i][(start + x) % self._nb_days][shift]
-                        for shift in shifts
-                    ]
+                    [choices[i][(start + x) % self._nb_days][shift] for shift in shifts]
                 )
                 - lpSum(
-                    [
-                        self._choices[i][(start) % self._nb_days][shift]
-                        for shift in shifts
-                    ]
+                    [choices[i][(start) % self._nb_days][shift] for shift in shifts]
                 )
-                >= 0
+                >= 0,
             )
 
-    def max_number_of_consecutive_days_in_shifts(self, i, shifts, d, m, model):
+    def max_number_of_consecutive_days_in_shifts(
+        self, i, shifts, d, m, model, choices=None
+    ):
         """
         Adds to [model] the constraint that guarantees
         that there isn't a consecutive sequence of [m]+1 days starting in [m]
         in which firefighter [i] always performs shifts from the specified set.
+        [choices] are the variables of the model (by default, those of `build_model`).
         """
+        if choices is None:
+            choices = self._choices
         start = d + self._nb_days  # Will avoid issues when talking about day - xxx
 
         # The constraint can be written as follows:
         # Sum_{dd in [d,d+m], s in shifts} choice[i][dd][s] <= m (in other words, not m+1).
-        model += (
+        self._add(
+            model,
             lpSum(
                 [
-                    self._choices[i][(d + j) % self._nb_days][s]
+                    choices[i][(d + j) % self._nb_days][s]
                     for j in range(m + 1)
                     for s in shifts
                 ]
             )
-            <= m
+            <= m,
         )
 
-    def build_model(self, costs):
+    def _add_row_constraints(self, model, i, choices):
         """
-        Returns a pulp model that contains the constraints for a solution
+        Adds to [model] the constraints C1 to C6 and C8, which only concern the schedule of firefighter [i],
+        where choices[i][d][shift] is either a variable or a constant (0 or 1).
+        Returns the variables of C6, indexed by saturday.
         """
-        model = LpProblem()
-
         # c1
-        for i in self._firefighters:
-            for d in self._days:
-                model += lpSum([self._choices[i][d][s] for s in self._shifts]) == 1
+        for d in self._days:
+            self._add(model, lpSum([choices[i][d][s] for s in self._shifts]) == 1)
 
         # c2
-        for i in self._firefighters:
-            model += (
-                lpSum([self._choices[i][d][SHIFT_OFFDUTY] for d in self._days])
-                == self._prob._nb_off_duty_days
-            )
+        self._add(
+            model,
+            lpSum([choices[i][d][SHIFT_OFFDUTY] for d in self._days])
+            == self._prob._nb_off_duty_days,
+        )
 
         # c3
-        for i in self._firefighters:
-            for shift_type in {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}:
-                for day in self._days:
-                    self.min_number_of_consecutive_days_in_shifts(
-                        i, {shift_type}, day, self._prob._min_nb_consecutive_days, model
-                    )
-                    self.max_number_of_consecutive_days_in_shifts(
-                        i, {shift_type}, day, self._prob._max_nb_consecutive_days, model
-                    )
-
-        # c4
-        for i in self._firefighters:
-            work_shifts = {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}
-            for day in self._days:
-                self.min_number_of_consecutive_days_in_shifts(
-                    i, work_shifts, day, self._prob._min_nb_consecutive_work_days, model
-                )
-                self.max_number_of_consecutive_days_in_shifts(
-                    i, work_shifts, day, self._prob._max_nb_consecutive_work_days, model
-                )
-
-        # c5
-        for i in self._firefighters:
+        for shift_type in {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}:
             for day in self._days:
                 self.min_number_of_consecutive_days_in_shifts(
                     i,
-                    {SHIFT_OFFDUTY},
+                    {shift_type},
                     day,
-                    self._prob._min_nb_consecutive_off_days,
+                    self._prob._min_nb_consecutive_days,
                     model,
+                    choices,
                 )
                 self.max_number_of_consecutive_days_in_shifts(
                     i,
-                    {SHIFT_OFFDUTY},
+                    {shift_type},
                     day,
-                    self._prob._max_nb_consecutive_off_days,
+                    self._prob._max_nb_consecutive_days,
                     model,
+                    choices,
                 )
 
+        # c4
+        work_shifts = {SHIFT_AFTERNOON, SHIFT_MORNING, SHIFT_NIGHT}
+        for day in self._days:
+            self.min_number_of_consecutive_days_in_shifts(
+                i,
+                work_shifts,
+                day,
+                self._prob._min_nb_consecutive_work_days,
+                model,
+                choices,
+            )
+            self.max_number_of_consecutive_days_in_shifts(
+                i,
+                work_shifts,
+                day,
+                self._prob._max_nb_consecutive_work_days,
+                model,
+                choices,
+            )
+
+        # c5
+        for day in self._days:
+            self.min_number_of_consecutive_days_in_shifts(
+                i,
+                {SHIFT_OFFDUTY},
+                day,
+                self._prob._min_nb_consecutive_off_days,
+                model,
+                choices,
+            )
+            self.max_number_of_consecutive_days_in_shifts(
+                i,
+                {SHIFT_OFFDUTY},
+                day,
+                self._prob._max_nb_consecutive_off_days,
+                model,
+                choices,
+            )
+
         # c6
-        for i in self._firefighters:
-            weekend_vars = []
-            for saturday in self._saturdays:
-                # Over weekend is 1 iff off duty for an entire weekend
-                over_weekend = LpVariable(f"w_{i}_{saturday}", cat="Binary")
-                model += over_weekend <= self._choices[i][saturday][SHIFT_OFFDUTY]
-                model += over_weekend <= self._choices[i][saturday + 1][SHIFT_OFFDUTY]
-                model += (
-                    over_weekend
-                    >= self._choices[i][saturday][SHIFT_OFFDUTY]
-                    + self._choices[i][saturday + 1][SHIFT_OFFDUTY]
-                    - 1
-                )
-                weekend_vars.append(over_weekend)
+        weekend_vars = {}
+        for saturday in sorted(self._saturdays):
+            # Over weekend is 1 iff off duty for an entire weekend
+            over_weekend = LpVariable(f"w_{i}_{saturday}", cat="Binary")
+            model += over_weekend <= choices[i][saturday][SHIFT_OFFDUTY]
+            model += over_weekend <= choices[i][saturday + 1][SHIFT_OFFDUTY]
+            model += (
+                over_weekend
+                >= choices[i][saturday][SHIFT_OFFDUTY]
+                + choices[i][saturday + 1][SHIFT_OFFDUTY]
+                - 1
+            )
+            weekend_vars[saturday] = over_weekend
+
+        # Firefighter must work over at least one weekend
+        model += lpSum(weekend_vars.values()) >= 1
 
-            # Firefighter must work over at least one weekend
-            model += lpSum(weekend_vars) >= 1
+        # c8
+        # Cannot have shift1@t, shift2@(t+1), ..., shift2@(t+k), shift3@(t+k+1) in this order.
+        # This is modelled by saying that the sum of these things is at most k+1 (out of k+2 elements)
+        # Notice that k is limited by the max length of shift2 (here SHIFT_OFF)
+        for d in self._days:
+            for shift1, shift2, shift3 in [
+                (SHIFT_MORNING, SHIFT_OFFDUTY, SHIFT_NIGHT),
+                (SHIFT_AFTERNOON, SHIFT_OFFDUTY, SHIFT_MORNING),
+                (SHIFT_NIGHT, SHIFT_OFFDUTY, SHIFT_AFTERNOON),
+                (SHIFT_MORNING, SHIFT_OFFDUTY, SHIFT_MORNING),
+                (SHIFT_AFTERNOON, SHIFT_OFFDUTY, SHIFT_AFTERNOON),
+                (SHIFT_NIGHT, SHIFT_OFFDUTY, SHIFT_NIGHT),
+            ]:
+                for k in range(self._prob._max_nb_consecutive_off_days + 1):
+                    if k == 0 and shift1 == shift3:
+                        continue
+
+                    self._add(
+                        model,
+                        choices[i][d][shift1]
+                        + choices[i][(d + k + 1) % self._nb_days][shift3]
+                        + lpSum(
+                            [
+                                choices[i][(d + j) % self._nb_days][shift2]
+                                for j in range(1, k + 1)
+                            ]
+                        )
+                        <= k + 1,
+                    )
+
+        return weekend_vars
+
+    def build_model(self, costs):
+        """
+        Returns a pulp model that contains the constraints for a solution.
+        [costs] is either a CostTable or the result of `read_costs`.
+        """
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        model = LpProblem()
+        self._weekend_vars = {}
+
+        # c1 to c6 and c8
+        for i in self._firefighters:
+            self._weekend_vars[i] = self._add_row_constraints(model, i, self._choices)
 
         # c7
         for shift_type, min_nb in self._prob._shift_requirements.items():
@@ -174,48 +252,129 @@ class ModelBuilder:
                     >= min_nb
                 )
 
-        # c8
-        # Cannot have shift1@t, shift2@(t+1), ..., shift2@(t+k), shift3@(t+k+1) in this order.
-        # This is modelled by saying that the sum of these things is at most k+1 (out of k+2 elements)
-        # Notice that k is limited by the max length of shift2 (here SHIFT_OFF)
+        # Optimisation function
+        model += lpSum(
+            [
+                costs.cell_cost(i, d, shift) * self._choices[i][d][shift]
+                for i in self._firefighters
+                for d in self._days
+                for shift in self._workshifts
+            ]
+        )
+
+        return model
+
+    def build_subproblem(self, costs, schedule):
+        """
+        Returns a pulp model for the destroyed cells of [schedule]: the rows that are "0" and the days
+        whose shift is FREE_CELL (see `fix_rows`), the other cells being fixed.
+        Only the destroyed cells have variables, only the constraints of the firefighters with destroyed cells
+        are added, and the coverage constraints (C7) only require the shifts that the fixed cells do not cover.
+        The solution is obtained with `extract_subsolution`.
+        [costs] is either a CostTable or the result of `read_costs`.
+        """
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        model = LpProblem()
+
+        # choices[i][d][shift] is a variable for a destroyed cell, and 0 or 1 for a fixed cell
+        self._sub_schedule = list(schedule)
+        self._sub_choices = {}
+        self._sub_weekend_vars = {}
         for i in self._firefighters:
+            row = schedule[i]
+            if row != "0" and FREE_CELL not in row:
+                continue
+            self._sub_choices[i] = [
+                {
+                    shift: (
+                        LpVariable(f"Choice_{i}_{d}_{shift}", cat="Binary")
+                        if row == "0" or row[d] == FREE_CELL
+                        else int(row[d] == shift)
+                    )
+                    for shift in self._shifts
+                }
+                for d in self._days
+            ]
+
+        # c1 to c6 and c8
+        for i in self._sub_choices:
+            self._sub_weekend_vars[i] = self._add_row_constraints(
+                model, i, self._sub_choices
+            )
+
+        # c7: demand that remains once the fixed cells are taken into account
+        for shift_type, min_nb in self._prob._shift_requirements.items():
             for d in self._days:
-                for shift1, shift2, shift3 in [
-                    (SHIFT_MORNING, SHIFT_OFFDUTY, SHIFT_NIGHT),
-                    (SHIFT_AFTERNOON, SHIFT_OFFDUTY, SHIFT_MORNING),
-                    (SHIFT_NIGHT, SHIFT_OFFDUTY, SHIFT_AFTERNOON),
-                    (SHIFT_MORNING, SHIFT_OFFDUTY, SHIFT_MORNING),
-                    (SHIFT_AFTERNOON, SHIFT_OFFDUTY, SHIFT_AFTERNOON),
-                    (SHIFT_NIGHT, SHIFT_OFFDUTY, SHIFT_NIGHT),
-                ]:
-                    for k in range(self._prob._max_nb_consecutive_off_days + 1):
-                        if k == 0 and shift1 == shift3:
-                            continue
-
-                        model += (
-                            self._choices[i][d][shift1]
-                            + self._choices[i][(d + k + 1) % self._nb_days][shift3]
-                            + lpSum(
-                                [
-                                    self._choices[i][(d + j) % self._nb_days][shift2]
-                                    for j in range(1, k + 1)
-                                ]
-                            )
-                            <= k + 1
-                        )
+                fixed = sum(
+                    1
+                    for i in self._firefighters
+                    if i not in self._sub_choices and schedule[i][d] == shift_type
+                )
+                self._add(
+                    model,
+                    lpSum(
+                        [self._sub_choices[i][d][shift_type] for i in self._sub_choices]
+                    )
+                    >= min_nb - fixed,
+                )
 
         # Optimisation function
         model += lpSum(
             [
-                costs[i][d % DAYS_PER_WEEK][shift] * self._choices[i][d][shift]
-                for i in self._firefighters
+                costs.cell_cost(i, d, shift) * choices[d][shift]
+                for i, choices in self._sub_choices.items()
                 for d in self._days
                 for shift in self._workshifts
+                if isinstance(choices[d][shift], LpVariable)
             ]
         )
 
         return model
 
+    def fix_rows(self, schedule):
+        """
+        Fixes the schedule of each firefighter whose row in [schedule] is not "0" to this row,
+        and frees the schedules of the others, through the bounds of the variables.
+        The days of a row whose shift is FREE_CELL are also freed.
+        This allows a model returned by `build_model` to be solved again for another destroyed schedule
+        without being rebuilt.
+        """
+        for i in self._firefighters:
+            row = schedule[i]
+            for d in self._days:
+                for shift in self._shifts:
+                    var = self._choices[i][d][shift]
+                    if row == "0" or row[d] == FREE_CELL:
+                        var.lowBound = 0
+                        var.upBound = 1
+                    else:
+                        var.lowBound = var.upBound = 1 if row[d] == shift else 0
+
+    def set_start(self, schedule, subproblem=False):
+        """
+        Sets the initial values of the variables of the model returned by `build_model`
+        (or by `build_subproblem` if [subproblem] is True) to the solution [schedule],
+        which can then be given to the solver as a starting solution.
+        """
+        if subproblem:
+            choices = self._sub_choices
+            weekend_vars = self._sub_weekend_vars
+        else:
+            choices = self._choices
+            weekend_vars = self._weekend_vars
+        for i in choices:
+            row = schedule[i]
+            for d in self._days:
+                for shift in self._shifts:
+                    choice = choices[i][d][shift]
+                    if isinstance(choice, LpVariable):
+                        choice.setInitialValue(int(row[d] == shift))
+            for saturday, over_weekend in weekend_vars[i].items():
+                over_weekend.setInitialValue(
+                    int(row[saturday] == row[saturday + 1] == SHIFT_OFFDUTY)
+                )
+
     def extract_solution(self):
         """
         Returns the solution computed for the model.
@@ -230,5 +389,22 @@ class ModelBuilder:
             result.append(firefighter_schedule)
         return result
 
+    def extract_subsolution(self):
+        """
+        Returns the solution computed for the model returned by `build_subproblem`:
+        the schedule given to `build_subproblem` where the destroyed cells are replaced.
+        """
+        result = list(self._sub_schedule)
+        for i, choices in self._sub_choices.items():
+            firefighter_schedule = ""
+            for d in self._days:
+                for shift in self._shifts:
+                    choice = choices[d][shift]
+                    value = choice.value() if isinstance(choice, LpVariable) else choice
+                    if value == 1:
+                        firefighter_schedule += shift
+            result[i] = firefighter_schedule
+        return result
+
 
 # eof
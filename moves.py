@@ -0,0 +1,151 @@
+from typing import Dict, Iterable, List, Optional
+
+from firefighter import SHIFT_OFFDUTY
+
+# Kinds of moves:
+# firefighters i and j swap their schedules
+SWAP_ROWS = "swap_rows"
+# firefighter i performs shift [value] on [day]
+CHANGE_DAY = "change_day"
+# firefighters i and j swap their shifts on [day]
+SWAP_DAY = "swap_day"
+# firefighters i and j swap their shifts on days 0 to [day]
+SWAP_PREFIX = "swap_prefix"
+# the [value] off-duty days of firefighter i starting on [day] are removed, then inserted at position j
+MOVE_OFF = "move_off"
+# every work shift of every firefighter is replaced with the next one (see C8)
+ROTATE = "rotate"
+# firefighter i performs schedule [value]
+REPLACE_ROW = "replace_row"
+# each firefighter k performs the current schedule of firefighter [value][k]
+PERMUTE_ROWS = "permute_rows"
+
+_NEXT_SHIFT = {"M": "A", "A": "N", "N": "M", "F": "F"}
+
+
+class Move:
+    """
+    A move of a local search, i.e., a small change of a schedule described by its [kind]
+    (see the constants of this module) and by up to two firefighters [i] and [j], a [day] and a [value].
+
+    Moves are much smaller than the schedules they lead to.
+    `new_rows` returns the rows modified by the move as a dictionary { i1: s1, i2: s2, etc. },
+    which is the format used by `IncrementalChecker`, `DeltaCost` and `PenaltyEvaluator`.
+    `changed_days` returns the days of these rows that the move can modify.
+    `apply` modifies a schedule (a list of rows) in place and `undo` restores it.
+    """
+
+    __slots__ = ("kind", "i", "j", "day", "value", "_old_rows")
+
+    def __init__(
+        self,
+        kind: str,
+        i: int,
+        j: Optional[int] = None,
+        day: Optional[int] = None,
+        value=None,
+    ) -> None:
+        self.kind = kind
+        self.i = i
+        self.j = j
+        self.day = day
+        self.value = value
+        self._old_rows = None
+
+    def __repr__(self) -> str:
+        return f"Move({self.kind}, i={self.i}, j={self.j}, day={self.day}, value={self.value!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Move) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def _key(self) -> tuple:
+        return self.kind, self.i, self.j, self.day, self.value
+
+    def new_rows(self, schedule: List[str]) -> Dict[int, str]:
+        """
+        Returns the rows of [schedule] that are modified by this move, after the move.
+        """
+        kind = self.kind
+        i = self.i
+        if kind == CHANGE_DAY:
+            row = schedule[i]
+            return {i: row[: self.day] + self.value + row[self.day + 1 :]}
+        if kind == SWAP_DAY:
+            row_i = schedule[i]
+            row_j = schedule[self.j]
+            d = self.day
+            return {
+                i: row_i[:d] + row_j[d] + row_i[d + 1 :],
+                self.j: row_j[:d] + row_i[d] + row_j[d + 1 :],
+            }
+        if kind == SWAP_PREFIX:
+            row_i = schedule[i]
+            row_j = schedule[self.j]
+            d = self.day + 1
+            return {i: row_j[:d] + row_i[d:], self.j: row_i[:d] + row_j[d:]}
+        if kind == MOVE_OFF:
+            row = schedule[i]
+            remaining = row[: self.day] + row[self.day + self.value :]
+            return {
+                i: remaining[: self.j]
+                + SHIFT_OFFDUTY * self.value
+                + remaining[self.j :]
+            }
+        if kind == SWAP_ROWS:
+            return {i: schedule[self.j], self.j: schedule[i]}
+        if kind == REPLACE_ROW:
+            return {i: self.value}
+        if kind == PERMUTE_ROWS:
+            return {
+                k: schedule[source]
+                for k, source in enumerate(self.value)
+                if source != k
+            }
+        if kind == ROTATE:
+            return {
+                i: "".join(_NEXT_SHIFT.get(shift, shift) for shift in row)
+                for i, row in enumerate(schedule)
+            }
+        raise ValueError(f"Unknown kind of move: {kind}")
+
+    def changed_days(self) -> Optional[Dict[int, Iterable[int]]]:
+        """
+        Returns the days that this move can modify in each of the rows returned by `new_rows`,
+        as a dictionary { i1: days1, i2: days2, etc. }, or None if it can modify any day of these rows.
+        """
+        kind = self.kind
+        i = self.i
+        if kind == CHANGE_DAY:
+            return {i: (self.day,)}
+        if kind == SWAP_DAY:
+            return {i: (self.day,), self.j: (self.day,)}
+        if kind == SWAP_PREFIX:
+            days = range(self.day + 1)
+            return {i: days, self.j: days}
+        if kind == MOVE_OFF:
+            # The days between the removed off-duty days and their new position are shifted
+            return {i: range(min(self.day, self.j), max(self.day, self.j) + self.value)}
+        return None
+
+    def apply(self, schedule: List[str]) -> None:
+        """
+        Applies this move to [schedule], in place.
+        """
+        rows = self.new_rows(schedule)
+        self._old_rows = {i: schedule[i] for i in rows}
+        for i, row in rows.items():
+            schedule[i] = row
+
+    def undo(self, schedule: List[str]) -> None:
+        """
+        Restores [schedule] as it was before the last call to `apply`.
+        """
+        for i, row in self._old_rows.items():
+            schedule[i] = row
+        self._old_rows = None
+
+
+# eof
@@ -0,0 +1,148 @@
+import math
+import multiprocessing
+import time
+from typing import List, Optional, Sequence
+
+from create_solution import create_solution
+from firefighter import DAYS_PER_WEEK, CostTable, SchedulingProblem
+from search import VNS
+
+
+class SharedIncumbent:
+    """
+    Best solution shared by the processes of a multi-start search.
+
+    The cost is a shared double and the schedule a shared array of characters (the rows concatenated),
+    so publishing or reading the incumbent does not go through a server process.
+    It has the `add` method of `SolutionStore`, so it can be given as the store of a `VNS`.
+    """
+
+    def __init__(self, prob: SchedulingProblem) -> None:
+        self._nb_firefighters = prob._nb_firefighters
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self._cost = multiprocessing.Value("d", math.inf)
+        self._rows = multiprocessing.Array(
+            "c", self._nb_firefighters * self._nb_days, lock=False
+        )
+
+    def add(self, schedule: List[str], cost: float) -> None:
+        """
+        Publishes [schedule], whose cost is [cost], if it is better than the incumbent.
+        """
+        if cost >= self._cost.value:
+            return
+        with self._cost.get_lock():
+            if cost < self._cost.value:
+                self._rows.raw = "".join(
+                    row[: self._nb_days] for row in schedule
+                ).encode()
+                self._cost.value = cost
+
+    def best_cost(self) -> float:
+        return self._cost.value
+
+    def best(self) -> Optional[List[str]]:
+        with self._cost.get_lock():
+            if self._cost.value == math.inf:
+                return None
+            raw = self._rows.raw.decode()
+        return [
+            raw[i * self._nb_days : (i + 1) * self._nb_days]
+            for i in range(self._nb_firefighters)
+        ]
+
+
+# Problem, costs, neighbourhoods and incumbent of a worker process, set once when the worker starts
+_prob: Optional[SchedulingProblem] = None
+_costs: Optional[CostTable] = None
+_neighbourhoods: Optional[List] = None
+_incumbent: Optional[SharedIncumbent] = None
+
+
+def _init_worker(
+    prob: SchedulingProblem,
+    costs: CostTable,
+    neighbourhoods: List,
+    incumbent: SharedIncumbent,
+) -> None:
+    global _prob, _costs, _neighbourhoods, _incumbent
+    _prob = prob
+    _costs = costs
+    _neighbourhoods = neighbourhoods
+    _incumbent = incumbent
+
+
+def _search(seed: int, deadline: float, options: dict):
+    """
+    Runs a VNS from `create_solution`([seed]) until [deadline] (a time.time() value), and returns
+    ([seed], best solution, its cost, trajectory, number of restarts).
+    Runs in a worker process: each new best solution is published in the shared incumbent,
+    and a restart goes to the shared incumbent if it is better than the best solution of this run,
+    or to a new random solution otherwise.
+    """
+    time_limit = deadline - time.time()
+    if time_limit <= 0:
+        return None
+    search = None
+
+    def restart(rng):
+        if _incumbent.best_cost() < search.best_cost() - 1e-9:
+            return _incumbent.best()
+        return create_solution(rng.randrange(2**31), _prob)
+
+    search = VNS(
+        _prob,
+        _costs,
+        create_solution(seed, _prob),
+        _neighbourhoods,
+        time_limit=time_limit,
+        max_restarts=None,
+        restart=restart,
+        seed=seed,
+        store=_incumbent,
+        **options,
+    )
+    best, cost = search.run()
+    return seed, best, cost, search.trajectory, search.nb_restarts
+
+
+def multi_start(
+    prob: SchedulingProblem,
+    costs,
+    neighbourhoods: Sequence,
+    time_limit: float,
+    seeds: Optional[Sequence[int]] = None,
+    nb_workers: Optional[int] = None,
+    **options,
+):
+    """
+    Runs independent VNS searches (see `VNS`) from the solutions `create_solution`(seed) for each of [seeds]
+    (one per worker by default) in a pool of [nb_workers] processes (one per CPU by default),
+    until [time_limit] seconds have elapsed. [options] are given to `VNS` (strategy, shaking, etc.).
+
+    The runs share their best solution through a `SharedIncumbent`: when a run cannot improve its solution,
+    it restarts from the shared incumbent if it is better, so the lagging runs go on from the best solution found.
+    Returns the best solution, its cost, and the results (seed, solution, cost, trajectory, number of restarts)
+    of the runs.
+    """
+    if nb_workers is None:
+        nb_workers = multiprocessing.cpu_count()
+    if seeds is None:
+        seeds = range(nb_workers)
+    if not isinstance(costs, CostTable):
+        costs = CostTable.from_costs(costs)
+    # A new table, so that the cache of the rows is not sent to the workers
+    costs = CostTable(costs.values)
+    incumbent = SharedIncumbent(prob)
+    deadline = time.time() + time_limit
+    with multiprocessing.Pool(
+        nb_workers,
+        initializer=_init_worker,
+        initargs=(prob, costs, list(neighbourhoods), incumbent),
+    ) as pool:
+        results = pool.starmap(_search, [(seed, deadline, options) for seed in seeds])
+    results = [result for result in results if result is not None]
+    return incumbent.best(), incumbent.best_cost(), results
+
+
+# eof
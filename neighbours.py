@@ -1,18 +1,74 @@
-from typing import List
+import random
+import time
+from itertools import accumulate
+from scipy.optimize import linear_sum_assignment
 import firefighter
+from checker import IncrementalChecker
+from instrumentation import instrumentation
+from moves import Move, SWAP_ROWS, CHANGE_DAY, SWAP_DAY, SWAP_PREFIX, MOVE_OFF, ROTATE, REPLACE_ROW, PERMUTE_ROWS
 
 
 class Neighbourhood:
     """
     A neighbourhood is a class that computes explicitly neighbours of a schedule.
+    Each neighbour is described by a Move (see moves.py) that transforms the schedule into this neighbour.
+    If [soft] is True, infeasible neighbours are returned too (see PenaltyEvaluator).
     """
 
+    soft = False
+
     def neighbours(self, schedule):
         """
         Returns a list of feasible schedules that are neighbours of this schedule.
         """
+        result = list(self.iter_neighbours(schedule))
+        instrumentation.count(f"{type(self).__name__}.candidates", len(result))
+        return result
+
+    def iter_neighbours(self, schedule):
+        """
+        Generates the feasible schedules that are neighbours of this schedule, one at a time,
+        so that an exploration can stop as soon as it finds a good neighbour (see exploration.py).
+        """
+        for move in self.iter_moves(schedule):
+            new_schedule = schedule[:]
+            move.apply(new_schedule)
+            yield new_schedule
+
+    def iter_moves(self, schedule, firefighters=None):
+        """
+        Generates the moves that lead from this schedule to its feasible neighbours.
+        If [firefighters] is specified, only the moves of these firefighters (Move.i) are generated,
+        which splits the neighbourhood into disjoint shards (see parallel.py).
+        The schedule must not be modified while the moves are generated.
+        """
+        return iter(())
+
+    def reseed(self, seed):
+        """
+        Reseeds the random generator of this neighbourhood if it draws random moves (see parallel.py).
+        """
         pass
 
+    def _firefighters(self, firefighters):
+        """
+        Returns the firefighters whose moves are generated.
+        """
+        if firefighters is None:
+            return range(self._prob._nb_firefighters)
+        return firefighters
+
+    def _accepts(self, checker, schedule, move):
+        """
+        Indicates whether the neighbour obtained by applying [move] to [schedule] is returned.
+        """
+        if self.soft:
+            return True
+        feasible = checker.is_feasible_move(move.new_rows(schedule))
+        if instrumentation.enabled:
+            instrumentation.check(type(self).__name__, feasible)
+        return feasible
+
 
 class SwapNeighbourhood(Neighbourhood):
     """
@@ -24,21 +80,43 @@ class SwapNeighbourhood(Neighbourhood):
     def __init__(self, prob) -> None:
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
-        for i in range(self._prob._nb_firefighters):
+    def iter_moves(self, schedule, firefighters=None):
+        for i in self._firefighters(firefighters):
             for j in range(i + 1, self._prob._nb_firefighters):
                 # Swaps the schedules of firefighters i and j.
-                new_schedule = [
-                    line for line in schedule
-                ]  # notice that we can do that because strings are immutable (no risk of side effects)
-                new_schedule[i] = schedule[j]
-                new_schedule[j] = schedule[i]
-                # if not self._prob.is_feasible(new_schedule) == None: continue No need to test for feasibility: this
-                # new schedule is guaranteed to be feasible (assuming the specified one was feasible).
-                result.append(new_schedule)
-        print(f"swap between firefighters {len(result)} neighbors!")
-        return result
+                # No need to test for feasibility: this new schedule is guaranteed to be feasible
+                # (assuming the specified one was feasible).
+                yield Move(SWAP_ROWS, i, j)
+
+
+class RowAssignmentNeighbourhood(Neighbourhood):
+    """
+    This neighborhood contains the best permutation of the schedules of the firefighters.
+    Like swaps, permutations never break feasibility (the rows are unchanged and so is the coverage),
+    so the best permutation is found exactly by solving a linear assignment problem over the matrix
+    "cost of the schedule of firefighter j for firefighter i" (see CostTable.row_cost_matrix).
+    The neighbourhood contains a single neighbour, or none if the current permutation is already optimal.
+    """
+
+    def __init__(self, prob, costs) -> None:
+        self._prob = prob
+        if not isinstance(costs, firefighter.CostTable):
+            costs = firefighter.CostTable.from_costs(costs)
+        self._costs = costs
+
+    def iter_moves(self, schedule, firefighters=None):
+        if 0 not in self._firefighters(firefighters):
+            return
+        nb_firefighters = self._prob._nb_firefighters
+        nb_days = self._prob._nb_weeks * 7
+        rows = [schedule[i][:nb_days] for i in range(nb_firefighters)]
+        matrix = self._costs.row_cost_matrix(rows, cache=False)
+        firefighter_indices, row_indices = linear_sum_assignment(matrix)
+        current_cost = matrix.trace()
+        best_cost = matrix[firefighter_indices, row_indices].sum()
+        # Ignore permutations that are only better because of rounding errors
+        if best_cost < current_cost - 1e-9:
+            yield Move(PERMUTE_ROWS, 0, value=tuple(int(r) for r in row_indices))
 
 
 class OffDutyMoveNeighbourhood(Neighbourhood):
@@ -49,20 +127,17 @@ class OffDutyMoveNeighbourhood(Neighbourhood):
     def __init__(self, prob):
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
-        for i in range(self._prob._nb_firefighters):
+    def iter_moves(self, schedule, firefighters=None):
+        checker = IncrementalChecker(self._prob, schedule)
+        for i in self._firefighters(firefighters):
             for day in range(self._prob._nb_weeks * 7):
                 if schedule[i][day] == 'F':
-                    s = schedule[i][:day] + schedule[i][i + 1:]
-                    for k in range(len(s)):
-                        new_schedule = schedule[:]
-                        new_schedule[i] = s[:k] + 'F' + s[k:]
-                        # Append the modified schedule to the result if feasible
-                        if self._prob.is_feasible(new_schedule) is None:
-                            result.append(new_schedule)
-        print(f"move duty off return {len(result)} neighbors!")
-        return result
+                    # The day off is removed, then inserted at position k of the remaining days
+                    for k in range(len(schedule[i]) - 1):
+                        move = Move(MOVE_OFF, i, k, day, 1)
+                        # Yield the move if feasible
+                        if self._accepts(checker, schedule, move):
+                            yield move
 
 class TwoOffDutyMoveNeighbourhood(Neighbourhood):
     """
@@ -72,20 +147,17 @@ class TwoOffDutyMoveNeighbourhood(Neighbourhood):
     def __init__(self, prob):
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
-        for i in range(self._prob._nb_firefighters):
+    def iter_moves(self, schedule, firefighters=None):
+        checker = IncrementalChecker(self._prob, schedule)
+        for i in self._firefighters(firefighters):
             for day in range(self._prob._nb_weeks * 7 - 1):
                 if schedule[i][day] == 'F' and schedule[i][day + 1] == 'F':
-                    s = schedule[i][:day] + schedule[i][i + 2:]
-                    for k in range(len(s)):
-                        new_schedule = schedule[:]
-                        new_schedule[i] = s[:k] + 'FF' + s[k:]
-                        # Append the modified schedule to the result if feasible
-                        if self._prob.is_feasible(new_schedule) is None:
-                            result.append(new_schedule)
-        print(f"move duty off return {len(result)} neighbors!")
-        return result
+                    # The two days off are removed, then inserted at position k of the remaining days
+                    for k in range(len(schedule[i]) - 2):
+                        move = Move(MOVE_OFF, i, k, day, 2)
+                        # Yield the move if feasible
+                        if self._accepts(checker, schedule, move):
+                            yield move
 
 class ChangOneDayNeighbourhood(Neighbourhood):
     """
@@ -95,21 +167,17 @@ class ChangOneDayNeighbourhood(Neighbourhood):
     def __init__(self, prob) -> None:
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
+    def iter_moves(self, schedule, firefighters=None):
+        checker = IncrementalChecker(self._prob, schedule)
 
-        for i in range(self._prob._nb_firefighters):
+        for i in self._firefighters(firefighters):
             for day in range(self._prob._nb_weeks * 7):
                 for k in {'M', 'N', 'A'}:
                     # Swaps one day schedule of firefighters i.
-                    new_schedule = schedule[:]
-                    if new_schedule[i][day] != k:
-                        new_schedule[i] = new_schedule[i][:day] + k + new_schedule[i][day + 1:]
-                        if self._prob.is_feasible(new_schedule) is None:
-                            result.append(new_schedule[:])
-
-        print(f"change one day shift of one firefighter return {len(result)} neighbors!")
-        return result
+                    if schedule[i][day] != k:
+                        move = Move(CHANGE_DAY, i, day=day, value=k)
+                        if self._accepts(checker, schedule, move):
+                            yield move
 
 
 class SwapDaysNeighbourhood(Neighbourhood):
@@ -120,22 +188,17 @@ class SwapDaysNeighbourhood(Neighbourhood):
     def __init__(self, prob) -> None:
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
-        for i in range(self._prob._nb_firefighters):
+    def iter_moves(self, schedule, firefighters=None):
+        checker = IncrementalChecker(self._prob, schedule)
+        for i in self._firefighters(firefighters):
             for j in range(i + 1, self._prob._nb_firefighters):
-                # Swaps one day schedule of firefighters i and j.
-                new_schedule1 = schedule[:]
+                # Swaps the schedules of firefighters i and j day after day:
+                # the neighbours swap all the days until [day] (swapping equal days changes nothing).
                 for day in range(self._prob._nb_weeks * 7):
-                    if new_schedule1[i][day] != new_schedule1[j][day]:
-                        temp_shift = new_schedule1[i][day]
-                        new_schedule1[i] = new_schedule1[i][:day] + new_schedule1[j][day] + new_schedule1[i][day + 1:]
-                        new_schedule1[j] = new_schedule1[j][:day] + temp_shift + new_schedule1[j][day + 1:]
-                        if self._prob.is_feasible(new_schedule1) is None:
-                            result.append(new_schedule1[:])
-
-        print(f"swap days shifts between firefighters return {len(result)} neighbors!")
-        return result
+                    if schedule[i][day] != schedule[j][day]:
+                        move = Move(SWAP_PREFIX, i, j, day)
+                        if self._accepts(checker, schedule, move):
+                            yield move
 
 
 class SwapDayNeighbourhood(Neighbourhood):
@@ -146,22 +209,16 @@ class SwapDayNeighbourhood(Neighbourhood):
     def __init__(self, prob) -> None:
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
-        for i in range(self._prob._nb_firefighters):
+    def iter_moves(self, schedule, firefighters=None):
+        checker = IncrementalChecker(self._prob, schedule)
+        for i in self._firefighters(firefighters):
             for j in range(i + 1, self._prob._nb_firefighters):
                 # Swaps one day schedule of firefighters i and j.
                 for day in range(self._prob._nb_weeks * 7):
-                    new_schedule1 = schedule[:]
-                    if new_schedule1[i][day] != new_schedule1[j][day]:
-                        temp_shift = new_schedule1[i][day]
-                        new_schedule1[i] = new_schedule1[i][:day] + new_schedule1[j][day] + new_schedule1[i][day + 1:]
-                        new_schedule1[j] = new_schedule1[j][:day] + temp_shift + new_schedule1[j][day + 1:]
-                        if self._prob.is_feasible(new_schedule1) is None:
-                            result.append(new_schedule1[:])
-
-        print(f"swap one day between firefighters return {len(result)} neighbors!")
-        return result
+                    if schedule[i][day] != schedule[j][day]:
+                        move = Move(SWAP_DAY, i, j, day)
+                        if self._accepts(checker, schedule, move):
+                            yield move
 
 
 class ShiftRotationNeighbourhood(Neighbourhood):
@@ -172,16 +229,145 @@ class ShiftRotationNeighbourhood(Neighbourhood):
     def __init__(self, prob) -> None:
         self._prob = prob
 
-    def neighbours(self, schedule):
-        result = []
+    def iter_moves(self, schedule, firefighters=None):
+        if 0 not in self._firefighters(firefighters):
+            return
         for k in range(2):
-            new_schedule = schedule[:]
-            for i in range(self._prob._nb_firefighters):
-                for day in range(self._prob._nb_weeks * 7):
-                    next_shift = {'M': 'A', 'A': 'N', 'N': 'M', 'F': 'F'}[new_schedule[i][day]]
-                    new_schedule[i] = new_schedule[i][:day] + next_shift + new_schedule[i][day + 1:]
+            # Every shift of every firefighter is replaced with the next one
+            yield Move(ROTATE, 0)
 
-            result.append(new_schedule[:])
 
-        print(f"shift rotation return {len(result)} neighbors!")
-        return result
+class ReplaceRowNeighbourhood(Neighbourhood):
+    """
+    This neighborhood generates a neighbor by replacing the schedule of one firefighter
+    with any row of a RowCatalogue, i.e., any row that is known to be valid on its own.
+    Only the coverage of the shifts (C7) needs to be checked.
+    """
+
+    def __init__(self, prob, catalogue) -> None:
+        self._prob = prob
+        self._catalogue = catalogue
+
+    def iter_moves(self, schedule, firefighters=None):
+        checker = IncrementalChecker(self._prob, schedule, self._catalogue)
+        for i in self._firefighters(firefighters):
+            for row in self._catalogue:
+                if row != schedule[i]:
+                    move = Move(REPLACE_ROW, i, value=row)
+                    if self._accepts(checker, schedule, move):
+                        yield move
+
+
+class SampledNeighbourhood(Neighbourhood):
+    """
+    Base class of the neighbourhoods that draw random moves instead of enumerating all of them,
+    so that the time spent in a neighbourhood does not depend on the size of the instance.
+
+    At most [nb_moves] distinct moves are drawn (the same move is never drawn twice in a call),
+    and if [time_budget] is specified, the drawing stops after [time_budget] seconds.
+    The moves are drawn with a random generator seeded with [seed].
+    If [costs] is specified, the cells (firefighter, day) that the moves modify are chosen with a probability
+    proportional to their cost in the current schedule (plus [min_weight]), so expensive cells are changed more often.
+    Subclasses implement _random_move.
+    """
+
+    def __init__(self, prob, nb_moves=1000, time_budget=None, seed=0, costs=None, min_weight=0.01):
+        self._prob = prob
+        self._nb_moves = nb_moves
+        self._time_budget = time_budget
+        self._rng = random.Random(seed)
+        if costs is not None and not isinstance(costs, firefighter.CostTable):
+            costs = firefighter.CostTable.from_costs(costs)
+        self._costs = costs
+        self._min_weight = min_weight
+
+    def reseed(self, seed):
+        self._rng.seed(seed)
+
+    def iter_moves(self, schedule, firefighters=None):
+        firefighters = list(self._firefighters(firefighters))
+        if not firefighters:
+            return
+        shard = set(firefighters)
+        checker = IncrementalChecker(self._prob, schedule)
+        cells = [(i, day) for i in firefighters for day in range(self._prob._nb_weeks * 7)]
+        cum_weights = None
+        if self._costs is not None:
+            cum_weights = list(accumulate(
+                self._costs.cell_cost(i, day, schedule[i][day]) + self._min_weight for i, day in cells))
+
+        def random_cell():
+            if cum_weights is None:
+                return self._rng.choice(cells)
+            return self._rng.choices(cells, cum_weights=cum_weights)[0]
+
+        deadline = None if self._time_budget is None else time.perf_counter() + self._time_budget
+        drawn = set()
+        # Stop drawing when most draws give moves that were already drawn (small neighbourhoods)
+        max_draws = 10 * self._nb_moves
+        nb_draws = 0
+        while len(drawn) < self._nb_moves and nb_draws < max_draws:
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            nb_draws += 1
+            move = self._random_move(schedule, random_cell)
+            # A normalised move may belong to a firefighter of another shard (see parallel.py)
+            if move is None or move in drawn or move.i not in shard:
+                continue
+            drawn.add(move)
+            if self._accepts(checker, schedule, move):
+                yield move
+
+    def _random_move(self, schedule, random_cell):
+        """
+        Returns a random move of the neighbourhood, or None if the draw does not lead to a move.
+        [random_cell]() returns a random cell (firefighter, day).
+        """
+        return None
+
+
+class SampledChangOneDayNeighbourhood(SampledNeighbourhood):
+    """
+    Random moves of ChangOneDayNeighbourhood: a firefighter performs another work shift on one day.
+    """
+
+    def _random_move(self, schedule, random_cell):
+        i, day = random_cell()
+        shift = self._rng.choice('MAN')
+        if schedule[i][day] == shift:
+            return None
+        return Move(CHANGE_DAY, i, day=day, value=shift)
+
+
+class SampledSwapDayNeighbourhood(SampledNeighbourhood):
+    """
+    Random moves of SwapDayNeighbourhood: two firefighters swap their shifts on one day.
+    Only the first firefighter is chosen according to the costs.
+    """
+
+    def _random_move(self, schedule, random_cell):
+        i, day = random_cell()
+        j = self._rng.randrange(self._prob._nb_firefighters)
+        if schedule[i][day] == schedule[j][day]:
+            return None
+        # The moves are normalised so that the same swap is not drawn twice
+        return Move(SWAP_DAY, min(i, j), max(i, j), day)
+
+
+class SampledOffDutyMoveNeighbourhood(SampledNeighbourhood):
+    """
+    Random moves of OffDutyMoveNeighbourhood: a day off of a firefighter is moved to another day.
+    The new day off is chosen according to the costs, since it removes the cost of a work shift.
+    """
+
+    def _random_move(self, schedule, random_cell):
+        i, k = random_cell()
+        days_off = [day for day in range(self._prob._nb_weeks * 7) if schedule[i][day] == 'F']
+        if not days_off or schedule[i][k] == 'F':
+            return None
+        day = self._rng.choice(days_off)
+        # Inserting the day off at position k makes day k off-duty
+        # (the last day is not a position of OffDutyMoveNeighbourhood)
+        if k >= len(schedule[i]) - 1:
+            return None
+        return Move(MOVE_OFF, i, k, day, 1)
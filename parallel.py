@@ -0,0 +1,147 @@
+import multiprocessing
+import random
+from typing import List, Optional, Sequence, Tuple
+
+from delta_cost import DeltaCost
+from firefighter import CostTable, SchedulingProblem
+from moves import Move
+
+# Problem, costs and neighbourhoods of a worker process, set once when the worker starts
+_prob: Optional[SchedulingProblem] = None
+_costs: Optional[CostTable] = None
+_neighbourhoods: list = []
+
+
+def _init_worker(
+    prob: SchedulingProblem, costs: CostTable, neighbourhoods: Sequence
+) -> None:
+    global _prob, _costs, _neighbourhoods
+    _prob = prob
+    _costs = costs
+    _neighbourhoods = list(neighbourhoods)
+
+
+def _best_move(k: int, schedule: List[str], firefighters: List[int], seed: int):
+    """
+    Returns the best move of the [k]-th neighbourhood for [schedule] among the moves of [firefighters],
+    together with its change of cost, or None if there is no such move.
+    The neighbourhood is reseeded with [seed] first. Runs in a worker process.
+    """
+    neighbourhood = _neighbourhoods[k]
+    neighbourhood.reseed(seed)
+    delta_cost = DeltaCost(_prob, _costs, schedule)
+    best_move = None
+    best_delta = 0.0
+    for move in neighbourhood.iter_moves(schedule, firefighters):
+        delta = delta_cost.move_delta(move)
+        if best_move is None or delta < best_delta:
+            best_move = move
+            best_delta = delta
+    return None if best_move is None else (best_move, best_delta)
+
+
+def balanced_shards(nb_firefighters: int, nb_shards: int) -> List[List[int]]:
+    """
+    Splits the firefighters into [nb_shards] shards.
+    Most neighbourhoods pair firefighter i with the firefighters j > i, so firefighter i has about
+    [nb_firefighters] - i moves; firefighters are dealt back and forth so that the shards have similar sizes.
+    """
+    nb_shards = max(1, min(nb_shards, nb_firefighters))
+    shards = [[] for _s in range(nb_shards)]
+    for i in range(nb_firefighters):
+        r, s = divmod(i, nb_shards)
+        shards[s if r % 2 == 0 else nb_shards - 1 - s].append(i)
+    return shards
+
+
+class ParallelExplorer:
+    """
+    Explores [neighbourhoods] for a [SchedulingProblem] with a pool of [nb_workers] processes
+    (one per CPU by default).
+
+    The problem, the costs and the neighbourhoods are sent to each worker once, when it starts,
+    so later changes of the neighbourhoods (e.g., their `soft` attribute) are not seen by the workers.
+    The moves of a neighbourhood are split by firefighter into [nb_shards] shards (see `balanced_shards`);
+    each worker receives the index of the neighbourhood and the current schedule with a shard,
+    and only returns the best move of this shard.
+    Each shard of each exploration gets its own seed, drawn from a random generator seeded with [seed],
+    so the neighbourhoods that draw random moves draw new moves at each exploration.
+    """
+
+    def __init__(
+        self,
+        prob: SchedulingProblem,
+        costs,
+        neighbourhoods: Sequence,
+        nb_workers: Optional[int] = None,
+        nb_shards: Optional[int] = None,
+        seed=0,
+    ) -> None:
+        if nb_workers is None:
+            nb_workers = multiprocessing.cpu_count()
+        if nb_shards is None:
+            nb_shards = 4 * nb_workers
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        # A new table, so that the cache of the rows is not sent to the workers
+        costs = CostTable(costs.values)
+        self._neighbourhoods = list(neighbourhoods)
+        self._shards = balanced_shards(prob._nb_firefighters, nb_shards)
+        self._rng = random.Random(seed)
+        self._pool = multiprocessing.Pool(
+            nb_workers,
+            initializer=_init_worker,
+            initargs=(prob, costs, self._neighbourhoods),
+        )
+
+    def _index(self, neighbourhood) -> int:
+        for k, other in enumerate(self._neighbourhoods):
+            if other is neighbourhood:
+                return k
+        raise ValueError(
+            f"{type(neighbourhood).__name__} is not a neighbourhood of the explorer"
+        )
+
+    def best_move(
+        self, neighbourhood, schedule: List[str]
+    ) -> Optional[Tuple[Move, float]]:
+        """
+        Returns the best move of [neighbourhood] for [schedule] together with its change of cost,
+        or None if the neighbourhood is empty.
+        [neighbourhood] must be one of the neighbourhoods of the explorer.
+        """
+        k = self._index(neighbourhood)
+        schedule = list(schedule)
+        results = self._pool.starmap(
+            _best_move,
+            [(k, schedule, shard, self._rng.getrandbits(64)) for shard in self._shards],
+        )
+        results = [result for result in results if result is not None]
+        if not results:
+            return None
+        return min(results, key=lambda result: result[1])
+
+    def best_improvement(
+        self, neighbourhood, schedule: List[str]
+    ) -> Optional[Tuple[Move, float]]:
+        """
+        Returns the best move of [neighbourhood] for [schedule] together with its change of cost
+        if it decreases the cost, or None.
+        """
+        result = self.best_move(neighbourhood, schedule)
+        if result is None or result[1] >= 0:
+            return None
+        return result
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> "ParallelExplorer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+# eof
@@ -0,0 +1,262 @@
+import logging
+import multiprocessing
+import queue
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from alns import DESTROY_OPERATORS, DestroyOperator
+from firefighter import CostTable, SchedulingProblem
+from instrumentation import instrumentation
+from lns import PROVEN_REPAIRS, solve_repair
+from model import FREE_CELL, ModelBuilder
+from repair_cache import RepairCache
+from search import AdaptiveSelection
+
+logger = logging.getLogger(__name__)
+
+# Problem, costs, model builder, time limit and gap of the solves of a worker process,
+# set once when the worker starts
+_prob: Optional[SchedulingProblem] = None
+_costs: Optional[CostTable] = None
+_builder: Optional[ModelBuilder] = None
+_time_limit: Optional[float] = None
+_gap: Optional[float] = None
+
+
+def _init_worker(
+    prob: SchedulingProblem,
+    costs: CostTable,
+    time_limit: Optional[float],
+    gap: Optional[float],
+) -> None:
+    global _prob, _costs, _builder, _time_limit, _gap
+    _prob = prob
+    _costs = costs
+    _builder = ModelBuilder(prob)
+    _time_limit = time_limit
+    _gap = gap
+
+
+def _repair(destroyed: List[str], incumbent: List[str]) -> Tuple[List[str], str]:
+    """
+    Repairs [destroyed], obtained from [incumbent], with `lns.solve_repair`,
+    and returns the repaired schedule with the outcome of the solve. Runs in a worker process.
+    """
+    return solve_repair(
+        destroyed,
+        _prob,
+        _costs,
+        _builder,
+        time_limit=_time_limit,
+        incumbent=incumbent,
+        gap=_gap,
+    )
+
+
+def rebase(destroyed: List[str], repaired: List[str], schedule: List[str]) -> List[str]:
+    """
+    Returns [schedule] where the cells destroyed in [destroyed] (rows "0" and FREE_CELL days)
+    are replaced with their values in [repaired].
+    """
+    result = list(schedule)
+    for i, row in enumerate(destroyed):
+        if row == "0":
+            result[i] = repaired[i]
+        elif FREE_CELL in row:
+            result[i] = "".join(
+                repaired[i][d] if shift == FREE_CELL else schedule[i][d]
+                for d, shift in enumerate(row)
+            )
+    return result
+
+
+class ParallelLNS:
+    """
+    Large Neighbourhood Search for a [SchedulingProblem], starting from the feasible [schedule],
+    where [nb_workers] processes (one per CPU by default) repair different destroyed copies of the current solution
+    at the same time. Each solve of a repair takes at most [solve_time_limit] seconds and stops at a relative gap
+    of [gap] if they are specified.
+
+    The destroy operators (by default DESTROY_OPERATORS, with a destruction of [size]) are chosen by an
+    `AdaptiveSelection`, as in `ALNS`. A repaired solution replaces the current solution if it is feasible and
+    cheaper. When the current solution changed while a repair was running, the repaired cells are applied to the
+    new current solution (see `rebase`), and the result is discarded unless it is feasible and cheaper.
+    Each new best solution is added to [store] if specified.
+    If [cache] (see `RepairCache`) is specified, the repairs it knows are not sent to the workers,
+    and the proven outcomes of the workers are added to it. The repairs found in the cache are not taken into
+    account by the selection of the operators, since they took no time.
+
+    The exceptions raised by the repairs are logged; the search stops with a RuntimeError after [max_errors] of them.
+    """
+
+    def __init__(
+        self,
+        prob: SchedulingProblem,
+        costs,
+        schedule: List[str],
+        operators: Optional[Dict[str, DestroyOperator]] = None,
+        size: int = 2,
+        nb_workers: Optional[int] = None,
+        solve_time_limit: Optional[float] = None,
+        gap: Optional[float] = None,
+        seed=0,
+        store=None,
+        cache: Optional[RepairCache] = None,
+        max_errors: int = 10,
+    ) -> None:
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        if operators is None:
+            operators = DESTROY_OPERATORS
+        if nb_workers is None:
+            nb_workers = multiprocessing.cpu_count()
+        self._prob = prob
+        self._costs = costs
+        self._names = list(operators)
+        self._operators = [operators[name] for name in self._names]
+        self._size = size
+        self._nb_workers = nb_workers
+        self._solve_time_limit = solve_time_limit
+        self._gap = gap
+        self._cache = cache
+        self._max_errors = max_errors
+        self._rng = random.Random(seed)
+        self._store = store
+        self.selection = AdaptiveSelection(len(self._operators))
+        self.selection.names = list(self._names)
+        self.current = list(schedule)
+        self.current_cost = prob.cost(self.current, costs)
+        # Number of changes of the current solution, used to detect the stale repairs
+        self._version = 0
+        self.nb_iterations = 0
+        self.nb_errors = 0
+        self.trajectory: List[Tuple[float, float]] = []
+
+    def _accept(self, schedule: List[str]) -> float:
+        """
+        Makes [schedule] the current solution if it is feasible and cheaper, and returns the decrease of cost.
+        """
+        cost = self._prob.cost(schedule, self._costs)
+        if cost >= self.current_cost - 1e-9 or self._prob.is_feasible(schedule):
+            return 0.0
+        improvement = self.current_cost - cost
+        self.current = list(schedule)
+        self.current_cost = cost
+        self._version += 1
+        if self._store is not None:
+            self._store.add(self.current, cost)
+        return improvement
+
+    def run(
+        self, max_iterations: Optional[int] = None, time_limit: Optional[float] = None
+    ) -> Tuple[List[str], float]:
+        """
+        Starts repairs until [max_iterations] repairs have been started or [time_limit] seconds have elapsed,
+        waits for the running repairs, and returns the current (i.e., best) solution with its cost.
+        """
+        if max_iterations is None and time_limit is None:
+            raise ValueError(
+                "ParallelLNS requires a maximal number of iterations or a time limit"
+            )
+        start = time.perf_counter()
+        self.trajectory.append((0.0, self.current_cost))
+        # The workers put their results in [results] through the callbacks of the pool
+        results: "queue.Queue" = queue.Queue()
+        nb_running = 0
+
+        def budget_left() -> bool:
+            return (max_iterations is None or self.nb_iterations < max_iterations) and (
+                time_limit is None or time.perf_counter() - start < time_limit
+            )
+
+        with multiprocessing.Pool(
+            self._nb_workers,
+            initializer=_init_worker,
+            initargs=(
+                self._prob,
+                CostTable(self._costs.values),
+                self._solve_time_limit,
+                self._gap,
+            ),
+        ) as pool:
+            while True:
+                while nb_running < self._nb_workers and budget_left():
+                    self.nb_iterations += 1
+                    k = self.selection.select(range(len(self._operators)), self._rng)
+                    destroyed = self._operators[k](
+                        self.current, self._prob, self._costs, self._rng, self._size
+                    )
+                    cached = None
+                    if self._cache is not None:
+                        cached = self._cache.get(destroyed, self.current)
+                    task = (
+                        k,
+                        destroyed,
+                        self.current,
+                        self._version,
+                        time.perf_counter(),
+                        cached is not None,
+                    )
+                    if cached is not None:
+                        results.put((task, (cached, None), None))
+                    else:
+                        pool.apply_async(
+                            _repair,
+                            (destroyed, self.current),
+                            callback=lambda result, task=task: results.put(
+                                (task, result, None)
+                            ),
+                            error_callback=lambda error, task=task: results.put(
+                                (task, None, error)
+                            ),
+                        )
+                    nb_running += 1
+                if nb_running == 0:
+                    break
+
+                task, result, error = results.get()
+                k, destroyed, incumbent, version, submitted, cached = task
+                nb_running -= 1
+                if error is not None:
+                    self.nb_errors += 1
+                    logger.error(
+                        "Repair after the destroy operator %s failed",
+                        self._names[k],
+                        exc_info=error,
+                    )
+                    if self.nb_errors >= self._max_errors:
+                        raise RuntimeError(
+                            f"{self.nb_errors} repairs failed in ParallelLNS"
+                        ) from error
+                repaired, status = (None, None) if result is None else result
+                if self._cache is not None and status in PROVEN_REPAIRS:
+                    self._cache.add(destroyed, incumbent, repaired)
+                name = "plns." + self._names[k]
+                instrumentation.count(name + ".iterations")
+                improvement = 0.0
+                if repaired is None:
+                    instrumentation.count("plns.errors")
+                elif version == self._version:
+                    improvement = self._accept(repaired)
+                else:
+                    # The current solution changed during the repair
+                    instrumentation.count("plns.stale")
+                    improvement = self._accept(
+                        rebase(destroyed, repaired, self.current)
+                    )
+                    if improvement > 0:
+                        instrumentation.count("plns.rebased")
+                if improvement > 0:
+                    instrumentation.improvement(name, improvement)
+                    self.trajectory.append(
+                        (time.perf_counter() - start, self.current_cost)
+                    )
+                if not cached:
+                    self.selection.update(
+                        k, improvement, time.perf_counter() - submitted
+                    )
+        return list(self.current), self.current_cost
+
+
+# eof
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import List, Optional
+
+from firefighter import CostTable, SchedulingProblem
+from model import FREE_CELL
+from zobrist import ZobristKeys
+
+
+class RepairCache:
+    """
+    Bounded memo of the repairs of destroyed schedules (see `lns.repair`) for a [SchedulingProblem]:
+    when it holds more than [capacity] repairs, the least recently used one is forgotten.
+
+    A repair is identified by the destroyed cells (the rows "0" and the FREE_CELL days) and the Zobrist hash of the
+    destroyed schedule, which covers the cells that are not destroyed. Its outcome is either the repaired schedule,
+    or the fact that no schedule cheaper than an incumbent was found: the latter is only reused for incumbents
+    that are at most as expensive, since the repairs are cut off at the cost of the incumbent.
+    Since the cells that are not destroyed are the same, the costs of the schedules can be compared directly.
+    Only the proven outcomes of the solves should be added (see `lns.PROVEN_REPAIRS`): a solve stopped by its
+    time limit or gap, or a failed one, may give a different outcome next time.
+    """
+
+    def __init__(self, prob: SchedulingProblem, costs, capacity: int = 1000) -> None:
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        self._prob = prob
+        self._costs = costs
+        self._keys = ZobristKeys(prob)
+        self._capacity = capacity
+        # key -> (repaired schedule, None) or (None, cost of an incumbent that could not be improved)
+        self._outcomes: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._outcomes)
+
+    def key(self, destroyed: List[str]) -> tuple:
+        """
+        Returns the key of [destroyed]: its destroyed firefighters (i) and destroyed days (i, d),
+        together with its Zobrist hash.
+        """
+        cells = []
+        for i, row in enumerate(destroyed):
+            if row == "0":
+                cells.append(i)
+            else:
+                cells.extend(
+                    (i, d) for d, shift in enumerate(row) if shift == FREE_CELL
+                )
+        return tuple(cells), self._keys.schedule_hash(destroyed)
+
+    def get(
+        self, destroyed: List[str], incumbent: Optional[List[str]] = None
+    ) -> Optional[List[str]]:
+        """
+        Returns the repair of [destroyed], obtained from [incumbent], if it is known:
+        either the repaired schedule or [incumbent] if it cannot be improved. Returns None otherwise.
+        """
+        key = self.key(destroyed)
+        outcome = self._outcomes.get(key)
+        result = None
+        if outcome is not None:
+            repaired, cost = outcome
+            if repaired is not None:
+                result = list(repaired)
+            elif (
+                incumbent is not None
+                and self._prob.cost(incumbent, self._costs) <= cost + 1e-9
+            ):
+                result = list(incumbent)
+        if result is None:
+            self.misses += 1
+            return None
+        self._outcomes.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def add(
+        self,
+        destroyed: List[str],
+        incumbent: Optional[List[str]],
+        repaired: List[str],
+    ) -> None:
+        """
+        Records that the repair of [destroyed], obtained from [incumbent], led to [repaired],
+        which must be an optimal repair, or [incumbent] if no repair is cheaper.
+        """
+        incumbent_cost = (
+            None if incumbent is None else self._prob.cost(incumbent, self._costs)
+        )
+        if self._prob.is_feasible(repaired) is None and (
+            incumbent_cost is None
+            or self._prob.cost(repaired, self._costs) < incumbent_cost - 1e-9
+        ):
+            outcome = (list(repaired), None)
+        elif incumbent_cost is not None:
+            outcome = (None, incumbent_cost)
+        else:
+            return
+        key = self.key(destroyed)
+        self._outcomes[key] = outcome
+        self._outcomes.move_to_end(key)
+        if len(self._outcomes) > self._capacity:
+            self._outcomes.popitem(last=False)
+
+    def statistics(self) -> dict:
+        nb = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / nb if nb > 0 else 0.0,
+            "size": len(self._outcomes),
+        }
+
+
+# eof
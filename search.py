@@ -0,0 +1,377 @@
+import random
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from delta_cost import DeltaCost
+from exploration import (
+    best_improvement,
+    first_improvement,
+    sample,
+    sampled_improvement,
+)
+from firefighter import SchedulingProblem
+from instrumentation import instrumentation
+from zobrist import RosterHash, ZobristKeys, unique_moves
+
+STRATEGIES = ("best", "first", "sample")
+
+
+class AdaptiveSelection:
+    """
+    Roulette wheel that chooses the next neighbourhood of a descent among [nb_neighbourhoods] neighbourhoods,
+    with a probability proportional to its recent improvement per second.
+
+    The score of a neighbourhood is an exponential moving average of the decrease of cost divided by the time
+    of its explorations (the weight of the last exploration being 1 - [decay]).
+    A neighbourhood that has never been explored is chosen first; then each neighbourhood gets at least
+    [min_share] of the total score, so that a neighbourhood that stopped improving is still tried from time to time.
+    """
+
+    def __init__(
+        self, nb_neighbourhoods: int, decay: float = 0.8, min_share: float = 0.05
+    ) -> None:
+        self._decay = decay
+        self._min_share = min_share
+        self.names: List[Optional[str]] = [None] * nb_neighbourhoods
+        self.calls = [0] * nb_neighbourhoods
+        self.successes = [0] * nb_neighbourhoods
+        self.seconds = [0.0] * nb_neighbourhoods
+        self.improvements = [0.0] * nb_neighbourhoods
+        self.scores = [0.0] * nb_neighbourhoods
+
+    def select(self, candidates: Sequence[int], rng: random.Random) -> int:
+        """
+        Returns one of the neighbourhoods [candidates] (their indices).
+        """
+        for k in candidates:
+            if self.calls[k] == 0:
+                return k
+        total = sum(self.scores[k] for k in candidates)
+        if total <= 0:
+            return rng.choice(candidates)
+        floor = self._min_share * total
+        weights = [max(self.scores[k], floor) for k in candidates]
+        return rng.choices(candidates, weights)[0]
+
+    def update(self, k: int, improvement: float, seconds: float) -> None:
+        """
+        Records that an exploration of neighbourhood [k] decreased the cost by [improvement] in [seconds].
+        """
+        self.calls[k] += 1
+        self.seconds[k] += seconds
+        self.improvements[k] += improvement
+        if improvement > 0:
+            self.successes[k] += 1
+        rate = improvement / max(seconds, 1e-6)
+        self.scores[k] = self._decay * self.scores[k] + (1 - self._decay) * rate
+
+    def statistics(self) -> List[dict]:
+        """
+        Returns the statistics of each neighbourhood, including its share of the time of the explorations.
+        """
+        total_seconds = sum(self.seconds)
+        return [
+            {
+                "name": self.names[k],
+                "calls": self.calls[k],
+                "successes": self.successes[k],
+                "seconds": self.seconds[k],
+                "time_share": (
+                    self.seconds[k] / total_seconds if total_seconds > 0 else 0.0
+                ),
+                "improvement": self.improvements[k],
+                "improvement_per_second": (
+                    self.improvements[k] / self.seconds[k]
+                    if self.seconds[k] > 0
+                    else None
+                ),
+                "score": self.scores[k],
+            }
+            for k in range(len(self.calls))
+        ]
+
+
+class VNS:
+    """
+    Variable Neighbourhood Search for a [SchedulingProblem], starting from the feasible [schedule].
+
+    The local search is a Variable Neighbourhood Descent over [neighbourhoods] (see neighbours.py):
+    the neighbourhoods are explored in order with the specified [strategy] ("best" for the best neighbour,
+    "first" for the first improving one, or "sample" for the best of [sample_size] random neighbours),
+    and the descent goes back to the first neighbourhood after each improvement.
+    If [explorer] (see `ParallelExplorer`) is specified, it is used for the "best" strategy.
+    If [selection] (see `AdaptiveSelection`) is specified, the descent chooses the next neighbourhood
+    with it among the neighbourhoods that have not failed since the last improvement, instead of the fixed order.
+
+    If [shaking] is True, each local optimum is perturbed by a random move of the k-th neighbourhood before a new
+    descent; k goes back to the first neighbourhood when the new local optimum is better, and to the next
+    neighbourhood otherwise (the search then goes back to the previous local optimum).
+    When the descent (without shaking) or a full cycle of shaking (with shaking) does not improve the solution,
+    the search restarts from [restart](rng) if specified, or from the best solution otherwise,
+    at most [max_restarts] times (without limit if [max_restarts] is None).
+    Without shaking, the best solution is already a local optimum, so the search only restarts from [restart].
+
+    The search stops after [time_limit] seconds or [max_iterations] explorations of a neighbourhood,
+    or when there is no restart left; the time limit is also checked during the explorations.
+    The best solution is available at any time, and [trajectory] lists the pairs (time, cost)
+    of the successive best solutions. Each new best solution is added to [store] if specified.
+    """
+
+    def __init__(
+        self,
+        prob: SchedulingProblem,
+        costs,
+        schedule: List[str],
+        neighbourhoods: Sequence,
+        strategy: str = "best",
+        time_limit: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        shaking: bool = False,
+        max_restarts: Optional[int] = 0,
+        restart: Optional[Callable[[random.Random], List[str]]] = None,
+        seed=0,
+        sample_size: int = 500,
+        explorer=None,
+        store=None,
+        selection: Optional[AdaptiveSelection] = None,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unknown strategy {strategy} (expected one of {STRATEGIES})"
+            )
+        if max_restarts is None and time_limit is None and max_iterations is None:
+            raise ValueError(
+                "Unlimited restarts require a time limit or a maximal number of iterations"
+            )
+        self._prob = prob
+        self._neighbourhoods = list(neighbourhoods)
+        self._strategy = strategy
+        self._time_limit = time_limit
+        self._max_iterations = max_iterations
+        self._shaking = shaking
+        self._max_restarts = max_restarts
+        self._restart = restart
+        self._rng = random.Random(seed)
+        self._sample_size = sample_size
+        self._explorer = explorer
+        self._store = store
+        self.selection = selection
+        if selection is not None:
+            selection.names = [type(n).__name__ for n in self._neighbourhoods]
+
+        # The current solution is modified in place by the moves of the neighbourhoods
+        self._current = list(schedule)
+        self._delta_cost = DeltaCost(prob, costs, self._current)
+        self._roster_hash = RosterHash(ZobristKeys(prob), self._current)
+        self._best = list(schedule)
+        self._best_cost = self._delta_cost.total
+        self._start = time.perf_counter()
+        self.trajectory: List[Tuple[float, float]] = []
+        self.nb_iterations = 0
+        self.nb_restarts = 0
+        # Name of the neighbourhood being explored, for the instrumentation
+        self._name = None
+
+    def best(self) -> List[str]:
+        """
+        Returns the best solution found so far.
+        """
+        return list(self._best)
+
+    def best_cost(self) -> float:
+        return self._best_cost
+
+    def current_cost(self) -> float:
+        return self._delta_cost.total
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def _exhausted(self) -> bool:
+        """
+        Indicates whether the budget of the search is exhausted.
+        """
+        if self._time_limit is not None and self.elapsed() >= self._time_limit:
+            return True
+        return (
+            self._max_iterations is not None
+            and self.nb_iterations >= self._max_iterations
+        )
+
+    def _deadline(self) -> Optional[float]:
+        """
+        Returns the value of `time.perf_counter` when the time limit is reached, or None.
+        """
+        if self._time_limit is None:
+            return None
+        return self._start + self._time_limit
+
+    def _reset(self, schedule: List[str]) -> None:
+        """
+        Makes [schedule] the current solution.
+        """
+        self._current[:] = schedule
+        self._delta_cost.reset(self._current)
+        self._roster_hash.reset(self._current)
+        self._update_best()
+
+    def _update_best(self) -> None:
+        cost = self._delta_cost.total
+        if cost < self._best_cost - 1e-9 or not self.trajectory:
+            if cost < self._best_cost:
+                self._best = list(self._current)
+                self._best_cost = cost
+            self.trajectory.append((self.elapsed(), self._best_cost))
+            if self._store is not None:
+                self._store.add(self._best, self._best_cost)
+
+    def _apply(self, move) -> None:
+        rows = move.new_rows(self._current)
+        self._delta_cost.apply(rows)
+        self._roster_hash.apply(rows, move.changed_days())
+        move.apply(self._current)
+        self._update_best()
+
+    def _evaluate(self, moves) -> List[float]:
+        instrumentation.count(f"{self._name}.cost_evaluations", len(moves))
+        total = self._delta_cost.total
+        return [total + self._delta_cost.move_delta(move) for move in moves]
+
+    def _explore(self, neighbourhood):
+        """
+        Returns an improving move of [neighbourhood] for the current solution, or None.
+        """
+        self.nb_iterations += 1
+        name = type(neighbourhood).__name__
+        self._name = name
+        current = self._current
+        current_cost = self._delta_cost.total
+        with instrumentation.timer(name):
+            if self._explorer is not None and self._strategy == "best":
+                # The explorer returns the change of cost of the move
+                found = self._explorer.best_improvement(neighbourhood, current)
+                if found is not None:
+                    found = found[0], current_cost + found[1]
+            else:
+                moves = instrumentation.counted(
+                    neighbourhood.iter_moves(current), f"{name}.candidates"
+                )
+                moves = unique_moves(moves, current, self._roster_hash)
+                deadline = self._deadline()
+                if self._strategy == "first":
+                    found = first_improvement(
+                        moves, self._evaluate, current_cost, deadline=deadline
+                    )
+                elif self._strategy == "sample":
+                    found = sampled_improvement(
+                        moves,
+                        self._evaluate,
+                        current_cost,
+                        self._sample_size,
+                        self._rng,
+                        deadline,
+                    )
+                else:
+                    found = best_improvement(
+                        moves, self._evaluate, current_cost, deadline=deadline
+                    )
+        if found is None:
+            return None
+        move, cost = found
+        instrumentation.improvement(name, current_cost - cost)
+        return move
+
+    def _descent(self) -> None:
+        """
+        Improves the current solution with a Variable Neighbourhood Descent,
+        until it is a local optimum for all the neighbourhoods or the budget is exhausted.
+        """
+        if self.selection is not None:
+            self._adaptive_descent()
+            return
+        k = 0
+        while k < len(self._neighbourhoods) and not self._exhausted():
+            move = self._explore(self._neighbourhoods[k])
+            if move is not None:
+                self._apply(move)
+                k = 0
+            else:
+                k += 1
+
+    def _adaptive_descent(self) -> None:
+        """
+        Variable Neighbourhood Descent where the next neighbourhood is chosen by [selection].
+        A neighbourhood that finds no improving move is not explored again until the next improvement,
+        so the descent still ends at a local optimum for all the neighbourhoods.
+        """
+        candidates = list(range(len(self._neighbourhoods)))
+        while candidates and not self._exhausted():
+            k = self.selection.select(candidates, self._rng)
+            cost = self._delta_cost.total
+            start = time.perf_counter()
+            move = self._explore(self._neighbourhoods[k])
+            if move is not None:
+                self._apply(move)
+            self.selection.update(
+                k, cost - self._delta_cost.total, time.perf_counter() - start
+            )
+            if move is not None:
+                candidates = list(range(len(self._neighbourhoods)))
+            else:
+                candidates.remove(k)
+
+    def _shake(self, k: int) -> None:
+        """
+        Applies a random move of the [k]-th neighbourhood to the current solution.
+        """
+        moves = self._neighbourhoods[k].iter_moves(self._current)
+        moves = unique_moves(moves, self._current, self._roster_hash)
+        for move in sample(moves, 1, self._rng):
+            self._apply(move)
+
+    def _restart_allowed(self) -> bool:
+        if self._restart is None and not self._shaking:
+            # The search would go back to the best solution, where the descent already stopped
+            return False
+        return self._max_restarts is None or self.nb_restarts < self._max_restarts
+
+    def _do_restart(self) -> None:
+        self.nb_restarts += 1
+        instrumentation.count("vns.restarts")
+        if self._restart is not None:
+            self._reset(self._restart(self._rng))
+        else:
+            self._reset(self._best)
+
+    def run(self) -> Tuple[List[str], float]:
+        """
+        Runs the search and returns the best solution with its cost.
+        """
+        self._start = time.perf_counter()
+        self._update_best()
+        self._descent()
+        while not self._exhausted():
+            if self._shaking:
+                improved = False
+                k = 0
+                while k < len(self._neighbourhoods) and not self._exhausted():
+                    local_optimum = list(self._current)
+                    local_optimum_cost = self._delta_cost.total
+                    self._shake(k)
+                    self._descent()
+                    if self._delta_cost.total < local_optimum_cost - 1e-9:
+                        improved = True
+                        k = 0
+                    else:
+                        self._reset(local_optimum)
+                        k += 1
+                if improved:
+                    continue
+            if self._exhausted() or not self._restart_allowed():
+                break
+            self._do_restart()
+            self._descent()
+        return self.best(), self._best_cost
+
+
+# eof
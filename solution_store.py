@@ -0,0 +1,135 @@
+import os
+import time
+from typing import List, Optional, Tuple
+
+from firefighter import load_schedule, saved_schedule_filenames
+
+# Separators used in the log: one record per line, with its fields separated by tabulations
+# and the rows of the schedule separated by commas.
+FIELD_SEPARATOR = "\t"
+ROW_SEPARATOR = ","
+
+
+class SolutionStore:
+    """
+    Keeps the incumbent of a search in memory, and logs each new solution in an append-only file.
+
+    Each record of the log is a line "cost<TAB>timestamp<TAB>row1,row2,...".
+    The store keeps an index of the records (their offsets in the file), together with the latest and the best
+    solutions, so accessing them does not depend on the number of records.
+    Opening an existing log rebuilds the index with a single pass over the file, which allows a search to resume
+    from the best solution of a previous run.
+    """
+
+    def __init__(self, filename: str = "solutions.log") -> None:
+        self._filename = filename
+        self._offsets: List[int] = []
+        self._latest: Optional[Tuple[float, List[str]]] = None
+        self._best: Optional[Tuple[float, List[str]]] = None
+
+        if os.path.exists(filename):
+            offset = 0
+            with open(filename, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Record interrupted while being written
+                    self._index(offset, self._parse(line.decode()))
+                    offset += len(line)
+            if os.path.getsize(filename) > offset:
+                os.truncate(filename, offset)
+        self._file = open(filename, "ab")
+
+    @staticmethod
+    def _parse(line: str) -> Tuple[float, float, List[str]]:
+        cost, timestamp, rows = line.rstrip("\n").split(FIELD_SEPARATOR)
+        return float(cost), float(timestamp), rows.split(ROW_SEPARATOR)
+
+    def _index(self, offset: int, record: Tuple[float, float, List[str]]) -> None:
+        cost, _timestamp, schedule = record
+        self._offsets.append(offset)
+        self._latest = (cost, schedule)
+        if self._best is None or cost < self._best[0]:
+            self._best = (cost, schedule)
+
+    def add(
+        self, schedule: List[str], cost: float, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Records [schedule], whose cost is [cost].
+        By default, the timestamp of the record is the current time.
+        A new best schedule is written on disk immediately (see `checkpoint`),
+        so it survives the interruption of the search.
+        """
+        schedule = list(schedule)
+        cost = float(cost)
+        if timestamp is None:
+            timestamp = time.time()
+        line = f"{cost!r}{FIELD_SEPARATOR}{timestamp!r}{FIELD_SEPARATOR}{ROW_SEPARATOR.join(schedule)}\n"
+        offset = self._file.tell()
+        self._file.write(line.encode())
+        is_best = self._best is None or cost < self._best[0]
+        self._index(offset, (cost, timestamp, schedule))
+        if is_best:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """
+        Makes sure that all the records are written on disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SolutionStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def latest(self) -> Optional[List[str]]:
+        """
+        Returns the last recorded schedule, or None if nothing has been recorded.
+        """
+        return None if self._latest is None else list(self._latest[1])
+
+    def latest_cost(self) -> Optional[float]:
+        return None if self._latest is None else self._latest[0]
+
+    def best(self) -> Optional[List[str]]:
+        """
+        Returns the recorded schedule with the lowest cost, or None if nothing has been recorded.
+        """
+        return None if self._best is None else list(self._best[1])
+
+    def best_cost(self) -> Optional[float]:
+        return None if self._best is None else self._best[0]
+
+    def record(self, k: int) -> Tuple[float, float, List[str]]:
+        """
+        Returns the [k]-th record (cost, timestamp, schedule) of the log.
+        """
+        self._file.flush()
+        with open(self._filename, "rb") as f:
+            f.seek(self._offsets[k])
+            return self._parse(f.readline().decode())
+
+    def import_schedules(self, prob, costs, dir=".") -> int:
+        """
+        Records, from the oldest to the most recent, the schedules saved with `save_schedule` in [dir].
+        The cost of each schedule is computed with `prob.cost(schedule, costs)`.
+        Returns the number of imported schedules.
+        """
+        filenames = saved_schedule_filenames(dir)
+        for filename in filenames:
+            path = os.path.join(dir, filename)
+            schedule = load_schedule(path)
+            self.add(schedule, prob.cost(schedule, costs), os.path.getmtime(path))
+        return len(filenames)
+
+
+# eof
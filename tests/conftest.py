@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The modules of the repository are flat modules at its root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import firefighter  # noqa: E402
+
+
+@pytest.fixture
+def prob():
+    return firefighter.SchedulingProblem()
+
+
+@pytest.fixture
+def costs(prob):
+    return firefighter.read_cost_table(prob, os.path.join(ROOT, "costs.scosts"))
+
+
+@pytest.fixture
+def schedule():
+    return firefighter.load_schedule(os.path.join(ROOT, "example.sched"))
+
+
+# eof
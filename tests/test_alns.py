@@ -0,0 +1,49 @@
+import pytest
+
+from alns import ALNS, DESTROY_OPERATORS
+from lns import repair
+from model import ModelBuilder
+
+
+def test_repairs_update_the_operator_scores(prob, costs, schedule):
+    mb = ModelBuilder(prob)
+    # Rows of single firefighters are destroyed, and each solve is stopped after 2 seconds
+    alns = ALNS(
+        prob,
+        costs,
+        schedule,
+        lambda destroyed: repair(
+            destroyed, prob, costs, mb, time_limit=2.0, incumbent=alns.current
+        ),
+        size=1,
+    )
+    best, cost = alns.run(max_iterations=8)
+    selection = alns.selection
+    assert selection.names == list(DESTROY_OPERATORS)
+    assert sum(selection.calls) == 8
+    assert all(calls > 0 for calls in selection.calls)
+    assert all(seconds > 0 for seconds in selection.seconds)
+
+    # The operators whose repairs improved the solution have a positive score, the others a zero score
+    assert sum(selection.successes) == len(alns.trajectory) - 1 > 0
+    for k in range(len(selection.calls)):
+        assert (selection.scores[k] > 0) == (selection.improvements[k] > 0)
+    assert sum(selection.improvements) == pytest.approx(
+        prob.cost(schedule, costs) - cost
+    )
+    assert prob.is_feasible(best) is None
+
+
+def test_failed_repairs_are_not_rewarded(prob, costs, schedule):
+    # The destroyed schedule is returned as it is: it is not feasible
+    alns = ALNS(prob, costs, schedule, lambda destroyed: destroyed)
+    best, cost = alns.run(max_iterations=8)
+    assert best == schedule
+    assert cost == prob.cost(schedule, costs)
+    assert sum(alns.selection.calls) == 8
+    assert all(calls > 0 for calls in alns.selection.calls)
+    assert alns.selection.successes == [0, 0, 0, 0]
+    assert alns.selection.scores == [0.0, 0.0, 0.0, 0.0]
+
+
+# eof
@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+
+from batch import CODE_UNKNOWN, BatchEvaluator, decode_schedule, encode_schedules
+from firefighter import SHIFT_CODES, SHIFTS
+
+
+def _neighbours(schedule, nb, seed=0):
+    """
+    Returns [nb] copies of [schedule] where a random cell is changed to a random shift.
+    """
+    rng = random.Random(seed)
+    shifts = sorted(SHIFTS)
+    result = []
+    for _n in range(nb):
+        neighbour = list(schedule)
+        i = rng.randrange(len(schedule))
+        d = rng.randrange(len(schedule[i]))
+        neighbour[i] = neighbour[i][:d] + rng.choice(shifts) + neighbour[i][d + 1 :]
+        result.append(neighbour)
+    return result
+
+
+def test_encode_decode(prob, schedule):
+    rosters = encode_schedules([schedule], prob)
+    assert rosters.shape == (1, prob._nb_firefighters, prob._nb_weeks * 7)
+    assert decode_schedule(rosters[0]) == schedule
+
+
+def test_encode_unknown_and_missing_cells(prob, schedule):
+    short = [schedule[0][:5] + "x"] + schedule[1:3]
+    rosters = encode_schedules([short], prob)
+    assert list(rosters[0, 0, :5]) == [SHIFT_CODES[s] for s in schedule[0][:5]]
+    assert rosters[0, 0, 5] == CODE_UNKNOWN
+    assert (rosters[0, 0, 6:] == CODE_UNKNOWN).all()
+    assert (rosters[0, 3:] == CODE_UNKNOWN).all()
+
+
+def test_batch_cost_equals_cost(prob, costs, schedule):
+    schedules = _neighbours(schedule, 50)
+    evaluator = BatchEvaluator(prob, costs)
+    batch_costs = evaluator.cost(encode_schedules(schedules, prob))
+    expected = [prob.cost(s, costs) for s in schedules]
+    assert np.allclose(batch_costs, expected)
+
+
+def test_batch_feasibility_equals_is_feasible(prob, costs, schedule):
+    schedules = _neighbours(schedule, 50) + [schedule]
+    evaluator = BatchEvaluator(prob, costs)
+    feasible = evaluator.feasible(encode_schedules(schedules, prob))
+    assert list(feasible) == [prob.is_feasible(s) is None for s in schedules]
+
+
+def _encode_cells(schedules, prob):
+    """
+    Encodes [schedules] cell by cell, as a reference for `encode_schedules`.
+    """
+    nb_days = prob._nb_weeks * 7
+    result = np.full(
+        (len(schedules), prob._nb_firefighters, nb_days), CODE_UNKNOWN, dtype=np.int8
+    )
+    for n, schedule in enumerate(schedules):
+        for i, row in enumerate(schedule[: prob._nb_firefighters]):
+            for d, shift in enumerate(row[:nb_days]):
+                result[n, i, d] = SHIFT_CODES.get(shift, CODE_UNKNOWN)
+    return result
+
+
+def test_encode_equals_cell_by_cell_encoding(prob, schedule):
+    schedules = _neighbours(schedule, 50) + [[schedule[0][:3] + "x"], []]
+    assert (encode_schedules(schedules, prob) == _encode_cells(schedules, prob)).all()
+
+
+# eof
@@ -0,0 +1,50 @@
+import pytest
+
+import catalogue
+from catalogue import RowCatalogue
+from firefighter import SchedulingProblem
+from violations import row_violations
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return RowCatalogue(SchedulingProblem(), None)
+
+
+def test_catalogue_holds_the_valid_rows(prob, schedule, rows):
+    # Number of rows of 3 weeks with 7 off-duty days that satisfy C0-C6 and C8
+    assert len(rows) == 2502
+    assert len(set(rows)) == len(rows)
+    validator = prob.row_validator()
+    for row in rows:
+        assert validator.is_valid(row)
+        assert not row_violations(prob, row)
+    assert all(row in rows for row in schedule)
+    assert rows.is_feasible(schedule)
+    assert "F" * len(schedule[0]) not in rows
+
+
+def test_catalogue_is_cached(tmp_path, monkeypatch, rows):
+    prob = SchedulingProblem()
+    saved = RowCatalogue(prob, str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    def enumerate_rows(prob):
+        raise AssertionError("the rows are enumerated again")
+
+    # The catalogue is read from its file, with the rows in the same order
+    monkeypatch.setattr(catalogue, "enumerate_rows", enumerate_rows)
+    loaded = RowCatalogue(prob, str(tmp_path))
+    assert list(loaded) == list(saved) == list(rows)
+
+
+def test_cache_depends_on_the_parameters(tmp_path):
+    RowCatalogue(SchedulingProblem(), str(tmp_path))
+    other = RowCatalogue(
+        SchedulingProblem(nb_weeks=2, nb_off_duty_days=5), str(tmp_path)
+    )
+    assert len(list(tmp_path.iterdir())) == 2
+    assert all(len(row) == 14 for row in other)
+
+
+# eof
@@ -0,0 +1,61 @@
+import random
+
+from checker import IncrementalChecker
+from moves import CHANGE_DAY, MOVE_OFF, SWAP_DAY, SWAP_ROWS, Move
+
+
+def _random_move(schedule, rng):
+    """
+    Returns a random move of [schedule]: most of them make it infeasible, the swaps of rows keep it feasible.
+    """
+    nb_days = len(schedule[0])
+    i, j = rng.sample(range(len(schedule)), 2)
+    kind = rng.choice([CHANGE_DAY, SWAP_DAY, SWAP_ROWS, MOVE_OFF])
+    if kind == CHANGE_DAY:
+        return Move(CHANGE_DAY, i, day=rng.randrange(nb_days), value=rng.choice("FMAN"))
+    if kind == MOVE_OFF:
+        return Move(
+            MOVE_OFF, i, rng.randrange(nb_days), day=rng.randrange(nb_days), value=1
+        )
+    return Move(kind, i, j, day=rng.randrange(nb_days))
+
+
+def test_apply_and_undo_agree_with_is_feasible(prob, schedule):
+    rng = random.Random(0)
+    current = list(schedule)
+    checker = IncrementalChecker(prob, current)
+    assert checker.is_feasible()
+    nb_feasible = 0
+    for _n in range(300):
+        move = _random_move(current, rng)
+        rows = move.new_rows(current)
+        old_rows = {i: current[i] for i in rows}
+        neighbour = list(current)
+        move.apply(neighbour)
+        feasible = prob.is_feasible(neighbour) is None
+        nb_feasible += feasible
+        assert checker.is_feasible_move(rows) == feasible
+
+        checker.apply(rows)
+        move.apply(current)
+        assert checker.is_feasible() == feasible
+        # Undo the move by applying the previous rows, unless the schedule remains feasible
+        if not feasible or rng.random() < 0.5:
+            checker.apply(old_rows)
+            move.undo(current)
+            assert checker.is_feasible() == (prob.is_feasible(current) is None)
+    assert 0 < nb_feasible < 300
+    assert current != schedule
+
+
+def test_infeasible_schedule_becomes_feasible(prob, schedule):
+    broken = list(schedule)
+    broken[3] = "N" * len(schedule[3])
+    checker = IncrementalChecker(prob, broken)
+    assert not checker.is_feasible()
+    assert checker.is_feasible_move({3: schedule[3]})
+    checker.apply({3: schedule[3]})
+    assert checker.is_feasible()
+
+
+# eof
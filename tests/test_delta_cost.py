@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from delta_cost import DeltaCost
+from moves import (
+    CHANGE_DAY,
+    MOVE_OFF,
+    REPLACE_ROW,
+    SWAP_DAY,
+    SWAP_PREFIX,
+    SWAP_ROWS,
+    Move,
+)
+
+
+def _random_move(kind, schedule, rng):
+    nb_days = len(schedule[0])
+    i, j = rng.sample(range(len(schedule)), 2)
+    day = rng.randrange(nb_days)
+    if kind == CHANGE_DAY:
+        return Move(CHANGE_DAY, i, day=day, value=rng.choice("FMAN"))
+    if kind == MOVE_OFF:
+        length = rng.randint(1, 3)
+        return Move(
+            MOVE_OFF,
+            i,
+            rng.randrange(nb_days - length + 1),
+            day=rng.randrange(nb_days - length + 1),
+            value=length,
+        )
+    if kind == REPLACE_ROW:
+        return Move(REPLACE_ROW, i, value=schedule[j])
+    return Move(kind, i, j, day=day)
+
+
+@pytest.mark.parametrize(
+    "kind", [CHANGE_DAY, SWAP_DAY, SWAP_PREFIX, SWAP_ROWS, MOVE_OFF, REPLACE_ROW]
+)
+def test_move_delta_equals_cost_change(prob, costs, schedule, kind):
+    rng = random.Random(0)
+    current = list(schedule)
+    delta_cost = DeltaCost(prob, costs, current)
+    for _n in range(200):
+        move = _random_move(kind, current, rng)
+        rows = move.new_rows(current)
+        delta = delta_cost.move_delta(move)
+        assert delta == pytest.approx(delta_cost.delta(rows))
+        before = prob.cost(current, costs)
+        move.apply(current)
+        assert delta == pytest.approx(prob.cost(current, costs) - before)
+        delta_cost.apply(rows)
+        assert delta_cost.total == pytest.approx(prob.cost(current, costs))
+
+
+def test_touched_cell_methods(prob, costs, schedule):
+    delta_cost = DeltaCost(prob, costs, schedule)
+    base = prob.cost(schedule, costs)
+
+    def change(move):
+        neighbour = list(schedule)
+        move.apply(neighbour)
+        return prob.cost(neighbour, costs) - base
+
+    assert delta_cost.change_one_day(2, 4, "N") == pytest.approx(
+        change(Move(CHANGE_DAY, 2, day=4, value="N"))
+    )
+    assert delta_cost.swap_day(1, 7, 10) == pytest.approx(
+        change(Move(SWAP_DAY, 1, 7, day=10))
+    )
+    assert delta_cost.swap_prefix(3, 5, 8) == pytest.approx(
+        change(Move(SWAP_PREFIX, 3, 5, day=8))
+    )
+    assert delta_cost.swap_rows(0, 19) == pytest.approx(change(Move(SWAP_ROWS, 0, 19)))
+    assert delta_cost.move_off_days(4, 2, 15, 2) == pytest.approx(
+        change(Move(MOVE_OFF, 4, 15, day=2, value=2))
+    )
+
+
+# eof
@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+
+from firefighter import SHIFTS
+
+
+def _random_rows(prob, nb, seed=0):
+    rng = random.Random(seed)
+    shifts = sorted(SHIFTS)
+    nb_days = prob._nb_weeks * 7
+    return ["".join(rng.choice(shifts) for _d in range(nb_days)) for _n in range(nb)]
+
+
+def _mutated_rows(rows, nb, seed=0):
+    """
+    Returns [nb] rows obtained by swapping two days or changing a day of one of [rows].
+    """
+    rng = random.Random(seed)
+    shifts = sorted(SHIFTS)
+    result = []
+    for _n in range(nb):
+        row = list(rng.choice(rows))
+        d = rng.randrange(len(row))
+        if rng.random() < 0.5:
+            e = rng.randrange(len(row))
+            row[d], row[e] = row[e], row[d]
+        else:
+            row[d] = rng.choice(shifts)
+        result.append("".join(row))
+    return result
+
+
+def test_validator_equals_row_violation(prob, schedule):
+    validator = prob.row_validator()
+    rows = schedule + _mutated_rows(schedule, 2000) + _random_rows(prob, 2000)
+    rows += [row[7:] + row[:7] for row in schedule]
+    rows += ["F" * 21, "M" * 21, schedule[0][:-1], schedule[0] + "x"]
+    nb_valid = 0
+    for row in rows:
+        valid = prob.row_violation(0, row) is None
+        assert validator.is_valid(row) == valid, row
+        nb_valid += valid
+    assert nb_valid > len(schedule)
+
+
+def test_is_feasible_with_mutated_rows(prob, schedule):
+    assert prob.is_feasible(schedule) is None
+    for n, row in enumerate(_mutated_rows(schedule, 200)):
+        i = n % len(schedule)
+        mutated = schedule[:i] + [row] + schedule[i + 1 :]
+        violation = prob.row_violation(i, row) or prob.coverage_violation(mutated)
+        assert (prob.is_feasible(mutated) is None) == (violation is None)
+
+
+def test_row_cost_matrix_equals_row_cost(prob, costs, schedule):
+    rows = schedule + _random_rows(prob, 30)
+    matrix = costs.row_cost_matrix(rows, cache=False)
+    assert matrix.shape == (prob._nb_firefighters, len(rows))
+    expected = [[costs.row_cost(i, row) for row in rows] for i in range(len(matrix))]
+    assert np.allclose(matrix, expected)
+
+
+def test_row_cost_matrix_ignores_unknown_characters(prob, costs, schedule):
+    annotated = [row[:-1] + "x" for row in schedule]
+    matrix = costs.row_cost_matrix(annotated, cache=False)
+    expected = [
+        [costs.row_cost(i, row) for row in annotated] for i in range(len(matrix))
+    ]
+    assert np.allclose(matrix, expected)
+
+
+def test_row_cost_matrix_cache_is_bounded(prob, costs):
+    for n in range(3 * costs.MAX_CACHED_MATRICES):
+        rows = _random_rows(prob, 5, seed=n)
+        assert costs.row_cost_matrix(rows) is costs.row_cost_matrix(rows)
+        assert len(costs._matrices) <= costs.MAX_CACHED_MATRICES
+
+
+# eof
@@ -0,0 +1,67 @@
+import pytest
+
+from instrumentation import instrumentation
+from lns import REPAIR_CUTOFF, REPAIR_OPTIMAL, repair, solve_repair
+from model import FREE_CELL, ModelBuilder
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.enable(False)
+    instrumentation.reset()
+
+
+def _destroy(schedule, days):
+    return [
+        "".join(FREE_CELL if d in days else shift for d, shift in enumerate(row))
+        for row in schedule
+    ]
+
+
+def test_repair_without_improvement_is_counted_as_cutoff(
+    prob, costs, schedule, instrumented
+):
+    # No schedule is cheaper than [schedule] on these days
+    destroyed = _destroy(schedule, {1, 2})
+    repaired, status = solve_repair(
+        destroyed, prob, costs, ModelBuilder(prob), incumbent=schedule
+    )
+    assert status == REPAIR_CUTOFF
+    assert repaired == schedule
+    counters = instrumentation.summary()["counters"]
+    assert counters.get("lns.cutoff_repairs") == 1
+    assert "lns.failed_repairs" not in counters
+
+
+def test_repair_of_an_optimal_repair_is_counted_as_cutoff(
+    prob, costs, schedule, instrumented
+):
+    days = {5, 6, 7}
+    mb = ModelBuilder(prob)
+    optimum, status = solve_repair(
+        _destroy(schedule, days), prob, costs, mb, incumbent=schedule
+    )
+    assert status == REPAIR_OPTIMAL
+    assert prob.cost(optimum, costs) < prob.cost(schedule, costs)
+    assert "lns.cutoff_repairs" not in instrumentation.summary()["counters"]
+    repaired = repair(_destroy(optimum, days), prob, costs, mb, incumbent=optimum)
+    assert repaired == optimum
+    assert instrumentation.summary()["counters"].get("lns.cutoff_repairs") == 1
+
+
+def test_repair_keeps_untouched_cells(prob, costs, schedule, instrumented):
+    days = {5, 6, 7}
+    repaired = repair(
+        _destroy(schedule, days), prob, costs, ModelBuilder(prob), incumbent=schedule
+    )
+    assert prob.is_feasible(repaired) is None
+    assert prob.cost(repaired, costs) <= prob.cost(schedule, costs) + 1e-6
+    for row, other in zip(repaired, schedule):
+        assert all(row[d] == other[d] for d in range(len(row)) if d not in days)
+    assert "lns.failed_repairs" not in instrumentation.summary()["counters"]
+
+
+# eof
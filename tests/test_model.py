@@ -0,0 +1,62 @@
+import pytest
+from pulp import PULP_CBC_CMD
+
+from model import FREE_CELL, ModelBuilder
+
+
+def _destroy(schedule, rows, days):
+    """
+    Returns [schedule] where the firefighters [rows] and the [days] of the other firefighters are destroyed.
+    """
+    return [
+        (
+            "0"
+            if i in rows
+            else "".join(
+                FREE_CELL if d in days else shift for d, shift in enumerate(row)
+            )
+        )
+        for i, row in enumerate(schedule)
+    ]
+
+
+def _fixed_cost(destroyed, costs):
+    return sum(
+        costs.cell_cost(i, d, shift)
+        for i, row in enumerate(destroyed)
+        if row != "0"
+        for d, shift in enumerate(row)
+        if shift != FREE_CELL
+    )
+
+
+@pytest.mark.parametrize(
+    "rows, days", [({3}, set()), (set(), {5, 6, 7}), ({0}, {12, 13})]
+)
+def test_subproblem_solution_keeps_untouched_cells(prob, costs, schedule, rows, days):
+    destroyed = _destroy(schedule, rows, days)
+    mb = ModelBuilder(prob)
+    model = mb.build_subproblem(costs, destroyed)
+    mb.set_start(schedule, subproblem=True)
+    # The objective only covers the destroyed cells
+    fixed_cost = _fixed_cost(destroyed, costs)
+    assert model.objective.value() + fixed_cost == pytest.approx(
+        prob.cost(schedule, costs)
+    )
+
+    assert model.solve(PULP_CBC_CMD(msg=False)) == 1
+    repaired = mb.extract_subsolution()
+    for i, row in enumerate(destroyed):
+        if row != "0":
+            assert all(
+                shift == FREE_CELL or repaired[i][d] == shift
+                for d, shift in enumerate(row)
+            )
+    assert prob.is_feasible(repaired) is None
+    assert prob.cost(repaired, costs) <= prob.cost(schedule, costs) + 1e-6
+    assert model.objective.value() + fixed_cost == pytest.approx(
+        prob.cost(repaired, costs)
+    )
+
+
+# eof
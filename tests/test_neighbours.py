@@ -0,0 +1,43 @@
+import random
+
+from delta_cost import DeltaCost
+from neighbours import (
+    RowAssignmentNeighbourhood,
+    SampledSwapDayNeighbourhood,
+    SwapNeighbourhood,
+)
+from parallel import balanced_shards
+
+
+def test_sampled_moves_belong_to_their_shard(prob, costs, schedule):
+    neighbourhood = SampledSwapDayNeighbourhood(prob, nb_moves=200, costs=costs)
+    # Infeasible neighbours are returned too, so that every drawn move is seen
+    neighbourhood.soft = True
+    for shard in balanced_shards(prob._nb_firefighters, 4):
+        moves = list(neighbourhood.iter_moves(schedule, shard))
+        assert moves
+        assert all(move.i in shard and move.i < move.j for move in moves)
+
+
+def test_assignment_is_never_worse_than_the_best_swap(prob, costs, schedule):
+    rng = random.Random(0)
+    assignment = RowAssignmentNeighbourhood(prob, costs)
+    swaps = SwapNeighbourhood(prob)
+    for _n in range(10):
+        current = list(schedule)
+        rng.shuffle(current)
+        delta_cost = DeltaCost(prob, costs, current)
+        best_swap = min(delta_cost.move_delta(m) for m in swaps.iter_moves(current))
+        (move,) = assignment.iter_moves(current)
+        assert delta_cost.move_delta(move) <= min(best_swap, 0) + 1e-9
+        assert sorted(move.value) == list(range(prob._nb_firefighters))
+
+        # After the best permutation, no swap improves the schedule
+        move.apply(current)
+        assert prob.is_feasible(current) is None
+        delta_cost.reset(current)
+        assert list(assignment.iter_moves(current)) == []
+        assert all(delta_cost.move_delta(m) > -1e-9 for m in swaps.iter_moves(current))
+
+
+# eof
@@ -0,0 +1,64 @@
+import pytest
+
+from delta_cost import DeltaCost
+from neighbours import (
+    OffDutyMoveNeighbourhood,
+    SampledOffDutyMoveNeighbourhood,
+    SwapNeighbourhood,
+)
+from parallel import ParallelExplorer, balanced_shards
+
+
+@pytest.fixture
+def neighbourhoods(prob):
+    return [
+        SwapNeighbourhood(prob),
+        OffDutyMoveNeighbourhood(prob),
+        SampledOffDutyMoveNeighbourhood(prob, nb_moves=50),
+    ]
+
+
+def test_balanced_shards_partition_firefighters():
+    shards = balanced_shards(20, 6)
+    assert sorted(i for shard in shards for i in shard) == list(range(20))
+    sizes = [sum(20 - i for i in shard) for shard in shards]
+    assert max(sizes) - min(sizes) <= 20
+
+
+def test_parallel_best_move_equals_sequential(prob, costs, schedule, neighbourhoods):
+    delta_cost = DeltaCost(prob, costs, schedule)
+    with ParallelExplorer(prob, costs, neighbourhoods, nb_workers=2) as explorer:
+        for neighbourhood in neighbourhoods[:2]:
+            expected = min(
+                delta_cost.delta(move.new_rows(schedule))
+                for move in neighbourhood.iter_moves(schedule)
+            )
+            move, delta = explorer.best_move(neighbourhood, schedule)
+            assert delta == pytest.approx(expected)
+            assert delta == pytest.approx(delta_cost.delta(move.new_rows(schedule)))
+
+
+def test_sampled_moves_change_between_explorations(prob, costs, schedule):
+    sampled = SampledOffDutyMoveNeighbourhood(prob, nb_moves=5)
+    with ParallelExplorer(
+        prob, costs, [sampled], nb_workers=1, nb_shards=1
+    ) as explorer:
+        results = [explorer.best_move(sampled, schedule) for _n in range(10)]
+    assert len({None if result is None else result[0] for result in results}) > 1
+
+
+def test_unknown_neighbourhood_is_rejected(prob, costs, schedule, neighbourhoods):
+    with ParallelExplorer(prob, costs, neighbourhoods[:1], nb_workers=1) as explorer:
+        with pytest.raises(ValueError):
+            explorer.best_move(SwapNeighbourhood(prob), schedule)
+
+
+def test_reseed_reproduces_sampled_moves(prob, schedule):
+    sampled = SampledOffDutyMoveNeighbourhood(prob, nb_moves=20)
+    sampled.reseed(1)
+    moves = list(sampled.iter_moves(schedule))
+    sampled.reseed(1)
+    assert list(sampled.iter_moves(schedule)) == moves
+
+
+# eof
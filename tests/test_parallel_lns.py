@@ -0,0 +1,60 @@
+import pytest
+
+from model import FREE_CELL
+from parallel_lns import ParallelLNS, rebase
+from repair_cache import RepairCache
+
+
+def destroy_weekend(schedule, prob, costs, rng, size):
+    return [
+        "".join(FREE_CELL if d in (5, 6) else shift for d, shift in enumerate(row))
+        for row in schedule
+    ]
+
+
+def destroy_badly(schedule, prob, costs, rng, size):
+    return [FREE_CELL] * len(schedule)
+
+
+def test_rebase_applies_destroyed_cells(schedule):
+    destroyed = ["0"] + [row[:3] + FREE_CELL + row[4:] for row in schedule[1:]]
+    repaired = ["F" * len(row) for row in schedule]
+    rebased = rebase(destroyed, repaired, schedule)
+    assert rebased[0] == repaired[0]
+    for row, other in zip(rebased[1:], schedule[1:]):
+        assert row == other[:3] + "F" + other[4:]
+
+
+def test_cached_repairs_do_not_update_selection(prob, costs, schedule):
+    cache = RepairCache(prob, costs)
+    lns = ParallelLNS(
+        prob,
+        costs,
+        schedule,
+        operators={"weekend": destroy_weekend},
+        nb_workers=1,
+        cache=cache,
+    )
+    best, cost = lns.run(max_iterations=3)
+    assert cache.hits == 2
+    assert lns.selection.calls == [1]
+    assert cost <= prob.cost(schedule, costs)
+    assert prob.is_feasible(best) is None
+
+
+def test_repair_errors_are_logged_then_raised(prob, costs, schedule, caplog):
+    lns = ParallelLNS(
+        prob,
+        costs,
+        schedule,
+        operators={"bad": destroy_badly},
+        nb_workers=1,
+        max_errors=2,
+    )
+    with pytest.raises(RuntimeError):
+        lns.run(max_iterations=5)
+    assert lns.nb_errors == 2
+    assert "bad" in caplog.text
+
+
+# eof
@@ -0,0 +1,84 @@
+from lns import REPAIR_CUTOFF, repair, solve_repair
+from model import FREE_CELL, ModelBuilder
+from repair_cache import RepairCache
+
+
+def _destroy(schedule, days):
+    return [
+        "".join(FREE_CELL if d in days else shift for d, shift in enumerate(row))
+        for row in schedule
+    ]
+
+
+def test_cache_hit_returns_same_schedule(prob, costs, schedule):
+    cache = RepairCache(prob, costs)
+    mb = ModelBuilder(prob)
+    destroyed = _destroy(schedule, {5, 6, 7})
+    repaired = repair(destroyed, prob, costs, mb, incumbent=schedule, cache=cache)
+    assert len(cache) == 1
+    assert cache.get(destroyed, schedule) == repaired
+    assert (
+        repair(destroyed, prob, costs, mb, incumbent=schedule, cache=cache) == repaired
+    )
+    assert cache.hits == 2
+
+
+def test_cutoff_is_cached_and_reused(prob, costs, schedule):
+    cache = RepairCache(prob, costs)
+    mb = ModelBuilder(prob)
+    # No schedule is cheaper than [schedule] on these days
+    destroyed = _destroy(schedule, {1, 2})
+    _repaired, status = solve_repair(destroyed, prob, costs, mb, incumbent=schedule)
+    assert status == REPAIR_CUTOFF
+    repaired = repair(destroyed, prob, costs, mb, incumbent=schedule, cache=cache)
+    assert repaired == schedule
+    assert len(cache) == 1
+    assert cache.misses == 1
+    # The second repair is not solved: the cache returns the incumbent
+    repaired = repair(destroyed, prob, costs, mb, incumbent=schedule, cache=cache)
+    assert repaired == schedule
+    assert cache.hits == 1
+
+
+def test_cutoff_is_reused_for_cheaper_incumbents_only(prob, costs, schedule):
+    cache = RepairCache(prob, costs)
+    mb = ModelBuilder(prob)
+    days = {5, 6, 7}
+    optimum = repair(_destroy(schedule, days), prob, costs, mb, incumbent=schedule)
+    assert prob.cost(optimum, costs) < prob.cost(schedule, costs)
+    # The repair of [optimum] is cut off; [schedule] has the same cells outside [days]
+    destroyed = _destroy(optimum, days)
+    assert destroyed == _destroy(schedule, days)
+    repaired = repair(destroyed, prob, costs, mb, incumbent=optimum, cache=cache)
+    assert repaired == optimum
+    assert cache.get(destroyed, optimum) == optimum
+    assert cache.get(destroyed, schedule) is None
+
+
+def test_limited_solves_are_not_cached(prob, costs, schedule):
+    cache = RepairCache(prob, costs)
+    destroyed = _destroy(schedule, {5, 6, 7})
+    repair(
+        destroyed,
+        prob,
+        costs,
+        ModelBuilder(prob),
+        incumbent=schedule,
+        gap=0.5,
+        cache=cache,
+    )
+    assert len(cache) == 0
+    assert cache.get(destroyed, schedule) is None
+
+
+def test_cache_is_bounded(prob, costs, schedule):
+    cache = RepairCache(prob, costs, capacity=2)
+    for day in range(4):
+        destroyed = _destroy(schedule, {day})
+        cache.add(destroyed, schedule, schedule)
+    assert len(cache) == 2
+    assert cache.get(_destroy(schedule, {0}), schedule) is None
+    assert cache.get(_destroy(schedule, {3}), schedule) == schedule
+
+
+# eof
@@ -0,0 +1,98 @@
+import random
+import time
+
+import pytest
+
+from exploration import best_improvement, first_improvement
+from instrumentation import instrumentation
+from neighbours import OffDutyMoveNeighbourhood, SwapNeighbourhood
+from parallel import ParallelExplorer
+from search import AdaptiveSelection, VNS
+
+
+def test_vns_without_restart_stops_at_local_optimum(prob, costs, schedule):
+    search = VNS(
+        prob,
+        costs,
+        schedule,
+        [SwapNeighbourhood(prob), OffDutyMoveNeighbourhood(prob)],
+        time_limit=60.0,
+        max_restarts=None,
+    )
+    start = time.perf_counter()
+    best, cost = search.run()
+    assert time.perf_counter() - start < 30.0
+    assert search.nb_restarts == 0
+    assert cost <= prob.cost(schedule, costs)
+    assert prob.is_feasible(best) is None
+
+
+def test_parallel_explorer_records_decrease_of_cost(prob, costs, schedule):
+    neighbourhoods = [SwapNeighbourhood(prob), OffDutyMoveNeighbourhood(prob)]
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        with ParallelExplorer(prob, costs, neighbourhoods, nb_workers=1) as explorer:
+            search = VNS(
+                prob,
+                costs,
+                schedule,
+                neighbourhoods,
+                max_iterations=20,
+                explorer=explorer,
+            )
+            _best, cost = search.run()
+        improvements = instrumentation.summary()["improvements"]
+    finally:
+        instrumentation.enable(False)
+        instrumentation.reset()
+    recorded = sum(improvement["total"] for improvement in improvements.values())
+    assert cost < prob.cost(schedule, costs)
+    assert recorded == pytest.approx(prob.cost(schedule, costs) - cost)
+
+
+def test_explorations_stop_at_deadline():
+    def neighbours():
+        n = 0
+        while True:
+            n += 1
+            yield n
+
+    deadline = time.perf_counter() + 0.05
+    result = best_improvement(neighbours(), lambda chunk: chunk, 0.0, deadline=deadline)
+    assert result is None
+    deadline = time.perf_counter() + 0.05
+    result = first_improvement(
+        neighbours(), lambda chunk: chunk, 0.0, deadline=deadline
+    )
+    assert result is None
+
+
+def test_adaptive_selection_follows_the_scores():
+    selection = AdaptiveSelection(3, decay=0.5, min_share=0.05)
+    rng = random.Random(0)
+    # The neighbourhoods that have never been explored are chosen first
+    assert selection.select([0, 1, 2], rng) == 0
+    selection.update(0, 2.0, 1.0)
+    assert selection.scores == [1.0, 0.0, 0.0]
+    assert selection.select([0, 1, 2], rng) == 1
+    selection.update(1, 0.0, 1.0)
+    selection.update(2, 9.0, 0.5)
+    assert selection.scores == [1.0, 0.0, 9.0]
+    assert selection.successes == [1, 0, 1]
+
+    # The roulette follows the scores, and neighbourhood 1 still gets its minimal share
+    choices = [selection.select([0, 1, 2], rng) for _n in range(2000)]
+    shares = [choices.count(k) / len(choices) for k in range(3)]
+    assert shares[2] > shares[0] > shares[1] > 0
+
+    # Scores are moving averages: after explorations without improvement, 2 is chosen less often
+    selection.update(2, 0.0, 1.0)
+    selection.update(2, 0.0, 1.0)
+    assert selection.scores[2] == pytest.approx(2.25)
+    choices = [selection.select([0, 1, 2], rng) for _n in range(2000)]
+    assert choices.count(2) / len(choices) < shares[2]
+    assert selection.statistics()[2]["calls"] == 3
+
+
+# eof
@@ -0,0 +1,71 @@
+import os
+
+from solution_store import SolutionStore
+
+
+def test_store_survives_reopen(tmp_path, schedule):
+    filename = str(tmp_path / "solutions.log")
+    other = list(reversed(schedule))
+    with SolutionStore(filename) as store:
+        store.add(schedule, 10.0, 1.0)
+        store.add(other, 5.0, 2.0)
+        store.add(schedule, 7.0, 3.0)
+
+    with SolutionStore(filename) as store:
+        assert len(store) == 3
+        assert store.best() == other
+        assert store.best_cost() == 5.0
+        assert store.latest() == schedule
+        assert store.latest_cost() == 7.0
+        assert store.record(1) == (5.0, 2.0, other)
+
+
+def test_new_best_is_on_disk_before_close(tmp_path, schedule):
+    filename = str(tmp_path / "solutions.log")
+    store = SolutionStore(filename)
+    store.add(schedule, 10.0, 1.0)
+    reopened = SolutionStore(filename)
+    assert len(reopened) == 1
+    assert reopened.best() == schedule
+    reopened.close()
+    store.close()
+
+
+def test_interrupted_record_is_dropped(tmp_path, schedule):
+    filename = str(tmp_path / "solutions.log")
+    with SolutionStore(filename) as store:
+        store.add(schedule, 10.0, 1.0)
+    size = os.path.getsize(filename)
+    with open(filename, "ab") as f:
+        f.write(b"3.0\t2.0\tFFF")
+
+    with SolutionStore(filename) as store:
+        assert len(store) == 1
+        assert store.best_cost() == 10.0
+    assert os.path.getsize(filename) == size
+
+
+def test_import_saved_schedules(tmp_path, prob, costs, schedule):
+    other = list(reversed(schedule))
+    # Names of files created by save_schedule, from the oldest to the most recent
+    for name, saved in [
+        ("2023_01_01_10_00_00_1", schedule),
+        ("2023_01_01_11_00_00", other),
+    ]:
+        with open(tmp_path / f"{name}.sched", "w") as f:
+            f.write("\n".join(saved) + "\n")
+    (tmp_path / "notes.txt").write_text("not a schedule")
+
+    with SolutionStore(str(tmp_path / "solutions.log")) as store:
+        assert store.import_schedules(prob, costs, str(tmp_path)) == 2
+        assert len(store) == 2
+        assert store.record(0)[0] == prob.cost(schedule, costs)
+        assert store.record(0)[2] == schedule
+        assert store.latest() == other
+        assert store.latest_cost() == prob.cost(other, costs)
+        assert store.best_cost() == min(
+            prob.cost(schedule, costs), prob.cost(other, costs)
+        )
+
+
+# eof
@@ -0,0 +1,56 @@
+import math
+import random
+
+import pytest
+
+from moves import CHANGE_DAY, MOVE_OFF, SWAP_DAY, SWAP_PREFIX, Move
+from violations import CONSTRAINTS, PenaltyEvaluator, schedule_violations
+
+
+def _random_move(schedule, rng):
+    nb_days = len(schedule[0])
+    i, j = rng.sample(range(len(schedule)), 2)
+    kind = rng.choice([CHANGE_DAY, SWAP_DAY, SWAP_PREFIX, MOVE_OFF])
+    if kind == CHANGE_DAY:
+        return Move(CHANGE_DAY, i, day=rng.randrange(nb_days), value=rng.choice("FMAN"))
+    if kind == MOVE_OFF:
+        return Move(
+            MOVE_OFF, i, rng.randrange(nb_days), day=rng.randrange(nb_days), value=1
+        )
+    return Move(kind, i, j, day=rng.randrange(nb_days))
+
+
+def test_delta_equals_recomputed_penalty(prob, costs, schedule):
+    rng = random.Random(0)
+    weights = {c: 1.0 + k for k, c in enumerate(CONSTRAINTS)}
+    current = list(schedule)
+    penalty = PenaltyEvaluator(prob, costs, current, weights)
+    assert penalty.is_feasible()
+    for _n in range(200):
+        move = _random_move(current, rng)
+        rows = move.new_rows(current)
+        delta = penalty.delta(rows)
+        neighbour = list(current)
+        move.apply(neighbour)
+        expected = PenaltyEvaluator(prob, costs, neighbour, weights)
+        assert delta == pytest.approx(expected.value() - penalty.value())
+        assert penalty.is_feasible_move(rows) == (prob.is_feasible(neighbour) is None)
+
+        penalty.apply(rows)
+        move.apply(current)
+        assert penalty.value() == pytest.approx(expected.value())
+        assert penalty.cost == pytest.approx(prob.cost(current, costs))
+        assert penalty.violations() == schedule_violations(prob, current)
+    assert not penalty.is_feasible()
+
+
+def test_hard_constraints_are_not_violated(prob, costs, schedule):
+    penalty = PenaltyEvaluator(prob, costs, schedule, hard=("C2",))
+    # Firefighter 0 works on one of its off-duty days
+    d = schedule[0].index("F")
+    row = schedule[0][:d] + "M" + schedule[0][d + 1 :]
+    assert penalty.delta({0: row}) == math.inf
+    assert penalty.delta({0: schedule[1], 1: schedule[0]}) < math.inf
+
+
+# eof
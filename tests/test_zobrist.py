@@ -0,0 +1,91 @@
+import random
+
+from moves import (
+    CHANGE_DAY,
+    MOVE_OFF,
+    PERMUTE_ROWS,
+    REPLACE_ROW,
+    ROTATE,
+    SWAP_DAY,
+    SWAP_PREFIX,
+    SWAP_ROWS,
+    Move,
+)
+from zobrist import RosterHash, VisitedSet, ZobristKeys, unique_moves
+
+
+def _random_moves(schedule, nb, seed=0):
+    """
+    Returns [nb] random moves of every kind for [schedule] (they may lead to infeasible schedules).
+    """
+    rng = random.Random(seed)
+    nb_firefighters = len(schedule)
+    nb_days = len(schedule[0])
+    result = []
+    for _n in range(nb):
+        i, j = rng.sample(range(nb_firefighters), 2)
+        day = rng.randrange(nb_days)
+        length = rng.randint(1, 3)
+        result += [
+            Move(CHANGE_DAY, i, day=day, value=rng.choice("FMAN")),
+            Move(SWAP_DAY, i, j, day=day),
+            Move(SWAP_PREFIX, i, j, day=day),
+            Move(
+                MOVE_OFF,
+                i,
+                rng.randrange(nb_days - length + 1),
+                day=rng.randrange(nb_days - length + 1),
+                value=length,
+            ),
+            Move(SWAP_ROWS, i, j),
+            Move(REPLACE_ROW, i, value=schedule[j]),
+            Move(
+                PERMUTE_ROWS,
+                0,
+                value=tuple(rng.sample(range(nb_firefighters), nb_firefighters)),
+            ),
+        ]
+    result.append(Move(ROTATE, 0))
+    return result
+
+
+def test_hash_after_apply_equals_hash_from_scratch(prob, schedule):
+    keys = ZobristKeys(prob)
+    current = list(schedule)
+    roster_hash = RosterHash(keys, current)
+    for move in _random_moves(schedule, 50):
+        rows = move.new_rows(current)
+        expected = roster_hash.after(rows)
+        roster_hash.apply(rows, move.changed_days())
+        move.apply(current)
+        assert roster_hash.value == keys.schedule_hash(current) == expected
+
+
+def test_changed_days_cover_the_changes(schedule):
+    for move in _random_moves(schedule, 50):
+        days = move.changed_days()
+        if days is None:
+            continue
+        for i, row in move.new_rows(schedule).items():
+            changed = {d for d, shift in enumerate(row) if shift != schedule[i][d]}
+            assert changed <= set(days[i]), move
+
+
+def test_unique_moves_skip_identical_neighbours(prob, schedule):
+    roster_hash = RosterHash(ZobristKeys(prob), schedule)
+    moves = _random_moves(schedule, 20)
+    unique = list(unique_moves(moves, schedule, roster_hash))
+    neighbours = set()
+    for move in unique:
+        neighbour = list(schedule)
+        move.apply(neighbour)
+        assert neighbour != schedule
+        neighbours.add(tuple(neighbour))
+    assert len(neighbours) == len(unique)
+
+    tabu = VisitedSet()
+    tabu.add(roster_hash.after(unique[0].new_rows(schedule)))
+    assert unique[0] not in unique_moves(moves, schedule, roster_hash, tabu)
+
+
+# eof
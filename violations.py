@@ -0,0 +1,398 @@
+import math
+from typing import Dict, Iterable, List, Optional
+
+from firefighter import (
+    DAYS_PER_WEEK,
+    SHIFT_OFFDUTY,
+    SHIFTS,
+    CostTable,
+    SchedulingProblem,
+    consecutive_numbers,
+)
+
+CONSTRAINTS = ("C0", "C1", "C2", "C3", "C4", "C5", "C6", "C7", "C8")
+
+
+class Violations:
+    """
+    Number and size of the violations of each constraint (C0-C8) by a schedule or part of a schedule.
+
+    The size of a violation measures how far the schedule is from satisfying the constraint:
+    for instance, a sequence of 6 days of the same shift is a violation of size 2 of C3 if the maximum is 4,
+    and a day with 1 firefighter on a shift that requires 3 firefighters is a violation of size 2 of C7.
+    A schedule is feasible iff it has no violation.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {c: 0 for c in CONSTRAINTS}
+        self.sizes: Dict[str, int] = {c: 0 for c in CONSTRAINTS}
+
+    def add(self, constraint: str, size: int) -> None:
+        """
+        Records a violation of [constraint] whose size is [size].
+        """
+        self.counts[constraint] += 1
+        self.sizes[constraint] += size
+
+    def __iadd__(self, other: "Violations") -> "Violations":
+        for c in CONSTRAINTS:
+            self.counts[c] += other.counts[c]
+            self.sizes[c] += other.sizes[c]
+        return self
+
+    def __isub__(self, other: "Violations") -> "Violations":
+        for c in CONSTRAINTS:
+            self.counts[c] -= other.counts[c]
+            self.sizes[c] -= other.sizes[c]
+        return self
+
+    def __bool__(self) -> bool:
+        return any(self.counts.values())
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Violations)
+            and self.counts == other.counts
+            and self.sizes == other.sizes
+        )
+
+    def __repr__(self) -> str:
+        violated = [
+            f"{c}: {self.counts[c]} ({self.sizes[c]})"
+            for c in CONSTRAINTS
+            if self.counts[c]
+        ]
+        return f"Violations({', '.join(violated)})"
+
+    def penalty(self, weights: Dict[str, float]) -> float:
+        """
+        Returns the sum of the sizes of the violations, weighted by [weights].
+        """
+        return sum(weights[c] * self.sizes[c] for c in CONSTRAINTS if self.sizes[c])
+
+
+def _run_violations(
+    violations: Violations,
+    constraint: str,
+    runs: Dict[int, int],
+    nb_days: int,
+    min_length: int,
+    max_length: int,
+) -> None:
+    """
+    Records the sequences of [runs] (see `consecutive_numbers`) whose length is not in [min_length, max_length].
+    """
+    # consecutive_numbers reports some sequences twice (once per pass over the row)
+    lengths = {start % nb_days: length for start, length in runs.items()}
+    for length in lengths.values():
+        if length < min_length:
+            violations.add(constraint, min_length - length)
+        elif length > max_length:
+            violations.add(constraint, length - max_length)
+
+
+def row_violations(prob: SchedulingProblem, row: str) -> Violations:
+    """
+    Returns the violations of the constraints that only involve a single firefighter (C0-C6 and C8) by [row].
+    A row that is too short only violates C0, the other constraints are not evaluated.
+    """
+    result = Violations()
+    nb_days = prob._nb_weeks * DAYS_PER_WEEK
+
+    # Constraint C0: the schedule covers every day.
+    if len(row) < nb_days:
+        result.add("C0", nb_days - len(row))
+        return result
+    row = row[:nb_days]
+
+    # Constraint C1: one violation per unknown shift
+    for shift in row:
+        if shift not in SHIFTS:
+            result.add("C1", 1)
+
+    # Constraint C2: number of off-duty days
+    nb_off_duty_days = row.count(SHIFT_OFFDUTY)
+    if nb_off_duty_days != prob._nb_off_duty_days:
+        result.add("C2", abs(nb_off_duty_days - prob._nb_off_duty_days))
+
+    # Constraints C3-C5: lengths of the sequences
+    work_shifts = set(prob._shift_order)
+    for shift in work_shifts:
+        _run_violations(
+            result,
+            "C3",
+            consecutive_numbers(row, nb_days, {shift}),
+            nb_days,
+            prob._min_nb_consecutive_days,
+            prob._max_nb_consecutive_days,
+        )
+    _run_violations(
+        result,
+        "C4",
+        consecutive_numbers(row, nb_days, work_shifts),
+        nb_days,
+        prob._min_nb_consecutive_work_days,
+        prob._max_nb_consecutive_work_days,
+    )
+    _run_violations(
+        result,
+        "C5",
+        consecutive_numbers(row, nb_days, {SHIFT_OFFDUTY}),
+        nb_days,
+        prob._min_nb_consecutive_off_days,
+        prob._max_nb_consecutive_off_days,
+    )
+
+    # Constraint C6: at least one full week-end off-duty
+    saturdays = [5 + DAYS_PER_WEEK * w for w in range(prob._nb_weeks)]
+    if not any(
+        row[d] == SHIFT_OFFDUTY and row[d + 1] == SHIFT_OFFDUTY for d in saturdays
+    ):
+        result.add("C6", 1)
+
+    # Constraint C8: one violation per forbidden transition between two work shifts (the row is cyclic)
+    work_days = [d for d in range(nb_days) if row[d] in work_shifts]
+    for k, d in enumerate(work_days):
+        previous = work_days[k - 1]
+        shift = row[d]
+        next_shift = prob._shift_order[row[previous]]
+        if previous == (d - 1) % nb_days:
+            if shift != row[previous] and shift != next_shift:
+                result.add("C8", 1)
+        elif shift != next_shift:
+            result.add("C8", 1)
+
+    return result
+
+
+def coverage_violations(prob: SchedulingProblem, schedule: List[str]) -> Violations:
+    """
+    Returns the violations of the coverage constraint (C7) by [schedule]:
+    one violation per day and shift that does not have enough firefighters.
+    """
+    result = Violations()
+    for shift, min_nb in prob._shift_requirements.items():
+        for d in range(prob._nb_weeks * DAYS_PER_WEEK):
+            nb = len(
+                [
+                    i
+                    for i in range(prob._nb_firefighters)
+                    if len(schedule[i]) > d and schedule[i][d] == shift
+                ]
+            )
+            if nb < min_nb:
+                result.add("C7", min_nb - nb)
+    return result
+
+
+def schedule_violations(prob: SchedulingProblem, schedule: List[str]) -> Violations:
+    """
+    Returns all the violations of [schedule].
+    Unlike `SchedulingProblem.is_feasible`, which stops at the first violation, every violation is counted.
+    """
+    result = Violations()
+    if len(schedule) < prob._nb_firefighters:
+        result.add("C0", prob._nb_firefighters - len(schedule))
+        return result
+    for i in range(prob._nb_firefighters):
+        result += row_violations(prob, schedule[i])
+    result += coverage_violations(prob, schedule)
+    return result
+
+
+class PenaltyEvaluator:
+    """
+    Keeps track of the cost and the violations of a current schedule of a [SchedulingProblem],
+    so that infeasible schedules can be evaluated (soft constraints).
+
+    The penalised cost of a schedule is its cost plus the sum of the sizes of its violations,
+    weighted by [weights] (one weight per constraint).
+    As in `IncrementalChecker`, a move is a dictionary { i1: s1, i2: s2, etc. }
+    that replaces the schedule of firefighter ik with sk;
+    evaluating a move only looks at the modified rows and at the coverage of the days they modify.
+    `update_weights` adapts the weights to the violations of the current schedule,
+    which lets a search go through infeasible schedules while being driven back to feasible ones.
+    The constraints in [hard] remain hard: a move that increases their violations has an infinite cost.
+    [costs] is either a CostTable or the result of `read_costs`.
+    """
+
+    def __init__(
+        self,
+        prob: SchedulingProblem,
+        costs,
+        schedule: List[str],
+        weights: Optional[Dict[str, float]] = None,
+        hard: Iterable[str] = (),
+    ) -> None:
+        self._prob = prob
+        if not isinstance(costs, CostTable):
+            costs = CostTable.from_costs(costs)
+        self._costs = costs
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self._requirements = prob._shift_requirements
+        if weights is None:
+            weights = {c: 1.0 for c in CONSTRAINTS}
+        self._weights = dict(weights)
+        self._hard = tuple(hard)
+        # The violations of a row do not depend on the firefighter, so they are shared
+        self._row_violations_cache: Dict[str, Violations] = {}
+        self.reset(schedule)
+
+    def reset(self, schedule: List[str]) -> None:
+        """
+        Makes [schedule] the current schedule.
+        """
+        self._rows = [
+            schedule[i][: self._nb_days] for i in range(self._prob._nb_firefighters)
+        ]
+        self._row_costs = [self._row_cost(i, row) for i, row in enumerate(self._rows)]
+        self.cost = sum(self._row_costs)
+
+        self._violations = Violations()
+        for row in self._rows:
+            self._violations += self.row_violations(row)
+        self._coverage = [{} for _d in range(self._nb_days)]
+        for row in self._rows:
+            for d, shift in enumerate(row):
+                self._coverage[d][shift] = self._coverage[d].get(shift, 0) + 1
+        for d in range(self._nb_days):
+            for shift, min_nb in self._requirements.items():
+                nb = self._coverage[d].get(shift, 0)
+                if nb < min_nb:
+                    self._violations.add("C7", min_nb - nb)
+
+    def _row_cost(self, i: int, row: str) -> float:
+        if len(row) < self._nb_days:
+            return 0.0
+        return self._costs.row_cost(i, row)
+
+    def row_violations(self, row: str) -> Violations:
+        """
+        Returns the violations of the constraints that only involve a single firefighter by [row].
+        """
+        row = row[: self._nb_days]
+        violations = self._row_violations_cache.get(row)
+        if violations is None:
+            violations = row_violations(self._prob, row)
+            self._row_violations_cache[row] = violations
+        return violations
+
+    def violations(self) -> Violations:
+        """
+        Returns the violations of the current schedule.
+        """
+        result = Violations()
+        result += self._violations
+        return result
+
+    def is_feasible(self) -> bool:
+        return not self._violations
+
+    def weights(self) -> Dict[str, float]:
+        return dict(self._weights)
+
+    def penalty(self) -> float:
+        """
+        Returns the weighted sum of the sizes of the violations of the current schedule.
+        """
+        return self._violations.penalty(self._weights)
+
+    def value(self) -> float:
+        """
+        Returns the penalised cost of the current schedule.
+        """
+        return self.cost + self.penalty()
+
+    def _changes(self, move: Dict[int, str]):
+        """
+        Returns the change of cost, the violations that [move] removes (rows and shifts whose coverage changes),
+        and the violations that it adds.
+        """
+        removed = Violations()
+        added = Violations()
+        cost = 0
+        coverage_changes = {}
+        for i, new_row in move.items():
+            old_row = self._rows[i]
+            new_row = new_row[: self._nb_days]
+            if new_row == old_row:
+                continue
+            cost += self._row_cost(i, new_row) - self._row_costs[i]
+            removed += self.row_violations(old_row)
+            added += self.row_violations(new_row)
+            for d in range(min(len(old_row), len(new_row))):
+                if old_row[d] != new_row[d]:
+                    coverage_changes[(d, old_row[d])] = (
+                        coverage_changes.get((d, old_row[d]), 0) - 1
+                    )
+                    coverage_changes[(d, new_row[d])] = (
+                        coverage_changes.get((d, new_row[d]), 0) + 1
+                    )
+            for d in range(len(new_row), len(old_row)):
+                coverage_changes[(d, old_row[d])] = (
+                    coverage_changes.get((d, old_row[d]), 0) - 1
+                )
+            for d in range(len(old_row), len(new_row)):
+                coverage_changes[(d, new_row[d])] = (
+                    coverage_changes.get((d, new_row[d]), 0) + 1
+                )
+
+        for (d, shift), delta in coverage_changes.items():
+            min_nb = self._requirements.get(shift, 0)
+            before = self._coverage[d].get(shift, 0)
+            if delta != 0 and before < min_nb:
+                removed.add("C7", min_nb - before)
+            if delta != 0 and before + delta < min_nb:
+                added.add("C7", min_nb - before - delta)
+        return cost, removed, added, coverage_changes
+
+    def delta(self, move: Dict[int, str]) -> float:
+        """
+        Returns the change of penalised cost induced by [move].
+        """
+        cost, removed, added, _coverage_changes = self._changes(move)
+        for c in self._hard:
+            if added.sizes[c] > removed.sizes[c]:
+                return math.inf
+        return cost + added.penalty(self._weights) - removed.penalty(self._weights)
+
+    def is_feasible_move(self, move: Dict[int, str]) -> bool:
+        """
+        Indicates whether the current schedule would be feasible after applying [move].
+        """
+        _cost, removed, added, _coverage_changes = self._changes(move)
+        violations = self.violations()
+        violations -= removed
+        violations += added
+        return not violations
+
+    def apply(self, move: Dict[int, str]) -> None:
+        """
+        Applies [move] to the current schedule.
+        """
+        cost, removed, added, coverage_changes = self._changes(move)
+        self.cost += cost
+        self._violations -= removed
+        self._violations += added
+        for (d, shift), delta in coverage_changes.items():
+            self._coverage[d][shift] = self._coverage[d].get(shift, 0) + delta
+        for i, new_row in move.items():
+            new_row = new_row[: self._nb_days]
+            self._row_costs[i] = self._row_cost(i, new_row)
+            self._rows[i] = new_row
+
+    def update_weights(
+        self, factor: float = 1.5, min_weight: float = 0.1, max_weight: float = 1e3
+    ) -> None:
+        """
+        Multiplies by [factor] the weight of each constraint violated by the current schedule,
+        and divides by [factor] the weight of the other constraints, within [min_weight, max_weight].
+        """
+        for c in CONSTRAINTS:
+            if self._violations.counts[c]:
+                self._weights[c] = min(self._weights[c] * factor, max_weight)
+            else:
+                self._weights[c] = max(self._weights[c] / factor, min_weight)
+
+
+# eof
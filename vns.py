@@ -1,63 +1,189 @@
-import random
+from sys import argv
 import firefighter
 import neighbours
+from delta_cost import DeltaCost
+from parallel import ParallelExplorer
+from create_instance import load_instance
+from create_solution import create_solution
+from search import AdaptiveSelection, VNS
+from multistart import multi_start
+from solution_store import SolutionStore
+from violations import PenaltyEvaluator
+from instrumentation import instrumentation
+from zobrist import RosterHash, VisitedSet, ZobristKeys, unique_moves
 
 if __name__ == '__main__':
-    # Load the initial schedule from example.sched
-    schedule = firefighter.load_schedule("example.sched")
-    firefighter.save_schedule(schedule)
+    # With --soft, the search also goes through infeasible schedules (see PenaltyEvaluator)
+    soft = "--soft" in argv
+    # Exploration of the neighbourhoods: the best neighbour (default), the first improving neighbour (--first),
+    # or the best of sample_size random neighbours (--sample)
+    strategy = "first" if "--first" in argv else "sample" if "--sample" in argv else "best"
+    sample_size = 500
+    # With --parallel, the best neighbour is searched by a pool of processes (one per CPU)
+    parallel = "--parallel" in argv
+    # With --sampled, the large neighbourhoods draw random moves (for large instances)
+    sampled = "--sampled" in argv
+    # With --stats=FILE, counters and timers are saved in FILE (CSV if it ends with .csv, JSON otherwise)
+    stats_file = next((arg[len("--stats="):] for arg in argv if arg.startswith("--stats=")), None)
+    # Budget of the search: --time=SECONDS and --iterations=N (explorations of a neighbourhood)
+    time_limit = next((float(arg[len("--time="):]) for arg in argv if arg.startswith("--time=")), None)
+    max_iterations = next((int(arg[len("--iterations="):]) for arg in argv if arg.startswith("--iterations=")), None)
+    # With --shake, the local optima are perturbed by random moves;
+    # with --restarts=N, the search restarts at most N times from a new random solution
+    shaking = "--shake" in argv
+    max_restarts = next((int(arg[len("--restarts="):]) for arg in argv if arg.startswith("--restarts=")), 0)
+    # With --multistart, independent searches from random solutions run in a pool of processes (see multi_start)
+    multistart = "--multistart" in argv
+    # With --adaptive, the descent chooses the neighbourhoods by their recent improvement per second
+    # (see AdaptiveSelection) and prints how the time was allocated
+    adaptive = "--adaptive" in argv
+    instrumentation.enable(stats_file is not None)
+    args = [arg for arg in argv[1:] if not arg.startswith("--")]
+    if len(args) > 0:
+        # Load a scaled instance created with create_instance.py
+        prob, costs, schedule = load_instance(args[0])
+        store = SolutionStore(f"{args[0]}.vns.log")
+    else:
+        # Load the initial schedule from example.sched
+        schedule = firefighter.load_schedule("example.sched")
 
-    # Initialize the problem and costs
-    prob = firefighter.SchedulingProblem()
-    costs = firefighter.read_costs(prob)
+        # Initialize the problem and costs
+        prob = firefighter.SchedulingProblem()
+        costs = firefighter.read_cost_table(prob)
+        store = SolutionStore("vns.log")
+        if len(store) == 0:
+            # The first run with the store resumes from the schedules saved by save_schedule (if there are some)
+            store.import_schedules(prob, costs)
 
     # Define neighbourhoods list
-    neighborhoods = [
-        neighbours.SwapNeighbourhood(prob),
-        neighbours.ChangOneDayNeighbourhood(prob),
-        neighbours.OffDutyMoveNeighbourhood(prob),
-        neighbours.SwapDaysNeighbourhood(prob),
-        neighbours.TwoOffDutyMoveNeighbourhood(prob),
-    ]
-
-    # Initialize current solution
+    if sampled:
+        # Each neighbourhood draws at most 2000 moves in at most 1 second, favouring the expensive cells
+        neighborhoods = [
+            neighbours.RowAssignmentNeighbourhood(prob, costs),
+            neighbours.SampledChangOneDayNeighbourhood(prob, 2000, 1.0, seed=0, costs=costs),
+            neighbours.SampledOffDutyMoveNeighbourhood(prob, 2000, 1.0, seed=1, costs=costs),
+            neighbours.SampledSwapDayNeighbourhood(prob, 2000, 1.0, seed=2, costs=costs),
+        ]
+    else:
+        neighborhoods = [
+            # The best permutation of the rows, which includes the best swap (SwapNeighbourhood)
+            neighbours.RowAssignmentNeighbourhood(prob, costs),
+            neighbours.ChangOneDayNeighbourhood(prob),
+            neighbours.OffDutyMoveNeighbourhood(prob),
+            neighbours.SwapDaysNeighbourhood(prob),
+            neighbours.TwoOffDutyMoveNeighbourhood(prob),
+        ]
 
+    # Initialize current solution, resuming from the best solution of a previous run if there is one
+    if len(store) > 0:
+        current_solution = store.best()
+    else:
+        current_solution = schedule
+    # The current solution is modified in place by the moves of the neighbourhoods
+    current_solution = list(current_solution)
+    delta_cost = DeltaCost(prob, costs, current_solution)
+    current_cost = delta_cost.total
+    # The hash of the current solution is used to skip the moves that lead to the same neighbour
+    roster_hash = RosterHash(ZobristKeys(prob), current_solution)
 
     # Define your VNS parameters
     kmax = len(neighborhoods)  # Number of neighborhoods
     k = 1
 
-    # Execute the Variable Neighborhood Descent
-    while k <= kmax:
-        current_solution = firefighter.load_last_schedule()
-        current_cost = prob.cost(current_solution, costs)
-        # Choose the k-th neighbourhood
-        neighborhood = neighborhoods[k - 1]
-        # print(type(neighborhood))
+    if soft:
+        # Infeasible neighbours are evaluated with a penalised cost.
+        # The weights are fixed during a descent, so it cannot cycle; when the descent reaches a local optimum,
+        # the weights are adapted to the violations of the current solution and the descent restarts.
+        for neighborhood in neighborhoods:
+            neighborhood.soft = True
+        # No neighbourhood can add an off-duty day to a firefighter, so C2 must not be violated
+        penalty = PenaltyEvaluator(prob, costs, current_solution, hard=("C0", "C1", "C2"))
+        # The last solutions are tabu, since the adaptation of the weights could lead back to them
+        visited = VisitedSet(1000)
+        visited.add(roster_hash.value)
+        best_solution = current_solution[:]
+        best_cost = current_cost
+        max_soft_iterations = 1000
+        max_rounds = 20
+        iteration = 0
+        nb_rounds = 0
 
-        # Generate neighbors using the selected neighbourhood
-        neighbors = neighborhood.neighbours(current_solution)
+        while iteration < max_soft_iterations:
+            iteration += 1
+            neighborhood = neighborhoods[k - 1]
+            name = "soft." + type(neighborhood).__name__
+            moves = instrumentation.counted(neighborhood.iter_moves(current_solution), f"{name}.candidates")
+            moves = unique_moves(moves, current_solution, roster_hash, visited)
 
-        # Evaluate the neighbors and find the best improved one
-        better_neighbor = None
-        best_neighbor_cost = current_cost
+            # Find the move with the best penalised cost
+            best_move = None
+            best_delta = -1e-9
+            with instrumentation.timer(name):
+                for move in moves:
+                    delta = penalty.delta(move.new_rows(current_solution))
+                    if delta < best_delta:
+                        best_move = move
+                        best_delta = delta
 
-        for neighbor in neighbors:
-            neighbor_cost = prob.cost(neighbor, costs)
-            if neighbor_cost < best_neighbor_cost:
-                better_neighbor = neighbor
-                best_neighbor_cost = neighbor_cost
+            if best_move is not None:
+                penalty.apply(best_move.new_rows(current_solution))
+                roster_hash.apply(best_move.new_rows(current_solution), best_move.changed_days())
+                best_move.apply(current_solution)
+                visited.add(roster_hash.value)
+                instrumentation.improvement(name, -best_delta)
+                if penalty.is_feasible() and penalty.cost < best_cost:
+                    best_solution = current_solution[:]
+                    best_cost = penalty.cost
+                    store.add(best_solution, best_cost)
+                k = 1
+            elif k < kmax:
+                k += 1
+            elif nb_rounds < max_rounds:
+                # Local optimum: the weights of the violated constraints increase, the others decrease
+                nb_rounds += 1
+                penalty.update_weights()
+                k = 1
+            else:
+                break
 
-        # If a better neighbor is found, update the current solution and reset k
-        if better_neighbor is not None and best_neighbor_cost < current_cost:
-            current_solution = better_neighbor
-            current_cost = best_neighbor_cost
-            k = 1
-            firefighter.save_schedule(current_solution)
-        # If a better neighbor is not found, move to the next neighborhood
-        else:
-            k += 1
+        # The best feasible solution is then improved by the usual descent
+        for neighborhood in neighborhoods:
+            neighborhood.soft = False
+        current_solution = best_solution
+
+    explorer = ParallelExplorer(prob, costs, neighborhoods) if parallel else None
+
+    # Execute the Variable Neighborhood Search: a Variable Neighborhood Descent,
+    # with shaking (--shake) and restarts from new random solutions (--restarts=N) until the budget
+    # (--time=SECONDS, --iterations=N) is exhausted
+    if multistart:
+        # One search per CPU from different random solutions, sharing their best solution (60 seconds by default)
+        best_solution, best_cost, _runs = multi_start(prob, costs, neighborhoods, time_limit or 60.0,
+                                                      strategy=strategy, shaking=shaking, sample_size=sample_size)
+        if best_solution is None:
+            # No run published a solution (e.g., the time limit is too short): keep the starting solution
+            print("The multi-start search found no solution, the starting solution is kept")
+        elif best_cost < current_cost:
+            current_solution, current_cost = best_solution, best_cost
+            store.add(current_solution, current_cost)
+    else:
+        restart = lambda rng: create_solution(rng.randrange(2 ** 31), prob)
+        selection = AdaptiveSelection(len(neighborhoods)) if adaptive else None
+        search = VNS(prob, costs, current_solution, neighborhoods, strategy=strategy,
+                     time_limit=time_limit, max_iterations=max_iterations, shaking=shaking,
+                     max_restarts=max_restarts, restart=restart, sample_size=sample_size, explorer=explorer,
+                     store=store, selection=selection)
+        current_solution, current_cost = search.run()
+        if selection is not None:
+            for stats in selection.statistics():
+                print(f"{stats['name']}: {stats['calls']} explorations, {stats['successes']} improvements, "
+                      f"{stats['time_share']:.1%} of the time, improvement {stats['improvement']:.3f}")
 
+    store.close()
+    if explorer is not None:
+        explorer.close()
+    if stats_file is not None:
+        instrumentation.save(stats_file)
     feasibility = prob.is_feasible(current_solution)
     if not feasibility:
         # Save the final schedule
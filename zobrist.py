@@ -0,0 +1,165 @@
+import random
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from firefighter import DAYS_PER_WEEK, SHIFTS, SchedulingProblem
+
+
+class ZobristKeys:
+    """
+    Random 64-bit keys for the cells of the schedules of a [SchedulingProblem]:
+    one key per firefighter, day and shift (and one per firefighter and day for unknown shifts).
+    The hash of a schedule is the XOR of the keys of its cells, so the hash of a modified schedule is obtained
+    by XORing the keys of the modified cells before and after the modification.
+    """
+
+    def __init__(self, prob: SchedulingProblem, seed=0) -> None:
+        rng = random.Random(seed)
+        self._nb_days = prob._nb_weeks * DAYS_PER_WEEK
+        self._keys: List[List[Dict[str, int]]] = [
+            [
+                {shift: rng.getrandbits(64) for shift in sorted(SHIFTS)}
+                for _d in range(self._nb_days)
+            ]
+            for _i in range(prob._nb_firefighters)
+        ]
+        self._unknown_keys = [
+            [rng.getrandbits(64) for _d in range(self._nb_days)]
+            for _i in range(prob._nb_firefighters)
+        ]
+
+    def cell_key(self, i: int, d: int, shift: str) -> int:
+        return self._keys[i][d].get(shift, self._unknown_keys[i][d])
+
+    def row_hash(self, i: int, row: str) -> int:
+        """
+        Returns the hash of [row] when it is the schedule of firefighter [i].
+        """
+        keys = self._keys[i]
+        unknown_keys = self._unknown_keys[i]
+        result = 0
+        for d, shift in enumerate(row[: self._nb_days]):
+            result ^= keys[d].get(shift, unknown_keys[d])
+        return result
+
+    def schedule_hash(self, schedule: List[str]) -> int:
+        result = 0
+        for i in range(len(self._keys)):
+            result ^= self.row_hash(i, schedule[i])
+        return result
+
+    def change(
+        self, i: int, old_row: str, new_row: str, days: Optional[Iterable[int]] = None
+    ) -> int:
+        """
+        Returns the value to XOR with the hash of a schedule when firefighter [i] performs [new_row]
+        instead of [old_row]. Only the days that differ are looked at;
+        if [days] is specified, the rows only differ on these days (see `Move.changed_days`).
+        """
+        keys = self._keys[i]
+        unknown_keys = self._unknown_keys[i]
+        if days is None:
+            days = range(self._nb_days)
+        result = 0
+        for d in days:
+            old_shift = old_row[d]
+            new_shift = new_row[d]
+            if old_shift != new_shift:
+                result ^= keys[d].get(old_shift, unknown_keys[d])
+                result ^= keys[d].get(new_shift, unknown_keys[d])
+        return result
+
+
+class RosterHash:
+    """
+    Zobrist hash of a current schedule, maintained under moves.
+    As in `IncrementalChecker`, a move is described as a dictionary { i1: s1, i2: s2, etc. }
+    that replaces the schedule of firefighter ik with sk.
+    """
+
+    def __init__(self, keys: ZobristKeys, schedule: List[str]) -> None:
+        self._keys = keys
+        self.reset(schedule)
+
+    def reset(self, schedule: List[str]) -> None:
+        self._rows = list(schedule)
+        self.value = self._keys.schedule_hash(schedule)
+
+    def after(
+        self,
+        move: Dict[int, str],
+        days: Optional[Dict[int, Iterable[int]]] = None,
+    ) -> int:
+        """
+        Returns the hash of the current schedule after [move], which is not applied.
+        If [days] is specified, it maps each modified firefighter to the days that [move] can modify
+        (see `Move.changed_days`), and only these days are looked at.
+        """
+        result = self.value
+        for i, new_row in move.items():
+            result ^= self._keys.change(
+                i, self._rows[i], new_row, None if days is None else days[i]
+            )
+        return result
+
+    def apply(
+        self,
+        move: Dict[int, str],
+        days: Optional[Dict[int, Iterable[int]]] = None,
+    ) -> None:
+        self.value = self.after(move, days)
+        for i, new_row in move.items():
+            self._rows[i] = new_row
+
+
+class VisitedSet:
+    """
+    Set of at most [capacity] hashes; when it is full, the oldest hash is forgotten.
+    It can be used as a tabu list (the hashes of the last solutions visited by a search),
+    or as a bounded memo when a value is associated with each hash (e.g., the cost of the schedule).
+    """
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self._capacity = capacity
+        self._values: "OrderedDict[int, object]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, h: int) -> bool:
+        return h in self._values
+
+    def add(self, h: int, value=None) -> None:
+        self._values[h] = value
+        if len(self._values) > self._capacity:
+            self._values.popitem(last=False)
+
+    def get(self, h: int, default=None):
+        return self._values.get(h, default)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+def unique_moves(
+    moves: Iterable,
+    schedule: List[str],
+    roster_hash: RosterHash,
+    tabu: Optional[VisitedSet] = None,
+) -> Iterator:
+    """
+    Filters the Moves (see moves.py) of [schedule], whose hash is [roster_hash]:
+    a move is skipped if it leads to [schedule] itself, to the same schedule as a previous move,
+    or to a schedule in [tabu].
+    The hash of each neighbour only looks at the days that the move can modify.
+    """
+    seen = {roster_hash.value}
+    for move in moves:
+        h = roster_hash.after(move.new_rows(schedule), move.changed_days())
+        if h in seen or (tabu is not None and h in tabu):
+            continue
+        seen.add(h)
+        yield move
+
+
+# eof